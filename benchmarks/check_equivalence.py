@@ -0,0 +1,89 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Seeded equivalence check of the array backend against the
+             agent-based ForestFire, which is the reference. Both backends
+             are run for the same seeds, and for every step the mean of the
+             On fire, Fine and Nf statistics over the seeds must agree within
+             a number of standard errors of their difference. The backends
+             draw their random numbers differently, so the runs of one seed
+             differ and only the distributions are compared. A run which
+             stopped keeps its last statistics. Exits with status 1 when a
+             statistic differs.
+
+             Usage (from the repository root):
+                 python benchmarks/check_equivalence.py
+                 python benchmarks/check_equivalence.py --seeds 200 --steps 100
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from forest_fire.model import ForestFire
+from forest_fire.array_model import ArrayForestFire
+from forest_fire.statistics_recorder import StatisticsRecorder
+
+METRICS = ["On fire", "Fine", "Nf"]
+
+PARAMETERS = {"height": 40, "width": 40, "density_trees": 0.9, "max_burn_rate": 3,
+              "ignition_prob": 0.5, "max_hp": 50, "regrowth_rate": 5,
+              "N_firefighters": 10, "strategy": "random", "extg_strength": 4,
+              "search_radius": 5}
+
+# Largest allowed difference of the means, in standard errors. With three
+# statistics over every step there are a few hundred comparisons, so it is
+# far out in the tails to keep false alarms rare.
+TOLERANCE = 4.5
+
+
+def run(model_class, seed, steps):
+    """
+    Statistics of every step of one run, shape (steps, len(METRICS)).
+    """
+    recorder = StatisticsRecorder(METRICS, capacity=steps)
+    model = model_class(seed=seed, max_iter=steps, recorder=recorder, **PARAMETERS)
+    while model.running and model.current_step < steps:
+        model.step()
+    values = np.stack([recorder.column(name) for name in METRICS], axis=1).astype(np.float64)
+    # The first recorded step is step 1.
+    padding = np.repeat(values[-1:], steps - len(values), axis=0)
+    return np.concatenate((values, padding))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the statistics of the array backend with the agent-based model.")
+    parser.add_argument("--seeds", type=int, default=80, help="number of seeds")
+    parser.add_argument("--steps", type=int, default=60, help="steps per run")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed difference of the means in standard errors")
+    args = parser.parse_args()
+
+    runs = {model_class: np.stack([run(model_class, seed, args.steps)
+                                   for seed in range(args.seeds)])
+            for model_class in (ForestFire, ArrayForestFire)}
+    agent, array = runs[ForestFire], runs[ArrayForestFire]
+    difference = array.mean(axis=0) - agent.mean(axis=0)
+    error = np.sqrt((agent.var(axis=0, ddof=1) + array.var(axis=0, ddof=1)) / args.seeds)
+    # Steps in which every run has the same value, e.g. 0, have no spread.
+    z = np.divide(np.abs(difference), error, out=np.zeros_like(difference), where=error > 0)
+    z[(error == 0) & (difference != 0)] = np.inf
+
+    failed = False
+    for i, name in enumerate(METRICS):
+        worst = int(np.argmax(z[:, i]))
+        ok = z[worst, i] <= args.tolerance
+        failed |= not ok
+        print(f"{name:8}: largest difference {z[worst, i]:.2f} standard errors in step "
+              f"{worst + 1} (agent {agent[:, worst, i].mean():.1f}, array "
+              f"{array[:, worst, i].mean():.1f}){'' if ok else ', FAILED'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Checks of the StatisticsRecorder. A run recorded only on change
+             must keep exactly the steps of a full recording of the same seed
+             in which a metric other than the step counter changed, and the
+             model_vars read by the server must be JSON serialisable.
+             Exits with status 1 when a check fails.
+
+             Usage (from the repository root):
+                 python benchmarks/check_recorder.py
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from forest_fire.model import ForestFire
+from forest_fire.statistics_recorder import StatisticsRecorder, STEP_METRICS
+
+SEEDS = range(5)
+# A slow fire without regrowth, so there are steps in which nothing changes.
+PARAMETERS = {"height": 30, "width": 30, "density_trees": 0.6, "max_burn_rate": 3,
+              "ignition_prob": 0.05, "max_hp": 100, "max_iter": 200, "regrowth_rate": 0,
+              "N_firefighters": 0, "strategy": "random", "extg_strength": 1}
+
+
+def run(seed, recorder):
+    model = ForestFire(seed=seed, recorder=recorder, **PARAMETERS)
+    while model.running:
+        model.step()
+    return model
+
+
+def changed_steps(recorder):
+    """
+    Steps of a full recording in which a metric other than the step counters
+    differs from the step before.
+    """
+    compared = [name for name in recorder.metrics if name not in STEP_METRICS]
+    steps = recorder.steps[:len(recorder)]
+    changed = np.zeros(len(steps), dtype=bool)
+    changed[0] = True
+    for name in compared:
+        column = recorder.column(name)
+        changed[1:] |= column[1:] != column[:-1]
+    return steps[changed]
+
+
+def main():
+    failures = 0
+    for seed in SEEDS:
+        full = StatisticsRecorder()
+        run(seed, full)
+        on_change = StatisticsRecorder(on_change=True)
+        model = run(seed, on_change)
+        recorded = on_change.steps[:len(on_change)]
+        # The last step is always recorded, see ForestFire.step.
+        expected = np.union1d(changed_steps(full), [model.current_step])
+        ok = np.array_equal(recorded, expected) and len(recorded) < len(full)
+        failures += not ok
+        print(f"seed {seed}: {len(recorded)} of {len(full)} steps recorded on change"
+              f"{'' if ok else ', FAILED'}")
+    try:
+        # The ChartModule of the server sends the last value of every metric.
+        json.dumps({name: values[-1] for name, values in full.model_vars.items()})
+        json.dumps({name: list(values) for name, values in full.model_vars.items()})
+    except TypeError as error:
+        failures += 1
+        print(f"model_vars are not JSON serialisable: {error}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
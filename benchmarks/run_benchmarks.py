@@ -0,0 +1,290 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Benchmarks of the forest fire model. Every case is run with a
+             fixed seed in a fresh process, which reports the init time, the
+             steps per second and the peak memory. The cases with record
+             also write every step to a frame file, to measure the overhead
+             of the FrameRecorder on each backend. The results are written
+             to a JSON file. With a baseline file the run is compared to it
+             and slowdowns beyond a threshold are reported.
+
+             Usage (from the repository root):
+                 python benchmarks/run_benchmarks.py --suite quick -o bench.json
+                 python benchmarks/run_benchmarks.py --suite quick --baseline bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the peak memory is not recorded there.
+    resource = None
+
+import mesa
+import numpy as np
+
+from forest_fire.model import ForestFire
+from forest_fire.array_model import ArrayForestFire
+from forest_fire.tiled_model import TiledForestFire
+from forest_fire.frame_recorder import FrameRecorder
+
+# Model class and extra parameters of every backend.
+BACKENDS = {
+    "agent": (ForestFire, {}),
+    "array": (ArrayForestFire, {}),
+    "array_batch": (ArrayForestFire, {"batch_fighters": True}),
+    "tiled": (TiledForestFire, {}),
+}
+
+STRATEGIES = ["random", "closest", "biggest", "earliest", "call_plane", "pursue"]
+
+# The base case of a suite, every other case changes one parameter of it.
+BASE_CASE = {"size": 100, "density": 0.9, "n_fighters": 100, "strategy": "random",
+             "record": False}
+
+SUITES = {
+    "quick": {
+        "backends": ["agent", "array", "array_batch", "tiled"],
+        "size": [100, 200],
+        "density": [0.5, 0.9],
+        "n_fighters": [0, 100, 300],
+        "strategy": STRATEGIES,
+        "record": [False, True],
+        "steps": 20,
+    },
+    "full": {
+        "backends": ["agent", "array", "array_batch", "tiled"],
+        "size": [100, 500, 1000, 2000],
+        "density": [0.5, 0.7, 0.9],
+        "n_fighters": [0, 100, 300, 500, 900],
+        "strategy": STRATEGIES,
+        "record": [False, True],
+        "steps": 50,
+    },
+}
+
+# Model parameters which are not varied.
+FIXED_PARAMETERS = {
+    "max_burn_rate": 10,
+    "ignition_prob": 0.5,
+    "max_hp": 100,
+    "regrowth_rate": 30,
+    "extg_strength": 4,
+    "search_radius": 5,
+}
+
+
+def suite_cases(suite):
+    """
+    Cases of a suite: the base case and every value of every parameter with
+    the other parameters of the base case, for every backend.
+    """
+    cases = []
+    for backend in suite["backends"]:
+        seen = set()
+        for parameter in ["size", "density", "n_fighters", "strategy", "record"]:
+            for value in suite[parameter]:
+                case = dict(BASE_CASE, backend=backend)
+                case[parameter] = value
+                key = case_key(case)
+                if key not in seen:
+                    seen.add(key)
+                    cases.append(case)
+    return cases
+
+
+def case_key(case):
+    """
+    String which identifies a case, used to match cases with the baseline.
+    """
+    key = (f"{case['backend']} size={case['size']} density={case['density']} "
+           f"fighters={case['n_fighters']} strategy={case['strategy']}")
+    return key + " record" if case.get("record") else key
+
+
+def run_case(task):
+    """
+    Run one benchmark case, in its own process.
+
+    :param task: Tuple with the case, number of steps and seed.
+    Returns:
+        Dict with the case, init time, number of steps, step time, steps per
+        second and peak resident memory in MB.
+    """
+    case, steps, seed = task
+    model_class, extra = BACKENDS[case["backend"]]
+
+    start = time.perf_counter()
+    model = model_class(
+        height=case["size"],
+        width=case["size"],
+        density_trees=case["density"],
+        max_iter=steps,
+        N_firefighters=case["n_fighters"],
+        strategy=case["strategy"],
+        seed=seed,
+        **FIXED_PARAMETERS,
+        **extra
+    )
+    init_time = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = FrameRecorder(os.path.join(directory, "run.frames")) if case.get("record") else None
+        start = time.perf_counter()
+        done = 0
+        while done < steps:
+            model.step()
+            done += 1
+            if recorder is not None:
+                recorder.record(model)
+            if not model.running:
+                break
+        if recorder is not None:
+            # Waits for the writer thread, so the compression is counted too.
+            recorder.close()
+        step_time = time.perf_counter() - start
+
+    peak_memory = None
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+        scale = 1024 ** 2 if sys.platform == "darwin" else 1024
+        peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    return dict(case,
+                key=case_key(case),
+                init_s=init_time,
+                steps=done,
+                step_s=step_time,
+                steps_per_s=done / step_time if step_time > 0 else None,
+                peak_memory_mb=peak_memory)
+
+
+def environment():
+    """
+    Description of the machine and code version the benchmarks ran on.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "mesa": mesa.__version__,
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def best_of(results):
+    """
+    Combine the results of repeated runs of a case: the fastest init and
+    steps, and the highest peak memory.
+    """
+    best = dict(max(results, key=lambda result: result["steps_per_s"] or 0))
+    best["init_s"] = min(result["init_s"] for result in results)
+    memory = [result["peak_memory_mb"] for result in results if result["peak_memory_mb"] is not None]
+    best["peak_memory_mb"] = max(memory) if memory else None
+    best["repeats"] = len(results)
+    return best
+
+
+def compare(results, baseline, threshold, min_seconds=0.01):
+    """
+    Compare results with a baseline.
+
+    :param results: Results of this run.
+    :param baseline: Results of the baseline run.
+    :param threshold: Relative slowdown which counts as a regression, e.g. 0.2
+                      for 20% fewer steps per second or 20% more init time.
+    :param min_seconds: Init times which grow less than this are not
+                        reported, since they are mostly noise.
+    Returns:
+        List of (key, metric, baseline value, new value) of the regressions.
+    """
+    baseline = {result["key"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        old = baseline.get(result["key"])
+        if old is None:
+            continue
+        if old["steps_per_s"] and result["steps_per_s"] is not None \
+                and result["steps_per_s"] < old["steps_per_s"] * (1 - threshold):
+            regressions.append((result["key"], "steps_per_s", old["steps_per_s"], result["steps_per_s"]))
+        if result["init_s"] > old["init_s"] * (1 + threshold) \
+                and result["init_s"] - old["init_s"] > min_seconds:
+            regressions.append((result["key"], "init_s", old["init_s"], result["init_s"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the forest fire model.")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick")
+    parser.add_argument("--backend", action="append", choices=list(BACKENDS),
+                        help="Only run these backends (can be repeated).")
+    parser.add_argument("--steps", type=int, help="Number of steps per case.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Run every case this many times and keep the best result.")
+    parser.add_argument("-o", "--output", help="JSON file to write the results to.")
+    parser.add_argument("--baseline", help="JSON file of an earlier run to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown reported as a regression (default 0.2).")
+    args = parser.parse_args()
+
+    suite = dict(SUITES[args.suite])
+    if args.backend:
+        suite["backends"] = args.backend
+    steps = args.steps or suite["steps"]
+    cases = suite_cases(suite)
+
+    results = []
+    # A new process per case, so the peak memory belongs to that case.
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        tasks = [(case, steps, args.seed) for case in cases for _ in range(args.repeat)]
+        repeats = []
+        for result in pool.imap(run_case, tasks):
+            repeats.append(result)
+            if len(repeats) < args.repeat:
+                continue
+            result = best_of(repeats)
+            repeats = []
+            results.append(result)
+            print(f"{result['key']:<70} init {result['init_s']:7.3f} s  "
+                  f"{result['steps_per_s']:9.1f} steps/s  "
+                  f"{result['peak_memory_mb'] or float('nan'):8.1f} MB")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"environment": environment(), "suite": args.suite, "steps": steps,
+                       "seed": args.seed, "repeat": args.repeat, "results": results},
+                      output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline["results"], args.threshold)
+        for key, metric, old, new in regressions:
+            print(f"REGRESSION {key}: {metric} {old:.3f} -> {new:.3f}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,14 @@ AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
 DESCRIPTION: Walker class, with functions to move agents in a certain manner:
                 - random
                 - radius
+                - distance field
                 - organized << is not yet implemented
 """
 
-from .tree import Tree
-from mesa import Agent
+from .slotted_agent import SlottedAgent
 
 
-class Walker(Agent):
+class Walker(SlottedAgent):
     """
     A class for an agent which is able to walk.
 
@@ -25,6 +25,8 @@ class Walker(Agent):
     practice to give one to each agent anyway.
     """
 
+    __slots__ = ("moore",)
+
     def __init__(self, unique_id, pos, model, moore=True):
         """
         Initialize Walker class
@@ -49,14 +51,13 @@ class Walker(Agent):
             radius: int=5
         """
 
-        neighbours = self.model.grid.get_neighbors(
+        self.model.profiler.count("walker_neighbour_queries")
+        burning_trees = self.model.get_burning_trees(
             pos = self.pos,
             moore = True,
             include_center = False,
             radius = radius
         )
-        neighbouring_trees = [agent for agent in neighbours if isinstance(agent, Tree)]
-        burning_trees = [tree for tree in neighbouring_trees if tree.condition == 'On fire']
         if len(burning_trees) > 0:
             closest_index = self.__get_closest_tree(burning_trees)
             self.model.grid.move_agent(self, burning_trees[closest_index].pos)
@@ -72,14 +73,13 @@ class Walker(Agent):
             radius: int=5
         """
 
-        neighbours = self.model.grid.get_neighbors(
+        self.model.profiler.count("walker_neighbour_queries")
+        burning_trees = self.model.get_burning_trees(
             pos = self.pos,
             moore = True,
             include_center = False,
             radius = radius
         )
-        neighbouring_trees = [agent for agent in neighbours if isinstance(agent, Tree)]
-        burning_trees = [tree for tree in neighbouring_trees if tree.condition == 'On fire']
         if len(burning_trees) > 0:
             biggest_index = self.__get_most_burning_tree(burning_trees)
             self.model.grid.move_agent(self, burning_trees[biggest_index].pos)
@@ -95,20 +95,40 @@ class Walker(Agent):
             radius: int=5
         """
 
-        neighbours = self.model.grid.get_neighbors(
+        self.model.profiler.count("walker_neighbour_queries")
+        burning_trees = self.model.get_burning_trees(
             pos = self.pos,
             moore = True,
             include_center = False,
             radius = radius
         )
-        neighbouring_trees = [agent for agent in neighbours if isinstance(agent, Tree)]
-        burning_trees = [tree for tree in neighbouring_trees if tree.condition == 'On fire']
         if len(burning_trees) > 0:
             hp_index = self.__get_most_hp_tree(burning_trees)
             self.model.grid.move_agent(self, burning_trees[hp_index].pos)
         else:
             self.random_move()
 
+    def move_along_distance_field(self):
+        """
+        The agent takes one step towards the closest fire, following the
+        distance field of the model, so there is no limit on the radius. If
+        no step brings it closer, it moves to a random spot.
+        """
+        field = self.model.get_distance_field()
+        self.model.profiler.count("walker_neighbour_queries")
+        coords = self.model.grid.get_neighborhood(
+            pos = self.pos,
+            moore = self.moore,
+            include_center = False
+        )
+        moves = [coord for coord in coords
+                 if not self.model.is_on_fire(coord) and field[coord] >= 0]
+        distances = [field[coord] for coord in moves]
+        if len(distances) > 0 and min(distances) < field[self.pos]:
+            self.model.grid.move_agent(self, moves[distances.index(min(distances))])
+        else:
+            self.random_move()
+
     def __get_closest_tree(self, trees):
         """
         Select the index of closest tree
@@ -148,6 +168,7 @@ class Walker(Agent):
 
     def __check_possible_moves(self):
 
+        self.model.profiler.count("walker_neighbour_queries")
         coords = self.model.grid.get_neighborhood(
             pos = self.pos,
             moore = self.moore,
@@ -155,10 +176,7 @@ class Walker(Agent):
         )
         possible_moves = []
         for coord in coords:
-            tree = [agent for agent in self.model.grid.get_cell_list_contents(coord) if isinstance(agent, Tree)]
-            if len(tree) == 0:
-                possible_moves.append(coord)
-            elif tree[0].condition != 'On fire':
+            if not self.model.is_on_fire(coord):
                 possible_moves.append(coord)
 
         return possible_moves
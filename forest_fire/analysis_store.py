@@ -0,0 +1,404 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Columnar store of the statistics of many runs, for the
+             analysis. The per-run CSV files in forest_fire/data and the
+             .npz files of run_sweep are converted into one directory with
+             a .npy file per column: a small table of the runs with their
+             configuration (source, strategy, n_fighters, ext_strength,
+             replicate, seed) and the statistics of every step, stored run
+             after run. The statistics columns are memory-mapped, so a
+             query only reads the columns it uses. Run as
+             python -m forest_fire.analysis_store to build or extend a store.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .sweep import STATISTICS_DTYPE
+
+# Columns of the table of runs, with their dtypes.
+RUN_COLUMNS = {
+    "source": "U64",
+    "file": "U128",
+    "strategy": "U32",
+    "n_fighters": np.int64,
+    "ext_strength": np.int64,
+    "replicate": np.int64,
+    "seed": np.int64,
+    "n_steps": np.int64,
+}
+CONFIG_COLUMNS = ["source", "strategy", "n_fighters", "ext_strength", "replicate"]
+
+# Dtypes of the statistics columns. The counts fit in 32 bits, which makes
+# the store a third smaller than with the dtypes of the sweep records.
+STEP_DTYPES = {name: np.int32 if STATISTICS_DTYPE[name].kind == "i" else np.float64
+               for name in STATISTICS_DTYPE.names}
+
+# Names of the CSV files written over time by run_model.py.
+FILENAME_PATTERNS = [
+    # statistics_stratclosest_nfighters-100_ext_strength-10_3.csv
+    re.compile(r"statistics_strat(?P<strategy>[a-z_]+?)_nfighters-(?P<n_fighters>\d+)"
+               r"_ext_strength-(?P<ext_strength>\d+)_(?P<replicate>\d+)\.csv$"),
+    # statistics_stratclosestnfighters100ext_strength10_3.csv
+    re.compile(r"statistics_strat(?P<strategy>[a-z_]+?)nfighters(?P<n_fighters>\d+)"
+               r"ext_strength(?P<ext_strength>\d+)_(?P<replicate>\d+)\.csv$"),
+    # statistics_closestnfighters100ext_strength10.csv
+    re.compile(r"statistics_(?P<strategy>[a-z_]+?)nfighters(?P<n_fighters>\d+)"
+               r"ext_strength(?P<ext_strength>\d+)\.csv$"),
+    # statistics_closest_100fighters_20strength.csv
+    re.compile(r"statistics_(?P<strategy>[a-z_]+?)_(?P<n_fighters>\d+)fighters"
+               r"_(?P<ext_strength>\d+)strength\.csv$"),
+]
+
+# Strategies which are spelled differently in some file names.
+STRATEGY_NAMES = {"no_fighter": "none", "no_fighters": "none"}
+
+# Replicate of the runs of which the file name has no replicate number. The
+# numbered replicates start at 0, so those runs keep their own key.
+UNNUMBERED = -1
+
+
+def parse_filename(name):
+    """
+    Configuration of a run from the name of its CSV file.
+
+    Returns:
+        Dict with strategy, n_fighters, ext_strength and replicate
+        (UNNUMBERED when the name has none), or None for other file names.
+    """
+    for pattern in FILENAME_PATTERNS:
+        match = pattern.match(os.path.basename(name))
+        if match:
+            fields = match.groupdict()
+            strategy = fields["strategy"]
+            return {
+                "strategy": STRATEGY_NAMES.get(strategy, strategy),
+                "n_fighters": int(fields["n_fighters"]),
+                "ext_strength": int(fields["ext_strength"]),
+                "replicate": int(fields.get("replicate") or UNNUMBERED),
+            }
+    return None
+
+
+def read_csv_directory(directory, source=None):
+    """
+    Read the CSV files of the runs in a directory.
+
+    :param directory: Directory with statistics CSV files, the files of
+                      which the name does not give a configuration are
+                      skipped.
+    :param source: Name of the runs in the store, by default the name of
+                   the directory.
+    Returns:
+        Dict with the run columns and dict with the statistics columns.
+    """
+    source = source or os.path.basename(os.path.normpath(directory))
+    runs = {name: [] for name in RUN_COLUMNS}
+    steps = {name: [] for name in STATISTICS_DTYPE.names}
+    for name in sorted(os.listdir(directory)):
+        configuration = parse_filename(name)
+        if configuration is None:
+            continue
+        data = pd.read_csv(os.path.join(directory, name), index_col=0)
+        # Runs of which the fire died out at once have a header only.
+        if data.empty:
+            data = pd.DataFrame({field: np.zeros(0, dtype) for field, (dtype, _)
+                                 in STATISTICS_DTYPE.fields.items()})
+        for field in STATISTICS_DTYPE.names:
+            steps[field].append(data[field].to_numpy(STATISTICS_DTYPE[field]))
+        configuration.update(source=source, file=name, seed=-1, n_steps=len(data))
+        for column in RUN_COLUMNS:
+            runs[column].append(configuration[column])
+    return runs, steps
+
+
+def read_sweep(path, source=None):
+    """
+    Read the runs of a sweep saved by run_sweep as .npz.
+
+    :param source: Name of the runs in the store, by default the name of
+                   the file.
+    Returns:
+        Dict with the run columns and dict with the statistics columns.
+    """
+    source = source or os.path.splitext(os.path.basename(path))[0]
+    with np.load(path) as sweep:
+        n_steps = sweep["n_steps"]
+        statistics = sweep["statistics"]
+        runs = {name: sweep[name] for name in ("strategy", "n_fighters", "ext_strength",
+                                                "replicate", "seed")}
+    runs.update(source=np.full(len(n_steps), source), file=np.full(len(n_steps), ""),
+                n_steps=n_steps)
+    rows = np.repeat(np.arange(len(n_steps)), n_steps)
+    steps = np.arange(len(rows)) - np.repeat(np.cumsum(n_steps) - n_steps, n_steps)
+    flat = statistics[rows, steps]
+    return runs, {field: [flat[field]] for field in STATISTICS_DTYPE.names}
+
+
+def read_source(path, source=None):
+    """
+    Read a directory with CSV files or a sweep .npz file.
+    """
+    if os.path.isdir(path):
+        return read_csv_directory(path, source)
+    if path.endswith(".npz"):
+        return read_sweep(path, source)
+    raise ValueError(f"{path} is neither a directory of CSV files nor a sweep .npz file")
+
+
+def _write_store(path, runs, steps):
+    """
+    Write the columns of a store to a new directory and put it in the place
+    of path, so a store is never left half written.
+    """
+    new = path.rstrip(os.sep) + ".new"
+    shutil.rmtree(new, ignore_errors=True)
+    os.makedirs(os.path.join(new, "runs"))
+    os.makedirs(os.path.join(new, "steps"))
+    for name, dtype in RUN_COLUMNS.items():
+        np.save(os.path.join(new, "runs", name + ".npy"), np.asarray(runs[name], dtype=dtype))
+    for name in STATISTICS_DTYPE.names:
+        column = np.concatenate([np.asarray(part, STEP_DTYPES[name]) for part in steps[name]])
+        np.save(os.path.join(new, "steps", name + ".npy"), column)
+    with open(os.path.join(new, "store.json"), "w") as meta:
+        json.dump({"runs": len(runs["n_steps"]), "steps": int(np.sum(runs["n_steps"])),
+                   "statistics": list(STATISTICS_DTYPE.names)}, meta)
+    old = path.rstrip(os.sep) + ".old"
+    if os.path.exists(path):
+        os.replace(path, old)
+    os.replace(new, path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def add_sources(path, sources, replace=False):
+    """
+    Add runs to a store, which is created when it does not exist.
+
+    :param path: Directory of the store.
+    :param sources: List of directories with CSV files and sweep .npz
+                    files.
+    :param replace: Replace the runs of a source which is already in the
+                    store, instead of raising a ValueError.
+    """
+    runs = {name: [] for name in RUN_COLUMNS}
+    steps = {name: [] for name in STATISTICS_DTYPE.names}
+    if os.path.exists(path):
+        store = AnalysisStore(path)
+        keep = np.ones(len(store.runs), dtype=bool)
+        for source_path in sources:
+            name = _source_name(source_path)
+            in_store = store.runs["source"].to_numpy() == name
+            if in_store.any() and not replace:
+                raise ValueError(f"source {name} is already in the store {path}")
+            keep &= ~in_store
+        for name in RUN_COLUMNS:
+            runs[name].extend(store.runs[name].to_numpy()[keep].tolist())
+        rows = keep[store.run_of_step()]
+        for name in STATISTICS_DTYPE.names:
+            steps[name].append(store.column(name)[rows])
+        del store
+    for source_path in sources:
+        new_runs, new_steps = read_source(source_path)
+        for name in RUN_COLUMNS:
+            runs[name].extend(np.asarray(new_runs[name]).tolist())
+        for name in STATISTICS_DTYPE.names:
+            steps[name].extend(new_steps[name])
+    keys = pd.DataFrame({name: runs[name] for name in CONFIG_COLUMNS})
+    duplicated = keys[keys.duplicated(keep=False)]
+    if len(duplicated):
+        raise ValueError(f"{len(duplicated)} runs do not have a unique configuration, "
+                         f"the first is {duplicated.iloc[0].to_dict()}")
+    _write_store(path, runs, steps)
+
+
+def _source_name(path):
+    if os.path.isdir(path):
+        return os.path.basename(os.path.normpath(path))
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class AnalysisStore:
+
+    def __init__(self, path):
+        """
+        Read access to a store written by add_sources.
+
+        :param path: Directory of the store.
+        """
+        self.path = path
+        self.runs = pd.DataFrame({name: np.load(os.path.join(path, "runs", name + ".npy"))
+                                  for name in RUN_COLUMNS})
+        n_steps = self.runs["n_steps"].to_numpy()
+        # Row of the first step of every run in the statistics columns.
+        self.offsets = np.cumsum(n_steps) - n_steps
+        self._columns = {}
+
+    def column(self, name):
+        """
+        Memory-mapped statistics column with the steps of all runs.
+        """
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.path, "steps", name + ".npy"),
+                                          mmap_mode="r")
+        return self._columns[name]
+
+    def run_of_step(self):
+        """
+        Index of the run of every row of the statistics columns.
+        """
+        return np.repeat(np.arange(len(self.runs)), self.runs["n_steps"].to_numpy())
+
+    def select(self, where=None):
+        """
+        Boolean array which is True for the runs matching all conditions.
+
+        :param where: Dict from a run column to a value or a list of
+                      values, e.g. {"n_fighters": 300, "strategy":
+                      ["closest", "random"]}.
+        """
+        selected = np.ones(len(self.runs), dtype=bool)
+        for name, value in (where or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            selected &= self.runs[name].isin(values).to_numpy()
+        return selected
+
+    def per_run(self, name, how="final"):
+        """
+        One value of a statistic for every run, NaN for runs without steps.
+
+        :param name: Statistics column.
+        :param how: "first", "final", "min", "max", "mean" or "sum".
+        """
+        column = self.column(name)
+        n_steps = self.runs["n_steps"].to_numpy()
+        has_steps = n_steps > 0
+        values = np.full(len(n_steps), np.nan)
+        starts = self.offsets[has_steps]
+        if how == "first":
+            values[has_steps] = column[starts]
+        elif how == "final":
+            values[has_steps] = column[starts + n_steps[has_steps] - 1]
+        elif how in ("min", "max", "sum", "mean"):
+            # reduceat needs the rows of the runs with steps only.
+            rows = np.repeat(has_steps, n_steps)
+            data = np.asarray(column)[rows] if not rows.all() else np.asarray(column)
+            starts = np.cumsum(n_steps[has_steps]) - n_steps[has_steps]
+            ufunc = {"min": np.minimum, "max": np.maximum}.get(how, np.add)
+            values[has_steps] = ufunc.reduceat(data, starts)
+            if how == "mean":
+                values[has_steps] /= n_steps[has_steps]
+        else:
+            raise ValueError(f"unknown reduction {how}")
+        return values
+
+    def summary(self, name, how="final", by=("strategy",), where=None):
+        """
+        Mean, standard deviation and number of runs of a per_run value for
+        every group of runs.
+
+        :param by: Run columns to group on.
+        :param where: Conditions on the runs, see select.
+        """
+        selected = self.select(where)
+        data = self.runs.loc[selected, list(by)].copy()
+        data[name] = self.per_run(name, how)[selected]
+        return data.groupby(list(by))[name].agg(["mean", "std", "count"]).reset_index()
+
+    def density_change(self, by=("strategy",), where=None):
+        """
+        Relative change of the tree density between the first and final
+        step of every run, summarised per group of runs as in summary.
+
+        This is not the fraction of the forest which burned: the new trees
+        which grow during a run count too, so with regrowth the change can
+        be positive although trees burned. The statistics files do not keep
+        the number of burned trees.
+        """
+        selected = self.select(where)
+        first = self.per_run("Density Trees", "first")
+        final = self.per_run("Density Trees", "final")
+        data = self.runs.loc[selected, list(by)].copy()
+        data["density_change"] = (final / first - 1)[selected]
+        return data.groupby(list(by))["density_change"].agg(["mean", "std", "count"]).reset_index()
+
+    def distribution(self, name="max_fire_area", by=("strategy",), bins=50, where=None):
+        """
+        Histogram of a statistic over all steps of the runs of every group,
+        with the same bins for every group.
+
+        :param name: Statistics column, e.g. one of the fire area columns.
+        :param bins: Number of bins or array with the bin edges.
+        Returns:
+            Long table with the group columns, the left and right edge of
+            every bin, the count and the density of the group.
+        """
+        selected = self.select(where)
+        groups = self.runs.loc[selected, list(by)].groupby(list(by))
+        codes = np.full(len(self.runs), -1)
+        codes[selected] = groups.ngroup().to_numpy()
+        labels = groups.size().reset_index()[list(by)]
+        code_of_step = codes[self.run_of_step()]
+        rows = code_of_step >= 0
+        values = np.asarray(self.column(name))[rows]
+        code_of_step = code_of_step[rows]
+        edges = np.histogram_bin_edges(values, bins)
+        n_bins = len(edges) - 1
+        place = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, n_bins - 1)
+        counts = np.bincount(code_of_step * n_bins + place,
+                             minlength=len(labels) * n_bins).reshape(len(labels), n_bins)
+        totals = counts.sum(axis=1, keepdims=True)
+        density = counts / np.maximum(totals, 1) / np.diff(edges)
+        table = labels.iloc[np.repeat(np.arange(len(labels)), n_bins)]
+        table = table.reset_index(drop=True)
+        table["bin_left"] = np.tile(edges[:-1], len(labels))
+        table["bin_right"] = np.tile(edges[1:], len(labels))
+        table["count"] = counts.ravel()
+        table["density"] = density.ravel()
+        return table
+
+    def table(self, columns, where=None):
+        """
+        Long table with one row per step of the selected runs, with the
+        configuration of the run and the given statistics columns.
+        """
+        selected = self.select(where)
+        run_of_step = self.run_of_step()
+        rows = selected[run_of_step]
+        run_of_step = run_of_step[rows]
+        data = {name: self.runs[name].to_numpy()[run_of_step] for name in CONFIG_COLUMNS}
+        data["step"] = np.arange(len(rows))[rows] - self.offsets[run_of_step]
+        for name in columns:
+            data[name] = np.asarray(self.column(name))[rows]
+        return pd.DataFrame(data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect an analysis store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="add directories with CSV files or sweep .npz "
+                                          "files to a store, creating it when needed")
+    add.add_argument("store")
+    add.add_argument("sources", nargs="+")
+    add.add_argument("--replace", action="store_true",
+                     help="replace the runs of sources which are already in the store")
+    info = commands.add_parser("info", help="show the runs per source and strategy")
+    info.add_argument("store")
+    args = parser.parse_args(argv)
+
+    if args.command == "add":
+        add_sources(args.store, args.sources, replace=args.replace)
+    store = AnalysisStore(args.store)
+    print(f"{args.store}: {len(store.runs)} runs, {store.runs['n_steps'].sum()} steps")
+    if args.command == "info":
+        print(store.runs.groupby(["source", "strategy"]).size().to_string())
+
+
+if __name__ == "__main__":
+    main()
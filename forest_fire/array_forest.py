@@ -0,0 +1,411 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Array-backed forest state. Instead of one Tree agent per cell,
+             the condition, hp and burn rate of all trees are kept in dense
+             NumPy arrays shaped like the grid, and the Tree.step logic
+             (ignition of neighbours, hp decay, burn-out and removal) is
+             applied to the whole grid at once. With a leading replicate
+             axis the arrays hold several independent forests, which are
+             stepped together.
+"""
+import warnings
+
+import numpy as np
+
+from . import kernels
+
+# Integer codes of the tree conditions, 0 means there is no tree.
+EMPTY = 0
+FINE = 1
+ON_FIRE = 2
+BURNED = 3
+
+CONDITION_CODES = {"Fine": FINE, "On fire": ON_FIRE, "Burned": BURNED}
+CONDITION_LABELS = {code: label for label, code in CONDITION_CODES.items()}
+
+
+class ArrayForest:
+
+    def __init__(self, width, height, max_hp, replicates=None, compiled=False):
+        """
+        Class which holds the state of every tree on the grid.
+
+        :param width: Width of the grid (first array axis, x).
+        :param height: Height of the grid (second array axis, y).
+        :param max_hp: The hp of a newly planted tree.
+        :param replicates: Number of independent forests, which get a
+                           leading replicate axis in the arrays. None keeps
+                           one forest without that axis.
+        :param compiled: Step the trees with the Numba kernel of kernels.
+                         Without Numba a warning is given and the NumPy
+                         implementation is used.
+
+        Cells are flat indices into the arrays, so with replicates cell
+        r * width * height + x * height + y lies in forest r.
+        """
+        self.width = width
+        self.height = height
+        self.max_hp = max_hp
+        self.replicates = replicates
+        if compiled and kernels.spread_step is None:
+            warnings.warn("Numba is not installed, the trees are stepped with NumPy")
+            compiled = False
+        self.compiled = compiled
+        shape = (width, height) if replicates is None else (replicates, width, height)
+
+        self.condition = np.zeros(shape, dtype=np.int8)
+        self.hp = np.zeros(shape, dtype=np.int16)
+        self.burn_rate = np.zeros(shape, dtype=np.uint8)
+
+        # Number of cells per condition code, updated on every transition.
+        # With replicates every count is an array with one value per forest.
+        if replicates is None:
+            self.counts = [width * height, 0, 0, 0]
+        else:
+            self.counts = np.zeros((4, replicates), dtype=np.int64)
+            self.counts[EMPTY] = width * height
+
+        # Optional FireClusterTracker and FireIndex which are told about
+        # every tree that starts or stops burning, and optional CellIndex of
+        # the empty cells.
+        self.clusters = None
+        self.fire_index = None
+        self.empty_cells = None
+
+        # Flat indices of the trees which are on fire (may still contain
+        # extinguished trees, which are filtered out at the next step) and of
+        # the trees which burned down in the last step.
+        self.burning = np.zeros(0, dtype=np.intp)
+        self.burned = np.zeros(0, dtype=np.intp)
+
+        # Scratch arrays used during a step, only touched cells are reset.
+        self._ignition_time = np.full(self.condition.size, np.inf)
+        self._activation_time = np.full(self.condition.size, np.nan)
+        self._active = np.zeros(self.condition.size, dtype=bool)
+
+    def tally(self, cells):
+        """
+        Number of cells in an array of flat cells, per forest when there are
+        replicates.
+        """
+        if self.replicates is None:
+            return len(cells)
+        return np.bincount(cells // (self.width * self.height), minlength=self.replicates)
+
+    def plant(self, cells):
+        """
+        Plant new trees with full hp.
+
+        :param cells: Flat cell indices of empty cells.
+        """
+        planted = self.tally(cells)
+        self.counts[EMPTY] -= planted
+        self.counts[FINE] += planted
+        if self.empty_cells is not None:
+            self.empty_cells.remove_many(cells)
+        self.condition.ravel()[cells] = FINE
+        self.hp.ravel()[cells] = self.max_hp
+        self.burn_rate.ravel()[cells] = 0
+
+    def restore(self, condition, hp, burn_rate, active=None):
+        """
+        Set the state of every cell of an empty forest at once.
+
+        :param condition: Array with the condition code of every cell.
+        :param hp: Array with the hp of every cell.
+        :param burn_rate: Array with the burn rate of every cell.
+        :param active: Flat cells on fire or burned, in the order of the
+                       burning and burned arrays, by default in cell order.
+        """
+        self.condition[...] = condition
+        self.hp[...] = hp
+        self.burn_rate[...] = burn_rate
+        if self.replicates is None:
+            self.counts = np.bincount(self.condition.ravel(), minlength=4).tolist()
+        else:
+            self.counts = np.stack([self.scan(code) for code in range(4)])
+        if self.empty_cells is not None:
+            self.empty_cells.remove_many(np.flatnonzero(self.condition))
+        if active is None:
+            active = np.flatnonzero(self.condition >= ON_FIRE)
+        active = np.asarray(active, dtype=np.intp)
+        self.burning = active[self.condition.ravel()[active] == ON_FIRE]
+        self.burned = active[self.condition.ravel()[active] == BURNED]
+        if self.clusters is not None:
+            for cell in self.burning.tolist():
+                self.clusters.add(cell)
+        if self.fire_index is not None:
+            self.fire_index.add_many(self.burning)
+
+    def ignite(self, cell, rng, ignition_prob, max_burn_rate, start=False):
+        """
+        Ignite the tree on a flat cell index, mirrors Tree._ignite.
+
+        :param start: When starting no probability is applied.
+        """
+        was_on_fire = self.condition.flat[cell] == ON_FIRE
+        if start:
+            self.condition.flat[cell] = ON_FIRE
+        if rng.random() < ignition_prob:
+            self.condition.flat[cell] = ON_FIRE
+            self.burn_rate.flat[cell] = rng.integers(1, max_burn_rate)
+        if self.condition.flat[cell] == ON_FIRE and not was_on_fire:
+            ignited = self.tally(np.array([cell]))
+            self.counts[FINE] -= ignited
+            self.counts[ON_FIRE] += ignited
+            self.burning = np.append(self.burning, cell)
+            if self.clusters is not None:
+                self.clusters.add(cell)
+            if self.fire_index is not None:
+                self.fire_index.add_many(np.array([cell]))
+
+    def extinguish(self, pos, strength):
+        """
+        Lower the burn rate of a burning tree, mirrors Tree._extinguish.
+
+        :param pos: Coordinate of the tree.
+        :param strength: Amount subtracted from the burn rate.
+        """
+        burn_rate = int(self.burn_rate[pos]) - strength
+        if burn_rate <= 0:
+            self.burn_rate[pos] = 0
+            self.condition[pos] = FINE
+            self.counts[ON_FIRE] -= 1
+            self.counts[FINE] += 1
+            if self.clusters is not None:
+                x, y = pos
+                self.clusters.remove(x * self.height + y, "extinguished")
+            if self.fire_index is not None:
+                self.fire_index.remove(pos)
+        else:
+            self.burn_rate[pos] = burn_rate
+
+    def extinguish_many(self, cells, strengths):
+        """
+        Lower the burn rate of an array of distinct burning trees at once.
+
+        :param cells: Flat indices of the trees.
+        :param strengths: Amount subtracted from the burn rate of each tree.
+        """
+        burn_rate = self.burn_rate.ravel()[cells].astype(np.int64) - strengths
+        out = cells[burn_rate <= 0]
+        self.burn_rate.ravel()[cells] = np.maximum(burn_rate, 0)
+        self.condition.ravel()[out] = FINE
+        n_out = self.tally(out)
+        self.counts[ON_FIRE] -= n_out
+        self.counts[FINE] += n_out
+        if self.clusters is not None:
+            for cell in out.tolist():
+                self.clusters.remove(cell, "extinguished")
+        if self.fire_index is not None:
+            self.fire_index.remove_many(out)
+
+    def scan(self, code):
+        """
+        Number of cells with the given condition code, by scanning the grid.
+        """
+        if self.replicates is not None:
+            return np.count_nonzero(self.condition == code, axis=(1, 2))
+        return int(np.count_nonzero(self.condition == code))
+
+    def cell_values(self, name, cells):
+        """
+        Values of the condition, hp or burn_rate array on flat cells.
+        """
+        return getattr(self, name).ravel()[cells]
+
+    def neighbours(self, cells):
+        """
+        Von Neumann neighbours of flat cell indices.
+
+        :param cells: Flat cell indices.
+        Returns:
+            Tuple (source, neighbour) of equally long arrays, where source
+            indexes into cells and neighbour is the flat index of a neighbour
+            which lies on the grid.
+        """
+        x, y = np.divmod(cells, self.height)
+        if self.replicates is not None:
+            x %= self.width
+        sources = []
+        targets = []
+        for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            valid = ((x + dx >= 0) & (x + dx < self.width)
+                     & (y + dy >= 0) & (y + dy < self.height))
+            index = np.flatnonzero(valid)
+            sources.append(index)
+            targets.append(cells[index] + dx * self.height + dy)
+        return np.concatenate(sources), np.concatenate(targets)
+
+    def step(self, rng, ignition_prob, max_burn_rate, incoming=None):
+        """
+        Proceed all trees one step, equivalent in distribution to stepping
+        Tree agents in random order.
+
+        Every tree gets an activation time in [0, 1), its place in the random
+        order. A burning tree tries to ignite its fine neighbours at its
+        activation time, so a neighbour ignites at the earliest successful
+        attempt. A tree ignited earlier in the step than its own activation
+        time spreads and burns in this step as well, which is repeated until
+        no more trees get ignited. The compiled kernel visits the trees one
+        at a time in the order of their activation times instead.
+
+        Only the trees on fire and their neighbours are visited, so the cost
+        of a step grows with the fire front instead of the forest size.
+
+        :param incoming: Optional flat cells which a burning tree outside
+                         the forest tries to ignite in this step, once per
+                         burning neighbour, e.g. from the halo of a strip of
+                         a larger grid. They are only handled by the NumPy
+                         step.
+        Returns:
+            Flat indices of the trees ignited in this step.
+        """
+        condition = self.condition.ravel()
+
+        # Burned trees are removed from the grid.
+        removed = self.tally(self.burned)
+        self.counts[BURNED] -= removed
+        self.counts[EMPTY] += removed
+        if self.empty_cells is not None:
+            self.empty_cells.add_many(self.burned)
+
+        burning = self.burning[condition[self.burning] == ON_FIRE]
+        if self.compiled and incoming is None:
+            ignited, burnt = kernels.spread_step(
+                condition, self.hp.ravel(), self.burn_rate.ravel(), burning, self.burned,
+                self.width, self.height, ignition_prob, max_burn_rate, rng.integers(2 ** 32))
+            ignited, burnt = np.sort(ignited), np.sort(burnt)
+        else:
+            condition[self.burned] = EMPTY
+            ignited, burnt = self._spread(burning, rng, ignition_prob, max_burn_rate, incoming)
+
+        n_ignited, n_burnt = self.tally(ignited), self.tally(burnt)
+        self.counts[FINE] -= n_ignited
+        self.counts[ON_FIRE] += n_ignited - n_burnt
+        self.counts[BURNED] += n_burnt
+        if self.clusters is not None:
+            for cell in ignited.tolist():
+                self.clusters.add(cell)
+            for cell in burnt.tolist():
+                self.clusters.remove(cell)
+        if self.fire_index is not None:
+            self.fire_index.add_many(ignited)
+            self.fire_index.remove_many(burnt)
+
+        on_fire = np.concatenate((burning, ignited))
+        self.burning = on_fire[condition[on_fire] == ON_FIRE]
+        self.burned = burnt
+        return ignited
+
+    def _spread(self, burning, rng, ignition_prob, max_burn_rate, incoming=None):
+        """
+        Spread the fire and burn down the trees of a step in array form, see
+        step.
+
+        :param burning: Flat cells of the trees on fire.
+        :param incoming: Optional flat cells which a burning tree outside
+                         the forest tries to ignite, at a random time.
+        Returns:
+            Flat indices of the trees ignited and of the trees burned down.
+        """
+        condition = self.condition.ravel()
+        hp = self.hp.ravel()
+        burn_rate = self.burn_rate.ravel()
+
+        active = burning
+        active_time = rng.random(len(burning))
+        self._active[burning] = True
+        touched = []
+        newly_active = [burning]
+        if incoming is not None:
+            incoming_time = rng.random(len(incoming))
+
+        while len(active) > 0 or incoming is not None:
+            source, target = self.neighbours(active)
+            times = active_time[source]
+            if incoming is not None:
+                # The attempts from outside join the first round.
+                target = np.concatenate((target, incoming))
+                times = np.concatenate((times, incoming_time))
+                incoming = None
+            fine = condition[target] == FINE
+            target, times = target[fine], times[fine]
+            success = rng.random(len(target)) < ignition_prob
+            target, times = target[success], times[success]
+            if len(target) == 0:
+                break
+
+            before = self._ignition_time[target]
+            np.minimum.at(self._ignition_time, target, times)
+            changed = np.unique(target[self._ignition_time[target] < before])
+            touched.append(changed)
+
+            # Draw the activation time of a tree the first time it ignites.
+            undrawn = changed[np.isnan(self._activation_time[changed])]
+            self._activation_time[undrawn] = rng.random(len(undrawn))
+
+            candidates = changed[~self._active[changed]]
+            acts = (self._activation_time[candidates]
+                    > self._ignition_time[candidates])
+            active = candidates[acts]
+            active_time = self._activation_time[active]
+            self._active[active] = True
+            newly_active.append(active)
+
+        ignited = np.unique(np.concatenate(touched)) if touched else burning[:0]
+        condition[ignited] = ON_FIRE
+        burn_rate[ignited] = rng.integers(1, max_burn_rate, len(ignited))
+
+        # Every tree that was on fire at its activation time burns down.
+        acted = np.concatenate(newly_active)
+        hp[acted] -= burn_rate[acted].astype(np.int16)
+        burnt = acted[hp[acted] <= 0]
+        hp[burnt] = 0
+        condition[burnt] = BURNED
+
+        self._ignition_time[ignited] = np.inf
+        self._activation_time[ignited] = np.nan
+        self._active[acted] = False
+        return ignited, burnt
+
+
+class TreeCell:
+    """
+    Lightweight stand-in for a Tree agent on one cell of an ArrayForest, so
+    the firefighters can handle both model backends in the same way.
+    """
+    __slots__ = ("forest", "pos")
+
+    def __init__(self, forest, pos):
+        self.forest = forest
+        self.pos = pos
+
+    @property
+    def condition(self):
+        return CONDITION_LABELS[int(self.forest.condition[self.pos])]
+
+    @property
+    def hp(self):
+        return int(self.forest.hp[self.pos])
+
+    @property
+    def burn_rate(self):
+        return int(self.forest.burn_rate[self.pos])
+
+    def _get_pos(self):
+        return self.pos
+
+    def _extinguish(self, firefighter):
+        """
+        Method for extinghuising a tree
+
+        :param firefighter: The firefighter which is currently extinghuising
+                            the tree.
+        """
+        if firefighter.strategy != 'call_plane':
+            self.forest.extinguish(self.pos, firefighter.extg_strength)
+        else:
+            self.forest.extinguish(self.pos, firefighter.extg_strength*5)
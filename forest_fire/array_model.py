@@ -0,0 +1,177 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: ForestFire model with an array backend for the trees. The trees
+             are not agents, but cells of an ArrayForest which are stepped
+             all at once. Firefighters are agents on the MESA grid, or a
+             FireFighterBatch which steps them all at once. The agent based
+             ForestFire stays the reference implementation.
+"""
+import numpy as np
+
+from .model import ForestFire
+from .array_forest import (ArrayForest, TreeCell, EMPTY, FINE, ON_FIRE,
+                           BURNED, CONDITION_CODES)
+from .firefighter_batch import FireFighterBatch, grid_rows
+
+
+class ArrayForestFire(ForestFire):
+
+    def __init__(self, *args, batch_fighters=False, compiled=False, **kwargs):
+        """
+        Create a forest fire model with the array backend, takes the same
+        parameters as ForestFire.
+
+        :param batch_fighters: Step the firefighters in array form with a
+                               FireFighterBatch instead of as agents.
+        :param compiled: Step the trees with the Numba kernel when Numba is
+                         installed, see ArrayForest.
+        """
+        self.batch_fighters = batch_fighters
+        self.compiled = compiled
+        self.fighter_batch = None
+        super().__init__(*args, **kwargs)
+
+    def _init_backend(self):
+        """
+        Create the ArrayForest which holds the trees.
+        """
+        self.forest = ArrayForest(self.width, self.height, self.max_hp, compiled=self.compiled)
+        self.forest.clusters = self.fire_clusters
+        self.forest.empty_cells = self.empty_cells
+        self.forest.fire_index = self.fire_index
+
+    def _init_trees(self):
+        """
+        Init trees on every coordinate under a certain probability.
+        """
+        density_mask = self.layout_rng.random((self.width, self.height)) < self.density_trees
+        self.forest.plant(np.flatnonzero(density_mask))
+
+    def _init_fire(self):
+        """
+        Init a fire on a random spot on the field.
+        """
+        cells = np.flatnonzero(self.forest.condition == FINE)
+        cell = cells[self.layout_rng.integers(len(cells))]
+        self.forest.ignite(cell, self.rng, self.ignition_prob,
+                           self.max_burn_rate, start=True)
+
+    def _place_firefighters(self, xs, ys, fires_extg=None):
+        """
+        Place firefighters on the grid, as agents or as a FireFighterBatch.
+        """
+        if not self.batch_fighters:
+            super()._place_firefighters(xs, ys, fires_extg)
+            return
+        self.fighter_batch = FireFighterBatch(
+            self, xs, ys,
+            extg_strength=self.extg_strength,
+            strategy=self.strategy
+        )
+        if fires_extg is not None:
+            self.fighter_batch.fires_extg[:] = fires_extg
+
+    def _firefighter_arrays(self):
+        """
+        Arrays with the x and y coordinates of the firefighters and the
+        number of fires each of them extinguished.
+        """
+        if self.fighter_batch is None:
+            return super()._firefighter_arrays()
+        batch = self.fighter_batch
+        return batch.x.copy(), batch.y.copy(), batch.fires_extg.copy()
+
+    def _place_trees(self, condition, hp, burn_rate, active=None):
+        """
+        Set the state of all trees at once, see ForestFire._place_trees.
+        """
+        self.forest.restore(condition, hp, burn_rate, active)
+
+    def _active_cells(self):
+        """
+        Flat cells of the trees on fire, in the order in which they are
+        stepped, followed by the trees which burned down in the last step.
+        """
+        burning = self.forest.burning
+        burning = burning[self.forest.condition.ravel()[burning] == ON_FIRE]
+        return np.concatenate((burning, self.forest.burned)).astype(np.int64)
+
+    def _tree_arrays(self):
+        """
+        Copies of the condition, hp and burn rate arrays of the forest.
+        """
+        return self.forest.condition.copy(), self.forest.hp.copy(), self.forest.burn_rate.copy()
+
+    def _step_firefighters(self):
+        """
+        Proceed all firefighters one step.
+        """
+        if self.fighter_batch is None:
+            super()._step_firefighters()
+        else:
+            self.fighter_batch.step(self.rng)
+
+    def _firefighter_cells(self):
+        """
+        Flat indices of the cells with a firefighter on them.
+        """
+        if self.fighter_batch is None:
+            return super()._firefighter_cells()
+        return self.fighter_batch.x * self.height + self.fighter_batch.y
+
+    def plant_new_trees(self, regrowth_rate):
+        """
+        At every time step, plant an random amount of new trees, the whole
+        batch at once.
+        """
+        self.forest.plant(self._regrowth_cells(regrowth_rate))
+
+    def _step_trees(self):
+        """
+        Proceed all trees one step at once.
+        """
+        # The trees on fire look up their neighbours, like Tree.step does.
+        counts = self.forest.counts
+        self.profiler.count("tree_steps", np.sum(counts[ON_FIRE] + counts[BURNED]))
+        self.profiler.count("tree_neighbour_queries", np.sum(counts[ON_FIRE]))
+        self.forest.step(self.rng, self.ignition_prob, self.max_burn_rate)
+
+    def get_burning_trees(self, pos, moore, radius, include_center=False):
+        """
+        Return the trees on fire in the neighbourhood of a position, in the
+        same order as the MESA grid returns them.
+        """
+        xs, ys = self.fire_index.query(pos, radius, moore, include_center)
+        return [TreeCell(self.forest, (x, y)) for x, y in zip(xs.tolist(), ys.tolist())]
+
+    def fire_distance(self, xs, ys):
+        """
+        Distance to the fire of coordinates, looked up in the distance field
+        of the current step, see ForestFire.get_distance_field. With
+        replicates the x coordinates are global rows, see grid_rows.
+        """
+        return grid_rows(self.get_distance_field())[xs, ys]
+
+    def count_trees(self):
+        """
+        Number of trees currently on the grid.
+        """
+        return self.width * self.height - self.forest.counts[EMPTY]
+
+    def get_numeric_representation_of_grid(self):
+        return (self.forest.condition == ON_FIRE).astype(np.int8)
+
+    def _condition_count(self, tree_condition):
+        """
+        Read the counter of trees in a given condition.
+        """
+        return self.forest.counts[CONDITION_CODES[tree_condition]]
+
+    @staticmethod
+    def scan_type(model, tree_condition):
+        """
+        Count trees in a given condition by scanning the grid.
+        """
+        return model.forest.scan(CONDITION_CODES[tree_condition])
@@ -0,0 +1,186 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Set of grid cells with constant time add, remove and random
+             sampling. The cells are kept in a dense array together with the
+             position of every cell in that array, a removed cell is
+             replaced by the last cell of the array.
+"""
+import numpy as np
+
+
+class CellIndex:
+
+    def __init__(self, n_cells, full=False):
+        """
+        Class which represents a set of flat cell indices.
+
+        :param n_cells: Number of cells on the grid.
+        :param full: Start with all cells in the set instead of none.
+        """
+        self.cells = np.arange(n_cells, dtype=np.int64)
+        if full:
+            self.position = np.arange(n_cells, dtype=np.int64)
+            self.size = n_cells
+        else:
+            self.position = np.full(n_cells, -1, dtype=np.int64)
+            self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, cell):
+        return self.position[cell] >= 0
+
+    def add(self, cell):
+        """
+        Add a cell, if it is not in the set yet.
+        """
+        if self.position[cell] >= 0:
+            return
+        self.cells[self.size] = cell
+        self.position[cell] = self.size
+        self.size += 1
+
+    def remove(self, cell):
+        """
+        Remove a cell, if it is in the set.
+        """
+        index = self.position[cell]
+        if index < 0:
+            return
+        self.size -= 1
+        last = self.cells[self.size]
+        self.cells[index] = last
+        self.position[last] = index
+        self.position[cell] = -1
+
+    def add_many(self, cells):
+        """
+        Add an array of distinct cells which are not in the set yet.
+        """
+        new_size = self.size + len(cells)
+        self.cells[self.size:new_size] = cells
+        self.position[cells] = np.arange(self.size, new_size)
+        self.size = new_size
+
+    def remove_many(self, cells):
+        """
+        Remove an array of distinct cells which are all in the set.
+        """
+        new_size = self.size - len(cells)
+        positions = self.position[cells]
+        self.position[cells] = -1
+        # Cells left behind the new end fill the holes in front of it.
+        holes = positions[positions < new_size]
+        tail = self.cells[new_size:self.size]
+        movers = tail[self.position[tail] >= 0]
+        self.cells[holes] = movers
+        self.position[movers] = holes
+        self.size = new_size
+
+    def reset(self, cells):
+        """
+        Replace the content of the set by an array of distinct cells, which
+        are kept in the given order.
+        """
+        self.position[self.cells[:self.size]] = -1
+        self.size = len(cells)
+        self.cells[:self.size] = cells
+        self.position[self.cells[:self.size]] = np.arange(self.size)
+
+    def to_array(self):
+        """
+        Copy of the cells in the set, in no particular order.
+        """
+        return self.cells[:self.size].copy()
+
+    def sample(self, k, rng, exclude=None):
+        """
+        Draw up to k distinct random cells from the set in one batch.
+
+        :param k: Number of cells to draw.
+        :param rng: NumPy random generator.
+        :param exclude: Optional array of cells which may not be drawn, even
+                        when they are in the set.
+        Returns:
+            Array of min(k, available) cells.
+        """
+        if exclude is None or len(exclude) == 0:
+            chosen = rng.choice(self.size, size=min(k, self.size), replace=False)
+            return self.cells[chosen]
+
+        exclude = np.unique(exclude)
+        available = self.size - np.count_nonzero(self.position[exclude] >= 0)
+        k = min(k, available)
+        drawn = np.zeros(0, dtype=np.int64)
+        while len(drawn) < k:
+            chosen = self.cells[rng.choice(self.size, size=min(k, self.size), replace=False)]
+            chosen = chosen[~np.isin(chosen, exclude) & ~np.isin(chosen, drawn)]
+            drawn = np.concatenate((drawn, chosen[:k - len(drawn)]))
+        return drawn
+
+
+class ReplicateCellIndex:
+
+    def __init__(self, replicates, n_cells, full=False):
+        """
+        Class which represents a set of flat cell indices for every forest of
+        an ArrayForest with replicates, one CellIndex per forest.
+
+        :param replicates: Number of forests.
+        :param n_cells: Number of cells of one forest.
+        :param full: Start with all cells in the set instead of none.
+
+        Cells are flat indices over all forests, r * n_cells + cell.
+        """
+        self.n_cells = n_cells
+        self.indices = [CellIndex(n_cells, full) for _ in range(replicates)]
+
+    def __len__(self):
+        return sum(len(index) for index in self.indices)
+
+    def _split(self, cells):
+        """
+        Split flat cells into the forests, for every forest which has any
+        the forest and its cells.
+        """
+        replicate, cells = np.divmod(np.asarray(cells), self.n_cells)
+        order = np.argsort(replicate, kind="stable")
+        bounds = np.searchsorted(replicate[order], np.arange(len(self.indices) + 1))
+        for r in np.flatnonzero(np.diff(bounds)):
+            yield r, cells[order[bounds[r]:bounds[r + 1]]]
+
+    def add_many(self, cells):
+        """
+        Add an array of distinct cells which are not in the set yet.
+        """
+        for r, part in self._split(cells):
+            self.indices[r].add_many(part)
+
+    def remove_many(self, cells):
+        """
+        Remove an array of distinct cells which are all in the set.
+        """
+        for r, part in self._split(cells):
+            self.indices[r].remove_many(part)
+
+    def sample(self, k, rng, exclude=None, replicates=None):
+        """
+        Draw up to k distinct random cells from the set of every forest.
+
+        :param exclude: Optional array of flat cells which may not be drawn.
+        :param replicates: Forests to draw from, by default all of them.
+        Returns:
+            Array with the flat cells drawn in all forests.
+        """
+        excluded = [None] * len(self.indices)
+        if exclude is not None:
+            for r, part in self._split(exclude):
+                excluded[r] = part
+        if replicates is None:
+            replicates = range(len(self.indices))
+        drawn = [self.indices[r].sample(k, rng, exclude=excluded[r]) + r * self.n_cells
+                 for r in replicates]
+        return np.concatenate(drawn) if drawn else np.zeros(0, dtype=np.int64)
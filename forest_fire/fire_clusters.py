@@ -0,0 +1,193 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Incremental labelling of the fires on the grid. A fire is a
+             cluster of burning trees connected through the Von Neumann
+             neighbourhood. Clusters are merged when a tree ignites and are
+             rebuilt when a tree stops burning, so the fire areas are known
+             every step without labelling the whole grid, and every fire can
+             be followed over its lifetime.
+"""
+import numpy as np
+
+
+class FireClusterTracker:
+
+    def __init__(self, width, height):
+        """
+        Class which keeps track of the fire clusters on a grid.
+
+        :param width: Width of the grid.
+        :param height: Height of the grid.
+
+        Cells are flat indices, x * height + y.
+        """
+        self.width = width
+        self.height = height
+        self.current_step = 0
+
+        self.cluster_of = np.full(width * height, -1, dtype=np.int64)
+        self.members = {}
+        self.records = {}
+        self._next_id = 0
+        self._dirty = set()
+
+    def set_step(self, step):
+        """
+        Set the model step, used for the lifetimes of the clusters.
+        """
+        self.current_step = step
+
+    def _neighbours(self, cell):
+        x, y = divmod(cell, self.height)
+        if x > 0:
+            yield cell - self.height
+        if x < self.width - 1:
+            yield cell + self.height
+        if y > 0:
+            yield cell - 1
+        if y < self.height - 1:
+            yield cell + 1
+
+    def _new_cluster(self, cells, parent=None):
+        cluster_id = self._next_id
+        self._next_id += 1
+        self.members[cluster_id] = cells
+        self.cluster_of[list(cells)] = cluster_id
+        self.records[cluster_id] = {
+            "id": cluster_id,
+            "parent": parent,
+            "born": self.current_step,
+            "died": None,
+            "fate": "alive",
+            "peak_size": len(cells),
+            "ignitions": len(cells),
+        }
+        return cluster_id
+
+    def _end_cluster(self, cluster_id, fate):
+        del self.members[cluster_id]
+        self._dirty.discard(cluster_id)
+        record = self.records[cluster_id]
+        if fate == "merged" and record["born"] == self.current_step:
+            # Never seen on its own at the end of a step.
+            del self.records[cluster_id]
+            return
+        record["died"] = self.current_step
+        record["fate"] = fate
+
+    def add(self, cell):
+        """
+        A tree started burning: join it with the fires next to it.
+
+        :param cell: Flat index of the cell.
+        """
+        if self.cluster_of[cell] >= 0:
+            return
+        clusters = {self.cluster_of[neighbour] for neighbour in self._neighbours(cell)}
+        clusters.discard(-1)
+        if not clusters:
+            self._new_cluster({cell})
+            return
+
+        # The biggest fire absorbs the others, so only small fires relabel.
+        clusters = sorted(clusters, key=lambda c: (-len(self.members[c]), c))
+        cluster_id = clusters[0]
+        members = self.members[cluster_id]
+        record = self.records[cluster_id]
+        for other in clusters[1:]:
+            other_members = self.members[other]
+            self.cluster_of[list(other_members)] = cluster_id
+            members |= other_members
+            # A fire which still burns always has its record.
+            other_record = self.records[other]
+            record["ignitions"] += other_record["ignitions"]
+            other_record["merged_into"] = int(cluster_id)
+            if other in self._dirty:
+                self._dirty.add(cluster_id)
+            self._end_cluster(other, "merged")
+        members.add(cell)
+        self.cluster_of[cell] = cluster_id
+        record["ignitions"] += 1
+        record["peak_size"] = max(record["peak_size"], len(members))
+
+    def remove(self, cell, fate="burned out"):
+        """
+        A tree stopped burning, its fire may have split up or died out.
+
+        :param cell: Flat index of the cell.
+        :param fate: How the fire ended when this was its last tree.
+        """
+        cluster_id = self.cluster_of[cell]
+        if cluster_id < 0:
+            return
+        self.cluster_of[cell] = -1
+        members = self.members[cluster_id]
+        members.discard(cell)
+        if not members:
+            self._end_cluster(cluster_id, fate)
+        else:
+            self._dirty.add(cluster_id)
+
+    def refresh(self):
+        """
+        Rebuild the fires which lost trees, splitting them when they are no
+        longer connected. The biggest part keeps the id of the fire.
+        """
+        for cluster_id in self._dirty:
+            members = self.members[cluster_id]
+            unvisited = set(members)
+            parts = []
+            while unvisited:
+                start = unvisited.pop()
+                part = {start}
+                stack = [start]
+                while stack:
+                    for neighbour in self._neighbours(stack.pop()):
+                        if neighbour in unvisited:
+                            unvisited.discard(neighbour)
+                            part.add(neighbour)
+                            stack.append(neighbour)
+                parts.append(part)
+            if len(parts) == 1:
+                continue
+            parts.sort(key=len, reverse=True)
+            self.members[cluster_id] = parts[0]
+            for part in parts[1:]:
+                self._new_cluster(part, parent=int(cluster_id))
+        self._dirty.clear()
+
+    def sizes(self):
+        """
+        Sizes of the current fires, in the same order as ids().
+        """
+        self.refresh()
+        return np.array([len(members) for members in self.members.values()], dtype=np.int64)
+
+    def ids(self):
+        """
+        Ids of the current fires.
+        """
+        self.refresh()
+        return np.array(list(self.members), dtype=np.int64)
+
+    def get_cluster_statistics(self):
+        """
+        Lifetime statistics of every fire seen so far, alive or not.
+
+        Returns:
+            List of dicts with the id, parent (fire it split from), born and
+            died step, lifetime, fate ("alive", "burned out", "extinguished"
+            or "merged"), peak size and number of ignitions of each fire.
+        """
+        self.refresh()
+        statistics = []
+        for cluster_id, record in self.records.items():
+            record = dict(record)
+            if cluster_id in self.members:
+                record["peak_size"] = max(record["peak_size"], len(self.members[cluster_id]))
+            died = record["died"] if record["died"] is not None else self.current_step
+            record["lifetime"] = died - record["born"]
+            statistics.append(record)
+        return statistics
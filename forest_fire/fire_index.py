@@ -0,0 +1,235 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Spatial index of the burning trees, shared by all firefighters.
+             It keeps a bitmap of the burning cells and the number of
+             burning cells per square tile, so a search around a position
+             only looks at burning cells and skips tiles without fire,
+             instead of visiting every agent in the search radius. With a
+             leading replicate axis it indexes several independent forests.
+             The functions and FireDistance below do the same for a list of
+             burning cells, without a bitmap of the whole grid.
+"""
+import numpy as np
+from scipy import ndimage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+
+class FireIndex:
+
+    def __init__(self, width, height, tile_size=8, replicates=None):
+        """
+        Class which indexes the burning cells of a grid.
+
+        :param width: Width of the grid.
+        :param height: Height of the grid.
+        :param tile_size: Size of the square tiles used to skip areas without
+                          fire in searches with a large radius.
+        :param replicates: Number of independent forests, see ArrayForest.
+                           Searches with query are only done without them.
+        """
+        self.width = width
+        self.height = height
+        self.tile_size = tile_size
+        leading = () if replicates is None else (replicates,)
+        self.mask = np.zeros(leading + (width, height), dtype=bool)
+        self.tile_counts = np.zeros(leading + (-(-width // tile_size), -(-height // tile_size)),
+                                    dtype=np.int32)
+
+    def add(self, pos):
+        """
+        Mark the cell on a coordinate as burning.
+        """
+        x, y = pos
+        if not self.mask[x, y]:
+            self.mask[x, y] = True
+            self.tile_counts[x // self.tile_size, y // self.tile_size] += 1
+
+    def remove(self, pos):
+        """
+        Mark the cell on a coordinate as not burning.
+        """
+        x, y = pos
+        if self.mask[x, y]:
+            self.mask[x, y] = False
+            self.tile_counts[x // self.tile_size, y // self.tile_size] -= 1
+
+    def add_many(self, cells):
+        """
+        Mark an array of distinct flat cells, which are not burning, as
+        burning.
+        """
+        self.mask.ravel()[cells] = True
+        np.add.at(self.tile_counts.ravel(), self._tiles(cells), 1)
+
+    def remove_many(self, cells):
+        """
+        Mark an array of distinct flat cells, which are burning, as not
+        burning.
+        """
+        self.mask.ravel()[cells] = False
+        np.subtract.at(self.tile_counts.ravel(), self._tiles(cells), 1)
+
+    def _tiles(self, cells):
+        """
+        Flat indices into tile_counts of the tiles of flat cells.
+        """
+        replicate, cells = np.divmod(cells, self.width * self.height)
+        x, y = np.divmod(cells, self.height)
+        tiles_x, tiles_y = self.tile_counts.shape[-2:]
+        return (replicate * tiles_x + x // self.tile_size) * tiles_y + y // self.tile_size
+
+    def query(self, pos, radius, moore=True, include_center=False):
+        """
+        Find the burning cells in the neighbourhood of a position.
+
+        :param pos: Coordinate to search around.
+        :param radius: Radius of the neighbourhood.
+        :param moore: Use the Moore neighbourhood instead of Von Neumann.
+        :param include_center: Also return pos itself when it is burning.
+        Returns:
+            Arrays with the x and y coordinates of the burning cells, sorted
+            on (x, y) like the neighbourhoods of the MESA grid.
+        """
+        x, y = pos
+        if radius == 1 and not moore:
+            coords = [(x - 1, y), (x, y - 1), (x, y), (x, y + 1), (x + 1, y)]
+            found = [(cx, cy) for cx, cy in coords
+                     if 0 <= cx < self.width and 0 <= cy < self.height
+                     and self.mask[cx, cy] and (include_center or (cx, cy) != pos)]
+            xs = np.array([cx for cx, _ in found], dtype=np.int64)
+            ys = np.array([cy for _, cy in found], dtype=np.int64)
+            return xs, ys
+
+        x0, x1 = max(x - radius, 0), min(x + radius + 1, self.width)
+        y0, y1 = max(y - radius, 0), min(y + radius + 1, self.height)
+        if radius <= self.tile_size:
+            xs, ys = np.nonzero(self.mask[x0:x1, y0:y1])
+            xs += x0
+            ys += y0
+        else:
+            # Only look into the tiles which have burning cells.
+            size = self.tile_size
+            tiles = np.argwhere(self.tile_counts[x0 // size:(x1 - 1) // size + 1,
+                                                 y0 // size:(y1 - 1) // size + 1] > 0)
+            xs_parts, ys_parts = [], []
+            for tx, ty in tiles + (x0 // size, y0 // size):
+                tx0, ty0 = max(tx * size, x0), max(ty * size, y0)
+                tile_xs, tile_ys = np.nonzero(self.mask[tx0:min((tx + 1) * size, x1),
+                                                        ty0:min((ty + 1) * size, y1)])
+                xs_parts.append(tile_xs + tx0)
+                ys_parts.append(tile_ys + ty0)
+            if not xs_parts:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+            xs, ys = np.concatenate(xs_parts), np.concatenate(ys_parts)
+            order = np.lexsort((ys, xs))
+            xs, ys = xs[order], ys[order]
+
+        keep = np.ones(len(xs), dtype=bool)
+        if not moore:
+            keep &= np.abs(xs - x) + np.abs(ys - y) <= radius
+        if not include_center:
+            keep &= (xs != x) | (ys != y)
+        return xs[keep], ys[keep]
+
+    def distance_field(self):
+        """
+        Distance of every cell to the fire, shared by all firefighters.
+
+        The targets are the cells which are not burning and have a burning
+        Von Neumann neighbour, since a firefighter there can extinguish. The
+        distance is the number of Moore steps to the closest target, found
+        with a multi-source breadth first search from all targets at once
+        (a chessboard distance transform, burning cells do not block).
+
+        Returns:
+            Integer array of shape (width, height), 0 on the targets and -1
+            everywhere when nothing is burning. With replicates it has a
+            leading replicate axis and every forest gets its own field.
+        """
+        mask = self.mask
+        near_fire = np.zeros_like(mask)
+        near_fire[..., 1:, :] |= mask[..., :-1, :]
+        near_fire[..., :-1, :] |= mask[..., 1:, :]
+        near_fire[..., :, 1:] |= mask[..., :, :-1]
+        near_fire[..., :, :-1] |= mask[..., :, 1:]
+        targets = near_fire & ~mask
+        if not targets.any():
+            return np.full(mask.shape, -1, dtype=np.int32)
+        if mask.ndim == 2:
+            return ndimage.distance_transform_cdt(~targets, metric='chessboard')
+        # Chessboard steps within a forest only, not along the replicate axis.
+        metric = np.zeros((3, 3, 3), dtype=bool)
+        metric[1] = True
+        field = ndimage.distance_transform_cdt(~targets, metric=metric)
+        field[~targets.any(axis=(1, 2))] = -1
+        return field
+
+
+def fire_targets(burning, width, height):
+    """
+    Flat cells which are not burning and have a burning Von Neumann
+    neighbour, the targets of FireIndex.distance_field.
+
+    :param burning: Flat cells x * height + y of the trees on fire.
+    """
+    x, y = np.divmod(burning, height)
+    near_fire = []
+    for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+        valid = (x + dx >= 0) & (x + dx < width) & (y + dy >= 0) & (y + dy < height)
+        near_fire.append(burning[valid] + dx * height + dy)
+    return np.setdiff1d(np.concatenate(near_fire), burning)
+
+
+def fire_areas(burning, height):
+    """
+    Sizes of the fire areas, the Von Neumann connected components of the
+    burning cells, as labelled by ForestFire.label_fire_areas.
+
+    :param burning: Flat cells x * height + y of the trees on fire.
+    """
+    cells = np.unique(burning)
+    if len(cells) == 0:
+        return np.zeros(0, dtype=np.int64)
+    sources = []
+    targets = []
+    # Links to the neighbour at x + 1 and, within the same column, at y + 1.
+    for step, valid in ((height, np.ones(len(cells), dtype=bool)),
+                        (1, cells % height < height - 1)):
+        place = np.minimum(np.searchsorted(cells, cells + step), len(cells) - 1)
+        linked = valid & (cells[place] == cells + step)
+        sources.append(np.flatnonzero(linked))
+        targets.append(place[linked])
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+    graph = coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)),
+                       shape=(len(cells), len(cells)))
+    _, labels = connected_components(graph, directed=False)
+    return np.bincount(labels)
+
+
+class FireDistance:
+
+    def __init__(self, targets, height):
+        """
+        Distance to the fire looked up in a k-d tree of the targets, which
+        gives the same distances as FireIndex.distance_field on the cells
+        which are asked for.
+
+        :param targets: Flat cells next to the fire, see fire_targets.
+        :param height: Height of the grid.
+        """
+        self.tree = cKDTree(np.column_stack(np.divmod(targets, height))) if len(targets) > 0 else None
+
+    def __call__(self, xs, ys):
+        """
+        Number of Moore steps from coordinates to the closest target, -1 when
+        nothing is burning.
+        """
+        if self.tree is None:
+            return np.full(np.shape(xs), -1, dtype=np.int64)
+        points = np.stack((xs, ys), axis=-1).reshape(-1, 2)
+        distance, _ = self.tree.query(points, p=np.inf)
+        return distance.astype(np.int64).reshape(np.shape(xs))
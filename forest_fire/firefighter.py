@@ -7,7 +7,6 @@ DESCRIPTION: Firefighter class, based on the walker class and used its functions
              and step method to proceed a step during an iteration.
 """
 from .Walker import Walker
-from .tree import Tree
 
 class FireFighter(Walker):
     """
@@ -21,6 +20,8 @@ class FireFighter(Walker):
         extg_strength: int within range [0, 100]
     """
 
+    __slots__ = ("extg_strength", "fires_extg", "strategy")
+
     def __init__(self, unique_id, pos, model, extg_strength,strategy):
         super().__init__(unique_id, pos, model)
         self.extg_strength = extg_strength
@@ -38,24 +39,27 @@ class FireFighter(Walker):
         If the firefighter is near a fire it will try to extinguish it,
         if not, it will move randomly.
         """
-        neighbors = self.model.grid.get_neighbors(
+        profiler = self.model.profiler
+        profiler.count("firefighter_steps")
+        profiler.count("firefighter_neighbour_queries")
+        burning_trees = self.model.get_burning_trees(
             pos = self.pos,
             moore = False,
             include_center = False,
             radius = 1
         )
-        neighbouring_trees = [agent for agent in neighbors if isinstance(agent, Tree)]
-        burning_trees = [tree for tree in neighbouring_trees if tree.condition == 'On fire']
 
         if len(burning_trees) > 0:
             burning_tree = self.random.choice(burning_trees)
             burning_tree._extinguish(firefighter=self)
             self.fires_extg += 1
         elif self.strategy == 'closest':
-            self.move_towards_closest_fire()
+            self.move_towards_closest_fire(radius=self.model.search_radius)
+        elif self.strategy == 'pursue':
+            self.move_along_distance_field()
         elif self.strategy == 'biggest':
-            self.move_towards_biggest_fire()
+            self.move_towards_biggest_fire(radius=self.model.search_radius)
         elif self.strategy == 'earliest':
-            self.move_towards_hp_fire()
+            self.move_towards_hp_fire(radius=self.model.search_radius)
         else:
             self.random_move()
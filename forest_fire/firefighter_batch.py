@@ -0,0 +1,309 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Batched firefighters for the array backend. Instead of stepping
+             FireFighter agents one at a time, the extinguish targets and the
+             moves of all firefighters are computed in array form every
+             step. The strategies behave as in FireFighter and Walker.
+             With replicates, the forests are stacked along the x axis and
+             every firefighter stays within the rows of its own forest.
+"""
+import numpy as np
+
+from .array_forest import ON_FIRE
+
+# Neighbourhood offsets in the order in which the MESA grid returns them.
+VON_NEUMANN = np.array([(-1, 0), (0, -1), (0, 1), (1, 0)])
+MOORE_WITH_CENTER = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+
+
+def grid_rows(array):
+    """
+    View of a grid array as 2D, with the forests of a leading replicate axis
+    stacked along the x axis, so row r * width + x is row x of forest r.
+    """
+    return array.reshape(-1, array.shape[-1])
+
+
+def search_offsets(radius):
+    """
+    Offsets of the Moore neighbourhood with the given radius, without the
+    center, in the order in which the MESA grid returns them.
+    """
+    return np.array([(dx, dy) for dx in range(-radius, radius + 1)
+                     for dy in range(-radius, radius + 1) if (dx, dy) != (0, 0)])
+
+
+class FireFighterBatch:
+
+    def __init__(self, model, x, y, extg_strength, strategy):
+        """
+        Class which represents all firefighters of an ArrayForestFire model.
+
+        :param model: The ArrayForestFire model.
+        :param x: Array with the x coordinates of the firefighters, with
+                  replicates the rows r * width + x, see grid_rows.
+        :param y: Array with the y coordinates of the firefighters.
+        :param extg_strength: Extinguishing strength of every firefighter.
+        :param strategy: Strategy used by every firefighter.
+        """
+        self.model = model
+        self.x = np.array(x, dtype=np.int64)
+        self.y = np.array(y, dtype=np.int64)
+        self.extg_strength = extg_strength
+        self.strategy = strategy
+        self.fires_extg = np.zeros(len(self.x), dtype=np.int64)
+        # First row of the forest of every firefighter.
+        self.offset = self.x - self.x % model.width
+        # Flat cells of the trees put out in the current step, sorted, and the
+        # activation rank of the firefighter which put each of them out.
+        self._out_cells = np.zeros(0, dtype=np.int64)
+        self._out_ranks = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def positions(self):
+        """
+        List with the coordinate of every firefighter.
+        """
+        return list(zip(self.x.tolist(), self.y.tolist()))
+
+    def add(self, x, y, fires_extg):
+        """
+        Add firefighters at the end of the batch, e.g. ones handed over by
+        another batch.
+        """
+        self.x = np.concatenate((self.x, np.asarray(x, dtype=np.int64)))
+        self.y = np.concatenate((self.y, np.asarray(y, dtype=np.int64)))
+        self.fires_extg = np.concatenate((self.fires_extg, np.asarray(fires_extg, dtype=np.int64)))
+        self.offset = self.x - self.x % self.model.width
+
+    def remove(self, fighters):
+        """
+        Take firefighters out of the batch.
+
+        :param fighters: Indices of the firefighters.
+        Returns:
+            Arrays with their x and y coordinates and fires extinguished.
+        """
+        removed = self.x[fighters], self.y[fighters], self.fires_extg[fighters]
+        keep = np.ones(len(self.x), dtype=bool)
+        keep[fighters] = False
+        self.x, self.y = self.x[keep], self.y[keep]
+        self.fires_extg, self.offset = self.fires_extg[keep], self.offset[keep]
+        return removed
+
+    def _lookup(self, fighters, offsets):
+        """
+        Coordinates around a set of firefighters.
+
+        Returns:
+            Arrays xs, ys of shape (len(fighters), len(offsets)), clipped to
+            the grid, and a boolean array which is False where the
+            coordinate lies outside the grid.
+        """
+        forest = self.model.forest
+        offset = self.offset[fighters, None]
+        xs = self.x[fighters, None] - offset + offsets[:, 0]
+        ys = self.y[fighters, None] + offsets[:, 1]
+        inside = (xs >= 0) & (xs < forest.width) & (ys >= 0) & (ys < forest.height)
+        return (np.clip(xs, 0, forest.width - 1) + offset, np.clip(ys, 0, forest.height - 1),
+                inside)
+
+    def _values(self, name, xs, ys):
+        """
+        Values of a forest array (condition, hp or burn_rate) on coordinates
+        with global rows, see grid_rows.
+        """
+        forest = self.model.forest
+        return forest.cell_values(name, xs * forest.height + ys)
+
+    def _out_rank(self, cells):
+        """
+        Activation rank of the firefighter which put the tree on flat cells
+        out in the current step, -1 for trees which were not put out.
+        """
+        if len(self._out_cells) == 0:
+            return np.full(np.shape(cells), -1, dtype=np.int64)
+        place = np.minimum(np.searchsorted(self._out_cells, cells), len(self._out_cells) - 1)
+        return np.where(self._out_cells[place] == cells, self._out_ranks[place], -1)
+
+    def step(self, rng):
+        """
+        Proceed all firefighters one step. A firefighter next to a fire
+        extinguishes a random burning neighbour, the others move with their
+        strategy.
+
+        The firefighters act in a random order. A firefighter only sees the
+        trees which are put out earlier in the order as out, and picks another
+        burning neighbour or moves, as with RandomActivation. Moves are made
+        after all extinguishing, but a firefighter still sees the trees which
+        are put out later in the order as burning.
+        """
+        n_fighters = len(self.x)
+        if n_fighters == 0:
+            return
+        self.model.profiler.count("firefighter_steps", n_fighters)
+        rank = np.empty(n_fighters, dtype=np.int64)
+        rank[rng.permutation(n_fighters)] = np.arange(n_fighters)
+        extinguishing = self._extinguish(rng, rank)
+
+        movers = np.flatnonzero(~extinguishing)
+        if self.strategy in ('closest', 'biggest', 'earliest'):
+            movers = self._move_towards_fire(movers, rank)
+        elif self.strategy == 'pursue':
+            movers = self._move_along_distance_field(movers, rank)
+        self._random_move(movers, rank, rng)
+        self._out_cells = self._out_ranks = np.zeros(0, dtype=np.int64)
+
+    def _extinguish(self, rng, rank):
+        """
+        Let every firefighter next to a fire extinguish one burning tree, as
+        if they took their turns one after the other in activation order.
+
+        Every firefighter draws a random key for each neighbour once and
+        takes the neighbour with the highest key among those which still
+        burn at its turn, a uniform choice. Which trees are out at whose
+        turn depends on the choices and the choices on it, so both are
+        repeated until the choices no longer change. Every round settles at
+        least the first firefighter in the order whose choice was wrong, in
+        practice it takes a few rounds.
+
+        Returns:
+            Boolean array which is True for the firefighters which
+            extinguished.
+        """
+        forest = self.model.forest
+        strength = self.extg_strength if self.strategy != 'call_plane' else self.extg_strength*5
+        extinguishing = np.zeros(len(self.x), dtype=bool)
+        self.model.profiler.count("firefighter_neighbour_queries", len(self.x))
+        xs, ys, inside = self._lookup(np.arange(len(self.x)), VON_NEUMANN)
+        fire = inside & (self._values("condition", xs, ys) == ON_FIRE)
+        fighters = np.flatnonzero(fire.any(axis=1))
+        if len(fighters) == 0:
+            return extinguishing
+        fire = fire[fighters]
+        keys = np.where(fire, rng.random(fire.shape), -1)
+        fighter_rank = rank[fighters]
+        cells = xs[fighters] * forest.height + ys[fighters]
+
+        # The burning trees next to a firefighter, and the index of every
+        # neighbour among them.
+        trees = np.unique(cells[fire])
+        tree_of = np.minimum(np.searchsorted(trees, cells), len(trees) - 1)
+        burn_rate = forest.cell_values("burn_rate", trees).astype(np.int64)
+        # Activation rank of the firefighter which puts each tree out.
+        never = np.iinfo(np.int64).max
+        out_rank = np.full(len(trees), never)
+        choice = None
+        while True:
+            burning = fire & (out_rank[tree_of] >= fighter_rank[:, None])
+            new_choice = np.where(burning.any(axis=1),
+                                  np.argmax(np.where(burning, keys, -1), axis=1), -1)
+            if choice is not None and np.array_equal(new_choice, choice):
+                break
+            choice = new_choice
+            acting = np.flatnonzero(choice >= 0)
+            targets = tree_of[acting, choice[acting]]
+            # Within a target, firefighters act in activation order and the
+            # one after which the burn rate is used up puts it out.
+            order = np.lexsort((fighter_rank[acting], targets))
+            acting, targets = acting[order], targets[order]
+            first = np.r_[True, targets[1:] != targets[:-1]]
+            starts = np.flatnonzero(first)
+            place = np.arange(len(targets)) - starts[np.cumsum(first) - 1]
+            puts_out = (place == 0) | (place * strength < burn_rate[targets])
+            puts_out &= (place + 1) * strength >= burn_rate[targets]
+            out_rank = np.full(len(trees), never)
+            out_rank[targets[puts_out]] = fighter_rank[acting[puts_out]]
+
+        # In the settled choices every firefighter acts before its tree is out.
+        acting_fighters = fighters[acting]
+        extinguishing[acting_fighters] = True
+        self.fires_extg[acting_fighters] += 1
+        hit, n_acting = np.unique(targets, return_counts=True)
+        forest.extinguish_many(trees[hit], n_acting * strength)
+        out = np.flatnonzero(out_rank != never)
+        self._out_cells = trees[out]
+        self._out_ranks = out_rank[out]
+        return extinguishing
+
+    def _fire_seen(self, fighters, xs, ys, rank):
+        """
+        Burning state of coordinates around firefighters as seen at their
+        turn, including the trees put out later in the activation order.
+        """
+        out_rank = self._out_rank(xs * self.model.forest.height + ys)
+        return (self._values("condition", xs, ys) == ON_FIRE) | (out_rank > rank[fighters, None])
+
+    def _move_towards_fire(self, fighters, rank):
+        """
+        Move firefighters to a burning tree in their search radius, picked
+        like the Walker strategies do.
+
+        Returns:
+            The firefighters which did not spot a fire.
+        """
+        if len(fighters) == 0:
+            return fighters
+        self.model.profiler.count("walker_neighbour_queries", len(fighters))
+        offsets = search_offsets(self.model.search_radius)
+        xs, ys, inside = self._lookup(fighters, offsets)
+        fire = inside & self._fire_seen(fighters, xs, ys, rank)
+
+        if self.strategy == 'closest':
+            score = np.broadcast_to(-np.abs(offsets).sum(axis=1), fire.shape)
+        elif self.strategy == 'biggest':
+            score = self._values("burn_rate", xs, ys).astype(np.int64)
+        else:
+            score = self._values("hp", xs, ys).astype(np.int64)
+        # argmax returns the first best tree, as list.index in the Walker.
+        best = np.argmax(np.where(fire, score, np.iinfo(np.int64).min), axis=1)
+        found = fire.any(axis=1)
+        rows = np.flatnonzero(found)
+        self.x[fighters[found]] = xs[rows, best[found]]
+        self.y[fighters[found]] = ys[rows, best[found]]
+        return fighters[~found]
+
+    def _move_along_distance_field(self, fighters, rank):
+        """
+        Move firefighters one step down the distance to the fire of the
+        model, to the first neighbour closest to the fire, like the Walker
+        does.
+
+        Returns:
+            The firefighters which could not get closer to a fire.
+        """
+        if len(fighters) == 0:
+            return fighters
+        self.model.profiler.count("walker_neighbour_queries", len(fighters))
+        offsets = MOORE_WITH_CENTER[np.any(MOORE_WITH_CENTER != 0, axis=1)]
+        xs, ys, inside = self._lookup(fighters, offsets)
+        distance = self.model.fire_distance(xs, ys).astype(np.int64)
+        possible = inside & (distance >= 0) & ~self._fire_seen(fighters, xs, ys, rank)
+        best = np.argmin(np.where(possible, distance, np.iinfo(np.int64).max), axis=1)
+        rows = np.arange(len(fighters))
+        here = self.model.fire_distance(self.x[fighters], self.y[fighters])
+        closer = possible[rows, best] & (distance[rows, best] < here)
+        self.x[fighters[closer]] = xs[rows[closer], best[closer]]
+        self.y[fighters[closer]] = ys[rows[closer], best[closer]]
+        return fighters[~closer]
+
+    def _random_move(self, fighters, rank, rng):
+        """
+        Move firefighters to a random cell of their Moore neighbourhood, or
+        stay, avoiding cells which are on fire.
+        """
+        if len(fighters) == 0:
+            return
+        self.model.profiler.count("walker_neighbour_queries", len(fighters))
+        xs, ys, inside = self._lookup(fighters, MOORE_WITH_CENTER)
+        possible = inside & ~self._fire_seen(fighters, xs, ys, rank)
+        choice = np.argmax(np.where(possible, rng.random(possible.shape), -1), axis=1)
+        can_move = possible.any(axis=1)
+        rows = np.flatnonzero(can_move)
+        self.x[fighters[can_move]] = xs[rows, choice[can_move]]
+        self.y[fighters[can_move]] = ys[rows, choice[can_move]]
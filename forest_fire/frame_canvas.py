@@ -0,0 +1,137 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Fast canvas for the visualization server. Instead of one
+             portrayal dict per agent, every frame is sent as one byte per
+             cell, an index in a palette of the tree conditions and the hp
+             gradient of the trees on fire, with the firefighters as a small
+             array of positions. When few cells changed since the last frame
+             only the changed cells are sent. FrameCanvasModule.js draws the
+             frames in the browser.
+"""
+import base64
+import json
+
+import numpy as np
+from colour import Color
+from mesa.visualization.ModularVisualization import VisualizationElement
+
+from .array_forest import EMPTY, FINE, ON_FIRE, BURNED
+
+# Palette index of the first colour of the hp gradient, the trees on fire
+# are drawn with the colour of their hp.
+FIRE_OFFSET = 4
+
+
+def hp_gradient(colors, levels=101):
+    """
+    Colours of the trees on fire by hp, from the colour of burned trees at
+    hp 0 to the colour of trees on fire at the highest hp.
+    """
+    return [colour.hex for colour in Color(colors["Burned"]).range_to(Color(colors["On fire"]), levels)]
+
+
+def frame_palette(colors, colour_hp):
+    """
+    Colours of the palette indices of a frame.
+
+    :param colors: Colours of the conditions and firefighters, as in the
+                   config file. Empty cells are white unless "Empty" is given.
+    :param colour_hp: Colours of the trees on fire by hp.
+    Returns:
+        List with a CSS colour per palette index.
+    """
+    palette = [None] * FIRE_OFFSET
+    palette[EMPTY] = colors.get("Empty", "white")
+    palette[FINE] = colors["Fine"]
+    palette[ON_FIRE] = colors["On fire"]
+    palette[BURNED] = colors["Burned"]
+    return palette + list(colour_hp)
+
+
+def frame_indices(condition, hp, fire_levels):
+    """
+    Palette indices of all cells, in raster order: one row per y from the
+    top of the grid, as the CanvasGrid draws it.
+
+    :param condition: Array shaped (width, height) with the condition codes.
+    :param hp: Array shaped (width, height) with the hp of the trees.
+    :param fire_levels: Number of colours in the hp gradient, a higher hp
+                        gets the last one.
+    """
+    frame = condition.astype(np.uint8)
+    fire = condition == ON_FIRE
+    frame[fire] = FIRE_OFFSET + np.clip(hp[fire], 0, fire_levels - 1)
+    return np.ascontiguousarray(frame.T[::-1])
+
+
+def encode_frame(model, fire_levels):
+    """
+    Palette indices of all cells of a model, see frame_indices.
+    """
+    condition, hp, _ = model._tree_arrays()
+    return frame_indices(condition, hp, fire_levels)
+
+
+def encode_array(array, dtype):
+    """
+    Base64 encoding of an array, to send it in a JSON message.
+    """
+    return base64.b64encode(np.ascontiguousarray(array, dtype=dtype).tobytes()).decode("ascii")
+
+
+class FrameCanvas(VisualizationElement):
+
+    local_includes = ["forest_fire/js/FrameCanvasModule.js"]
+
+    def __init__(self, colors, colour_hp, canvas_width=500, canvas_height=500, delta=True,
+                 key_every=100):
+        """
+        Visualization element which draws the grid of a model from frames.
+
+        :param colors: Colours of the conditions and firefighters, as in the
+                       config file.
+        :param colour_hp: Colours of the trees on fire by hp.
+        :param canvas_width: Width of the canvas in pixels.
+        :param canvas_height: Height of the canvas in pixels.
+        :param delta: Send only the changed cells when that is smaller than
+                      the whole frame.
+        :param key_every: Send the whole frame at least every this many steps.
+        """
+        self.fire_levels = len(colour_hp)
+        self.delta = delta
+        self.key_every = key_every
+        self._model = None
+        self._step = None
+        self._frame = None
+        self._key_step = None
+        self.js_code = "elements.push(new FrameCanvasModule({}, {}, {}, {}));".format(
+            canvas_width, canvas_height, json.dumps(frame_palette(colors, colour_hp)),
+            json.dumps(colors["FireFighter"]))
+
+    def render(self, model):
+        frame = encode_frame(model, self.fire_levels)
+        height, width = frame.shape
+        # A delta only applies to the previous frame of the same model.
+        follows = (self.delta and model is self._model and self._frame is not None
+                   and self._frame.shape == frame.shape and model.current_step == self._step + 1
+                   and model.current_step - self._key_step < self.key_every)
+        data = {"width": width, "height": height, "step": model.current_step}
+        changed = np.flatnonzero(frame != self._frame) if follows else None
+        # A changed cell takes 5 bytes, its index and value, a cell of a frame 1.
+        if changed is not None and 5 * len(changed) < frame.size:
+            data["full"] = False
+            data["cells"] = encode_array(changed, "<u4")
+            data["values"] = encode_array(frame.ravel()[changed], np.uint8)
+        else:
+            data["full"] = True
+            data["frame"] = encode_array(frame, np.uint8)
+            self._key_step = model.current_step
+
+        xs, ys, _ = model._firefighter_arrays()
+        data["fighters"] = encode_array(np.column_stack((xs, height - 1 - ys)), "<u2")
+        self._model = model
+        self._step = model.current_step
+        self._frame = frame
+        return data
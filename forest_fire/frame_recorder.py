@@ -0,0 +1,223 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Headless recorder of the grid of a run. The condition and hp of
+             every cell and the firefighter positions of each recorded step
+             are buffered into chunks, which a background thread compresses
+             and appends to a frame file, so the simulation does not wait
+             for the disk. The chunks which are complete can be read while
+             the run still goes on, or after it was interrupted. Turn a frame
+             file into images or a video with render_frames.py.
+"""
+import io
+import json
+import queue
+import struct
+import threading
+import zipfile
+
+import numpy as np
+
+from .result_sinks import report_parameters
+
+MAGIC = b"FORESTFIRE-FRAMES-1\n"
+
+# Every record in a frame file is its length followed by its bytes. The first
+# record is a JSON header, every next one a chunk of frames as an .npz file.
+LENGTH = struct.Struct("<Q")
+
+
+class FrameRecorder:
+
+    def __init__(self, path, chunk_size=64, every=1, queue_size=4):
+        """
+        Class which records the grid of a model into a frame file.
+
+        :param path: Path of the frame file, overwritten when it exists.
+        :param chunk_size: Number of frames per chunk.
+        :param every: Record every k-th step.
+        :param queue_size: Number of chunks which can wait for the writer
+                           thread, record waits when they are all taken.
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.every = every
+        self.n_frames = 0
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self._chunk = []
+        self._last_step = None
+        self._header = False
+        self._error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._write_records, daemon=True)
+        self._thread.start()
+
+    def record(self, model, force=False):
+        """
+        Record the grid of the current step of a model, when the sampling
+        selects it.
+
+        :param model: ForestFire model.
+        :param force: Record the step regardless of every, e.g. the last
+                      step of a run. A step is never recorded twice.
+        Returns:
+            True when the step was recorded.
+        """
+        step = model.current_step
+        if step == self._last_step or (not force and step % self.every != 0):
+            return False
+        # Both are copies, so the model can go on while the chunk waits.
+        condition, hp, _ = model._tree_arrays()
+        xs, ys, _ = model._firefighter_arrays()
+        if not self._header:
+            header = {"model": type(model).__name__, "parameters": report_parameters(model),
+                      "shape": list(condition.shape), "every": self.every}
+            self._put(json.dumps(header).encode("utf-8"))
+            self._header = True
+        self._chunk.append((step, condition, hp, xs, ys))
+        self._last_step = step
+        self.n_frames += 1
+        if len(self._chunk) == self.chunk_size:
+            self.flush()
+        return True
+
+    def flush(self):
+        """
+        Hand the buffered frames to the writer thread as a chunk.
+        """
+        if self._chunk:
+            self._put(self._chunk)
+            self._chunk = []
+
+    def _put(self, record):
+        if self._error is not None:
+            raise RuntimeError(f"Writing {self.path} failed") from self._error
+        self._queue.put(record)
+
+    def _write_records(self):
+        """
+        Writer thread: compress the chunks and append them to the file, until
+        it gets None.
+        """
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                if not isinstance(record, bytes):
+                    record = self._encode_chunk(record)
+                self._file.write(LENGTH.pack(len(record)))
+                self._file.write(record)
+                self._file.flush()
+            except Exception as error:
+                self._error = error
+
+    @staticmethod
+    def _encode_chunk(frames):
+        """
+        A chunk of frames as an .npz file, with the fastest compression
+        level instead of the one of np.savez_compressed, which is several
+        times slower for a few percent smaller chunks.
+        """
+        steps, conditions, hps, xs, ys = zip(*frames)
+        arrays = {"step": np.array(steps, dtype=np.int64), "condition": np.stack(conditions),
+                  "hp": np.stack(hps), "fighters_x": np.stack(xs), "fighters_y": np.stack(ys)}
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as chunk:
+            for name, array in arrays.items():
+                with chunk.open(name + ".npy", "w") as member:
+                    np.lib.format.write_array(member, array, allow_pickle=False)
+        return buffer.getvalue()
+
+    def close(self):
+        """
+        Write the last frames and wait until the writer thread is done.
+        """
+        if self._file.closed:
+            return
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        if self._error is not None:
+            raise RuntimeError(f"Writing {self.path} failed") from self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def record_run(model, path, every=1, chunk_size=64):
+    """
+    Run a model until it stops and record its grid, the first and last step
+    included.
+
+    :param model: ForestFire model.
+    :param path: Path of the frame file.
+    :param every: Record every k-th step.
+    Returns:
+        The number of recorded frames.
+    """
+    with FrameRecorder(path, chunk_size=chunk_size, every=every) as recorder:
+        recorder.record(model, force=True)
+        while model.running:
+            model.step()
+            recorder.record(model, force=not model.running)
+    return recorder.n_frames
+
+
+class FrameReader:
+
+    def __init__(self, path):
+        """
+        Class which reads a frame file written by the FrameRecorder. A chunk
+        which was not completely written, e.g. of a run which is still going
+        on, is left out.
+
+        :param path: Path of the frame file.
+        """
+        self.path = path
+        with open(path, "rb") as frames:
+            if frames.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a frame file")
+            record = self._read_record(frames)
+        self.header = json.loads(record) if record is not None else None
+
+    @staticmethod
+    def _read_record(frames):
+        length = frames.read(LENGTH.size)
+        if len(length) < LENGTH.size:
+            return None
+        (length,) = LENGTH.unpack(length)
+        record = frames.read(length)
+        return record if len(record) == length else None
+
+    def chunks(self):
+        """
+        Generator over the chunks, dicts with arrays of the step, condition,
+        hp and firefighter coordinates of several frames.
+        """
+        with open(self.path, "rb") as frames:
+            frames.read(len(MAGIC))
+            self._read_record(frames)
+            while True:
+                record = self._read_record(frames)
+                if record is None:
+                    return
+                with np.load(io.BytesIO(record), allow_pickle=False) as chunk:
+                    yield {name: chunk[name] for name in chunk.files}
+
+    def __iter__(self):
+        """
+        Generator over the frames, dicts with the step, condition, hp and
+        firefighter coordinates of one step.
+        """
+        for chunk in self.chunks():
+            for i in range(len(chunk["step"])):
+                yield {name: values[i] for name, values in chunk.items()}
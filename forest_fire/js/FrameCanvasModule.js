@@ -0,0 +1,90 @@
+/*
+ * GROUP:       CSS_18
+ * DATE:        18-10-2026
+ * AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+ * DESCRIPTION: Browser side of the FrameCanvas in frame_canvas.py. The cells
+ *              of a frame are palette indices, which are turned into pixels
+ *              of an image with one pixel per cell, scaled up to the canvas.
+ *              The firefighters are drawn on top as circles.
+ */
+var FrameCanvasModule = function(canvas_width, canvas_height, palette, fighter_colour) {
+	var canvas_tag = `<canvas width="${canvas_width}" height="${canvas_height}" class="world-grid"/>`;
+	var parent_div_tag = '<div style="height:' + canvas_height + 'px;" class="world-grid-parent"></div>';
+
+	var canvas = $(canvas_tag)[0];
+	var parent = $(parent_div_tag)[0];
+	$("#elements").append(parent);
+	parent.append(canvas);
+
+	var context = canvas.getContext("2d");
+	context.imageSmoothingEnabled = false;
+
+	// Image with one pixel per cell, drawn scaled onto the canvas.
+	var buffer = document.createElement("canvas");
+	var buffer_context = buffer.getContext("2d");
+	var image = null;
+	var pixels = null;
+
+	// The palette as 32 bit pixels, converted by a canvas so any CSS colour works.
+	var colours = new Uint32Array(palette.length);
+	var probe = document.createElement("canvas").getContext("2d");
+	palette.forEach(function(colour, index) {
+		probe.fillStyle = colour;
+		probe.fillRect(0, 0, 1, 1);
+		colours[index] = new Uint32Array(probe.getImageData(0, 0, 1, 1).data.buffer)[0];
+	});
+
+	var decode = function(data, type) {
+		var text = atob(data);
+		var bytes = new Uint8Array(text.length);
+		for (var i = 0; i < text.length; i++)
+			bytes[i] = text.charCodeAt(i);
+		return new type(bytes.buffer);
+	};
+
+	this.render = function(data) {
+		if (data.full) {
+			if (image === null || image.width != data.width || image.height != data.height) {
+				buffer.width = data.width;
+				buffer.height = data.height;
+				image = buffer_context.createImageData(data.width, data.height);
+				pixels = new Uint32Array(image.data.buffer);
+			}
+			var frame = decode(data.frame, Uint8Array);
+			for (var i = 0; i < frame.length; i++)
+				pixels[i] = colours[frame[i]];
+		} else {
+			// A delta needs the previous frame, wait for the next whole one.
+			if (image === null)
+				return;
+			var cells = decode(data.cells, Uint32Array);
+			var values = decode(data.values, Uint8Array);
+			for (var i = 0; i < cells.length; i++)
+				pixels[cells[i]] = colours[values[i]];
+		}
+		buffer_context.putImageData(image, 0, 0);
+		context.clearRect(0, 0, canvas_width, canvas_height);
+		context.drawImage(buffer, 0, 0, canvas_width, canvas_height);
+
+		// Firefighters as x and row pairs, all circles in one path.
+		var fighters = decode(data.fighters, Uint16Array);
+		var cell_width = canvas_width / data.width;
+		var cell_height = canvas_height / data.height;
+		var radius = 0.45 * Math.min(cell_width, cell_height);
+		context.fillStyle = fighter_colour;
+		context.beginPath();
+		for (var i = 0; i < fighters.length; i += 2) {
+			var x = (fighters[i] + 0.5) * cell_width;
+			var y = (fighters[i + 1] + 0.5) * cell_height;
+			context.moveTo(x + radius, y);
+			context.arc(x, y, radius, 0, 2 * Math.PI);
+		}
+		context.fill();
+	};
+
+	this.reset = function() {
+		image = null;
+		pixels = null;
+		context.clearRect(0, 0, canvas_width, canvas_height);
+	};
+};
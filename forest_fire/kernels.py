@@ -0,0 +1,158 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Compiled kernel for the tree step of the array backend. With
+             Numba installed, spread_step does the fire spread and burn-down
+             of one step in nopython mode, visiting the trees one at a time
+             in random order like the agents do. Without Numba it is None
+             and ArrayForest uses its NumPy implementation.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Condition codes, as in array_forest.
+EMPTY = 0
+FINE = 1
+ON_FIRE = 2
+BURNED = 3
+
+
+def _heap_push(times, cells, size, time, cell):
+    """
+    Push an activation time and cell on a binary heap kept in two arrays.
+
+    Returns:
+        The new size of the heap.
+    """
+    i = size
+    while i > 0:
+        parent = (i - 1) // 2
+        if times[parent] <= time:
+            break
+        times[i] = times[parent]
+        cells[i] = cells[parent]
+        i = parent
+    times[i] = time
+    cells[i] = cell
+    return size + 1
+
+
+def _heap_pop(times, cells, size):
+    """
+    Pop the earliest activation time and its cell from the heap.
+
+    Returns:
+        The time, the cell and the new size of the heap.
+    """
+    time, cell = times[0], cells[0]
+    size -= 1
+    last_time, last_cell = times[size], cells[size]
+    i = 0
+    while True:
+        child = 2 * i + 1
+        if child >= size:
+            break
+        if child + 1 < size and times[child + 1] < times[child]:
+            child += 1
+        if times[child] >= last_time:
+            break
+        times[i] = times[child]
+        cells[i] = cells[child]
+        i = child
+    times[i] = last_time
+    cells[i] = last_cell
+    return time, cell, size
+
+
+def _spread_step(condition, hp, burn_rate, burning, burned, width, height,
+                 ignition_prob, max_burn_rate, seed):
+    """
+    Proceed the trees one step, as Tree.step with the ActiveFrontActivation.
+
+    The burned trees are removed. Every burning tree gets a random
+    activation time, and the trees act in the order of these times: a tree
+    on fire tries to ignite each fine Von Neumann neighbour, which then
+    draws a burn rate and an activation time and acts in this step too when
+    that time is still to come, and loses hp by its burn rate.
+
+    :param condition: Flat condition codes of all cells, updated in place.
+    :param hp: Flat hp of all cells, updated in place.
+    :param burn_rate: Flat burn rates of all cells, updated in place.
+    :param burning: Flat cells of the trees on fire, may contain cells which
+                    are no longer on fire.
+    :param burned: Flat cells of the trees which burned down last step.
+    :param width: Width of a forest, cells are r * width * height +
+                  x * height + y with replicates.
+    :param height: Height of a forest.
+    :param seed: Seed of the random numbers of this step.
+    Returns:
+        Arrays with the flat cells of the trees ignited and of the trees
+        burned down in this step.
+    """
+    np.random.seed(seed)
+    for cell in burned:
+        condition[cell] = EMPTY
+
+    # Every tree is at most once on the heap.
+    times = np.empty(len(condition), dtype=np.float64)
+    cells = np.empty(len(condition), dtype=np.int64)
+    size = 0
+    for cell in burning:
+        if condition[cell] == ON_FIRE:
+            size = heap_push(times, cells, size, np.random.random(), cell)
+
+    ignited = np.empty(len(condition), dtype=np.int64)
+    n_ignited = 0
+    burnt = np.empty(len(condition), dtype=np.int64)
+    n_burnt = 0
+    neighbours = np.empty(4, dtype=np.int64)
+    while size > 0:
+        now, cell, size = heap_pop(times, cells, size)
+        if condition[cell] != ON_FIRE:
+            continue
+        x = (cell // height) % width
+        y = cell % height
+        n_neighbours = 0
+        if x > 0:
+            neighbours[n_neighbours] = cell - height
+            n_neighbours += 1
+        if y > 0:
+            neighbours[n_neighbours] = cell - 1
+            n_neighbours += 1
+        if y < height - 1:
+            neighbours[n_neighbours] = cell + 1
+            n_neighbours += 1
+        if x < width - 1:
+            neighbours[n_neighbours] = cell + height
+            n_neighbours += 1
+        for i in range(n_neighbours):
+            neighbour = neighbours[i]
+            if condition[neighbour] == FINE and np.random.random() < ignition_prob:
+                condition[neighbour] = ON_FIRE
+                burn_rate[neighbour] = np.random.randint(1, max_burn_rate)
+                ignited[n_ignited] = neighbour
+                n_ignited += 1
+                activation_time = np.random.random()
+                if activation_time > now:
+                    size = heap_push(times, cells, size, activation_time, neighbour)
+
+        if hp[cell] > 0:
+            hp[cell] = max(hp[cell] - burn_rate[cell], 0)
+        if hp[cell] <= 0:
+            condition[cell] = BURNED
+            burnt[n_burnt] = cell
+            n_burnt += 1
+    return ignited[:n_ignited].copy(), burnt[:n_burnt].copy()
+
+
+if njit is not None:
+    heap_push = njit(cache=True, nogil=True)(_heap_push)
+    heap_pop = njit(cache=True, nogil=True)(_heap_pop)
+    spread_step = njit(cache=True, nogil=True)(_spread_step)
+else:
+    heap_push = heap_pop = spread_step = None
@@ -7,22 +7,31 @@ DESCRIPTION: Model class, based on Model class from MESA. The class consists
              on the grid or keeping track of the data, generated by the model.
 """
 
-import time, os
 import numpy as np
 from scipy import ndimage
 from mesa import Model
 from mesa.time import RandomActivation
 from mesa.space import MultiGrid
-from mesa.datacollection import DataCollector
 
 from .tree import Tree
 from .firefighter import FireFighter
+from .schedule import ActiveFrontActivation
+from .fire_clusters import FireClusterTracker
+from .cell_index import CellIndex
+from .fire_index import FireIndex
+from .profiler import StepProfiler, NULL_PROFILER, FIELDS as PROFILE_FIELDS
+from .statistics_recorder import (StatisticsRecorder, STATISTICS, compute_metrics,
+                                  fire_area_statistics)
+from .result_sinks import NULL_SINK
+from .array_forest import EMPTY, FINE, ON_FIRE, CONDITION_CODES
 
 
 class ForestFire(Model):
 
     def __init__(self, height, width, density_trees, max_burn_rate, ignition_prob,
-                 max_hp, max_iter, regrowth_rate, N_firefighters,strategy, extg_strength):
+                 max_hp, max_iter, regrowth_rate, N_firefighters,strategy, extg_strength,
+                 seed=None, debug=False, search_radius=5, snapshot=None, profile=False,
+                 recorder=None, sink=None):
         """
         Create a forest fire ABM model.
 
@@ -32,18 +41,43 @@ class ForestFire(Model):
         :param max_burn_rate: The maximum speed on which a tree burns.
         :param ignition_prob: The probability that a tree ignites when a neighbour is on fire.
         :param max_hp: The maximum hp of a tree.
+        :param seed: Seed for the random number generators of the model, picked
+                     up by the MESA Model. None gives a random seed.
+        :param debug: Cross-check the condition counters against a full scan
+                      of the trees every time they are read.
+        :param search_radius: Radius in which the firefighters look for fires.
+        :param snapshot: Snapshot to continue from instead of planting a new
+                         forest, see Snapshot.restore.
+        :param profile: Record the time per phase of every step and count the
+                        neighbour queries, see StepProfiler. The records are
+                        added to the recorded statistics.
+        :param recorder: StatisticsRecorder which records the statistics of
+                         the steps, by default all metrics of every step.
+        :param sink: Sink which gets the recorded statistics when the run
+                     stops, see result_sinks. By default they are not
+                     written anywhere.
         """
         super().__init__()
+        # MESA keeps the generator on the class, pin it to this model so that
+        # creating another model, e.g. from a snapshot, does not replace it.
+        self.random = type(self).random
+        # MESA keeps the seed on the class too, so keep the seed of this model.
+        self.seed = seed
+        # NumPy generator for the vectorized parts of the model, derived from
+        # the (seeded) MESA generator so one seed reproduces the whole run.
+        self.rng = np.random.default_rng(self.random.getrandbits(64))
+        # Generator for the initial forest, fire and firefighters, so both
+        # backends start from the same layout for a seed.
+        self.layout_rng = np.random.default_rng(self.random.getrandbits(64))
 
         self.height = height
         self.width = width
         self.current_step = 0
 
-        self.grid = MultiGrid(height, width, torus=False)
         self.trees = []
         self.firefighters = []
 
-        self.schedule_Tree = RandomActivation(self)
+        self.schedule_Tree = ActiveFrontActivation(self)
         self.schedule_FireFighter = RandomActivation(self)
 
         self.density_trees = density_trees
@@ -56,96 +90,373 @@ class ForestFire(Model):
         self.extg_strength = extg_strength
 
         self.max_iter = max_iter
+        self.debug = debug
+        self.search_radius = search_radius
+        self.profiler = StepProfiler() if profile else NULL_PROFILER
 
-        self.datacollector = DataCollector(
-            {
-                "Density Trees": lambda m: len(m.trees)/(self.width * self.height),
-                "Fine": lambda m: self.count_type(m, "Fine"),
-                "On fire": lambda m: self.count_type(m, "On fire"),
-                "Burned": lambda m: self.count_type(m, "Burned"),
-            }
-        )
-        self._init_trees()
-        self._init_fire()
-        if self.strategy != "no_fighters":
-            self._init_firefighters()
+        # Number of trees per condition code, updated on every state transition.
+        self.condition_counts = [0, 0, 0, 0]
+        self._init_spaces()
+        self._distance_field = None
+        self._distance_field_step = None
+
+        self.recorder = recorder if recorder is not None else StatisticsRecorder()
+        if profile:
+            self.recorder.add_columns(PROFILE_FIELDS)
+        self.sink = sink if sink is not None else NULL_SINK
+        self._init_backend()
+        if snapshot is not None:
+            snapshot.restore_into(self)
+        else:
+            self._init_trees()
+            self._init_fire()
+            if self.strategy != "no_fighters":
+                self._init_firefighters()
 
         self.running = True
 
-    def _init_trees(self):
+    def _init_spaces(self):
+        """
+        Create the MESA grid and the indices over the whole grid: the fire
+        clusters, the empty cells and the cells on fire.
+        """
+        self.grid = MultiGrid(self.height, self.width, torus=False)
+        self.fire_clusters = FireClusterTracker(self.width, self.height)
+        # Cells without a tree, as flat indices x * height + y.
+        self.empty_cells = CellIndex(self.width * self.height, full=True)
+        self.fire_index = FireIndex(self.width, self.height)
+
+    def _init_backend(self):
         """
-        Init trees on every coordinate under a certain probability. 
+        Create the structures which hold the trees, the Tree agents are kept
+        on the MESA grid. The condition code, hp and burn rate of every cell
+        are also kept in arrays, updated whenever a tree changes, so a frame
+        of the grid is a copy instead of a loop over all trees.
         """
-        for (_, x, y) in self.grid.coord_iter():
-            if self.random.random() < self.density_trees:
+        self.tree_condition = np.zeros((self.width, self.height), dtype=np.int8)
+        self.tree_hp = np.zeros((self.width, self.height), dtype=np.int16)
+        self.tree_burn_rate = np.zeros((self.width, self.height), dtype=np.uint8)
 
-                new_tree = Tree(self.next_id(), (x, y), self)
-                self.grid._place_agent((x,y), new_tree)
-                self.trees.append(new_tree)
-                self.schedule_Tree.add(new_tree)
-        print('Done planting trees')
+    def _init_trees(self):
+        """
+        Init trees on every coordinate under a certain probability. The
+        coordinates are drawn at once as a density mask.
+        """
+        density_mask = self.layout_rng.random((self.width, self.height)) < self.density_trees
+        condition = np.where(density_mask, FINE, EMPTY).astype(np.int8)
+        self._place_trees(condition, np.where(density_mask, self.max_hp, 0), np.zeros_like(condition))
 
     def _init_fire(self):
         """
         Init a fire on a random spot on the field.
         """
-        tree = self.random.choice(self.trees)
+        tree = self.trees[self.layout_rng.integers(len(self.trees))]
         tree._ignite(start=True)
 
     def _init_firefighters(self):
         """
-        Init firefighters on the grid. Randomly or on a line.
+        Init firefighters on random spots of the grid.
         """
-        for _ in range(self.N_firefighters):
-            # x, y = self.random.randint(0, self.height - 1), self.random.randint(0, self.width -1)
-            x, y = self.random.randint(0, self.height-1), self.random.randint(0, self.width -1)
+        self._place_firefighters(self.layout_rng.integers(0, self.height, self.N_firefighters),
+                                 self.layout_rng.integers(0, self.width, self.N_firefighters))
+
+    def _place_firefighters(self, xs, ys, fires_extg=None):
+        """
+        Place firefighters on the grid and add them to the schedule.
+
+        :param xs: x coordinates of the firefighters.
+        :param ys: y coordinates of the firefighters.
+        :param fires_extg: Number of fires every firefighter has extinguished
+                           so far, zero when not given.
+        """
+        for i, (x, y) in enumerate(zip(np.asarray(xs).tolist(), np.asarray(ys).tolist())):
             firefighter = FireFighter(self.next_id(), (x, y), self, extg_strength=self.extg_strength, strategy=self.strategy)
+            if fires_extg is not None:
+                firefighter.fires_extg = int(fires_extg[i])
             self.grid._place_agent((x,y), firefighter)
             self.firefighters.append(firefighter)
             self.schedule_FireFighter.add(firefighter)
 
+    def _firefighter_arrays(self):
+        """
+        Arrays with the x and y coordinates of the firefighters and the
+        number of fires each of them extinguished.
+        """
+        xs = np.array([firefighter.pos[0] for firefighter in self.firefighters], dtype=np.int64)
+        ys = np.array([firefighter.pos[1] for firefighter in self.firefighters], dtype=np.int64)
+        fires_extg = np.array([firefighter.fires_extg for firefighter in self.firefighters],
+                              dtype=np.int64)
+        return xs, ys, fires_extg
+
+    def _place_trees(self, condition, hp, burn_rate, active=None):
+        """
+        Place trees in bulk on an empty grid. The trees are put in the grid
+        cells, schedule and counters directly, without the per tree
+        bookkeeping of _place_tree.
+
+        :param condition: Array shaped (width, height) with the condition
+                          codes of array_forest, EMPTY where there is no tree.
+        :param hp: Array with the hp of the trees.
+        :param burn_rate: Array with the burn rate of the trees.
+        :param active: Flat cells of the trees on fire or burned in the order
+                       of the active front, by default in cell order.
+        """
+        cells = np.flatnonzero(condition)
+        xs, ys = np.divmod(cells, self.height)
+        trees = np.asarray(condition) != EMPTY
+        self.tree_condition[...] = condition
+        self.tree_hp[...] = np.where(trees, hp, 0)
+        self.tree_burn_rate[...] = np.where(trees, burn_rate, 0)
+        codes = np.asarray(condition).ravel()[cells].tolist()
+        hps = np.asarray(hp).ravel()[cells].tolist()
+        burn_rates = np.asarray(burn_rate).ravel()[cells].tolist()
+        placed = {}
+        for cell, x, y, code, tree_hp, tree_burn_rate in zip(cells.tolist(), xs.tolist(), ys.tolist(),
+                                                             codes, hps, burn_rates):
+            tree = Tree(self.next_id(), (x, y), self)
+            tree._code = code
+            tree.hp = tree_hp
+            tree.burn_rate = tree_burn_rate
+            tree.trees_index = len(self.trees)
+            self.grid.grid[x][y].append(tree)
+            self.trees.append(tree)
+            self.schedule_Tree.add(tree)
+            self.condition_counts[code] += 1
+            if code != FINE:
+                placed[cell] = tree
+            if code == ON_FIRE:
+                self.fire_clusters.add(cell)
+                self.fire_index.add((x, y))
+        self.grid.empties.difference_update(zip(xs.tolist(), ys.tolist()))
+        self.empty_cells.remove_many(cells)
+        if active is None:
+            active = list(placed)
+        for cell in np.asarray(active).tolist():
+            self.schedule_Tree.activate(placed[cell])
+
+    def _active_cells(self):
+        """
+        Flat cells of the trees on fire or burned, in the order of the active
+        front.
+        """
+        return np.array([self.pos_to_cell(tree.pos) for tree in self.schedule_Tree.active.values()],
+                        dtype=np.int64)
+
+    def _tree_arrays(self):
+        """
+        Copies of the arrays shaped (width, height) with the condition codes,
+        hp and burn rate of the trees, as taken by _place_trees.
+        """
+        return self.tree_condition.copy(), self.tree_hp.copy(), self.tree_burn_rate.copy()
+
+    def _place_tree(self, tree):
+        """
+        Place a tree on the grid and add it to the schedule.
+        """
+        self.grid._place_agent(tree.pos, tree)
+        tree.trees_index = len(self.trees)
+        self.trees.append(tree)
+        self.schedule_Tree.add(tree)
+        self.condition_counts[tree._code] += 1
+        self.empty_cells.remove(self.pos_to_cell(tree.pos))
+        self.tree_condition[tree.pos] = tree._code
+        self.tree_hp[tree.pos] = tree.hp
+        self.tree_burn_rate[tree.pos] = tree.burn_rate
+
+    def _remove_tree(self, tree):
+        """
+        Remove a tree from the grid and the schedule. The last tree in the
+        trees list takes its place, so removing does not shift the list.
+        """
+        self.grid._remove_agent(tree.pos, tree)
+        self.schedule_Tree.remove(tree)
+        self.condition_counts[tree._code] -= 1
+        self.empty_cells.add(self.pos_to_cell(tree.pos))
+        self.tree_condition[tree.pos] = EMPTY
+        self.tree_hp[tree.pos] = 0
+        self.tree_burn_rate[tree.pos] = 0
+        last_tree = self.trees.pop()
+        if last_tree is not tree:
+            self.trees[tree.trees_index] = last_tree
+            last_tree.trees_index = tree.trees_index
+
+    def _condition_changed(self, tree, old_code, new_code):
+        """
+        Update the condition counters, condition array and fire clusters when
+        a tree changes its condition code.
+        """
+        self.condition_counts[old_code] -= 1
+        self.condition_counts[new_code] += 1
+        self.tree_condition[tree.pos] = new_code
+        if new_code == old_code:
+            return
+        if new_code == ON_FIRE:
+            self.fire_clusters.add(self.pos_to_cell(tree.pos))
+            self.fire_index.add(tree.pos)
+        elif old_code == ON_FIRE:
+            fate = "extinguished" if new_code == FINE else "burned out"
+            self.fire_clusters.remove(self.pos_to_cell(tree.pos), fate)
+            self.fire_index.remove(tree.pos)
+
+    def pos_to_cell(self, pos):
+        """
+        Flat index of a coordinate, as used by the cell based structures.
+        """
+        x, y = pos
+        return x * self.height + y
+
+    def cell_to_pos(self, cell):
+        """
+        Coordinate of a flat cell index.
+        """
+        x, y = divmod(int(cell), self.height)
+        return (x, y)
+
+    def _regrowth_cells(self, regrowth_rate):
+        """
+        Draw the cells for new trees in one batch: random cells without a tree
+        or a firefighter on them.
+        """
+        return self.empty_cells.sample(regrowth_rate, self.rng,
+                                       exclude=self._firefighter_cells())
+
+    def _firefighter_cells(self):
+        """
+        Flat indices of the cells with a firefighter on them.
+        """
+        return [self.pos_to_cell(firefighter.pos) for firefighter in self.firefighters]
+
     def plant_new_trees(self, regrowth_rate):
         """
         At every time step, plant an random amount of new trees.
         """
-        for _ in range(regrowth_rate):
-            # if self.grid.exists_empty_cells == True:
-            random_coord = self.grid.find_empty()
-            if random_coord is not None:
-                new_tree = Tree(self.next_id(),
-                                random_coord,
-                                self)
-                self.grid._place_agent(random_coord, new_tree)
-                self.trees.append(new_tree)
-                self.schedule_Tree.add(new_tree)
+        for cell in self._regrowth_cells(regrowth_rate):
+            self._place_tree(Tree(self.next_id(), self.cell_to_pos(cell), self))
 
     def step(self):
         """
         Method to move one step forward. 
         """
+        profiler = self.profiler
+        profiler.begin_step()
         self.current_step += 1
-        if (self.current_step % 1000 == 0):
-                print(self.current_step)
-        self.schedule_Tree.step()
+        if self.fire_clusters is not None:
+            self.fire_clusters.set_step(self.current_step)
+        self._step_trees()
+        profiler.lap("trees")
         if self.strategy != "no_fighters":
-            self.schedule_FireFighter.step()
+            if self.strategy == "pursue":
+                self.get_distance_field()
+            self._step_firefighters()
+        profiler.lap("firefighters")
 
         self.plant_new_trees(self.regrowth_rate)
+        profiler.lap("plant")
+
+        stop = self._finished()
+        profiler.lap("termination")
 
-        self.datacollector.collect(self)
-        
-        if (self.current_step > self.max_iter) or self.count_type(self, 'On fire') == 0:
-            df = self.datacollector.get_model_vars_dataframe()
-            datestring = time.ctime()[4:7]+'-'+time.ctime()[8:10]+'-'+time.ctime()[11:16]
-            directory = os.getcwd()
-            df.to_csv('{}\{}-report-{}.csv'.format(directory,datestring,self.strategy)) ### This gives an error, can u check?
+        # The last step is always recorded, whatever the sampling.
+        recorded = self.recorder.record(self, force=stop)
+        if stop:
             self.running = False
+            self.sink.write(self)
+        profiler.lap("collect")
+
+        if profiler.enabled:
+            timings = profiler.end_step()
+            if recorded:
+                self.recorder.record_extra(timings)
+
+    def _finished(self):
+        """
+        Check whether the run stops after this step, because the fire died
+        out or the maximum number of steps is reached.
+        """
+        return (self.current_step > self.max_iter) or self.count_type(self, 'On fire') == 0
+
+    def _step_trees(self):
+        """
+        Proceed the trees one step in random order. Only the trees on fire or
+        burned are stepped, since fine trees do nothing.
+        """
+        self.schedule_Tree.step()
 
-        return self.get_statistics()
+    def _step_firefighters(self):
+        """
+        Proceed all firefighters one step in random order.
+        """
+        self.schedule_FireFighter.step()
+
+    def get_burning_trees(self, pos, moore, radius, include_center=False):
+        """
+        Return the trees on fire in the neighbourhood of a position, in the
+        same order as the MESA grid returns them. The burning cells are
+        looked up in the fire index, so other agents are not visited.
+
+        :param pos: Coordinate to search around.
+        :param moore: Use the Moore neighbourhood instead of Von Neumann.
+        :param radius: Radius of the neighbourhood.
+        :param include_center: Also return a burning tree on pos itself.
+        """
+        xs, ys = self.fire_index.query(pos, radius, moore, include_center)
+        return [self._tree_at(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+
+    def _tree_at(self, x, y):
+        """
+        Return the tree on a coordinate.
+        """
+        for agent in self.grid.grid[x][y]:
+            if isinstance(agent, Tree):
+                return agent
+
+    def get_distance_field(self):
+        """
+        Return the distance field to the fire of the current step, see
+        FireIndex.distance_field. It is computed once per step, before the
+        firefighters move.
+        """
+        if self._distance_field_step != self.current_step:
+            self._distance_field = self.fire_index.distance_field()
+            self._distance_field_step = self.current_step
+        return self._distance_field
+
+    def is_on_fire(self, pos):
+        """
+        Check whether the tree on a coordinate, if any, is on fire.
+        """
+        return self.fire_index.mask[pos]
+
+    def count_trees(self):
+        """
+        Number of trees currently on the grid.
+        """
+        return len(self.trees)
 
     def get_fire_areas(self):
         """
-        Calculates the fire areas.
+        Calculates the fire areas from the fire cluster tracker. In debug
+        mode they are checked against labelling the whole grid.
+        """
+        surface_areas = self.fire_clusters.sizes()
+        if self.debug:
+            labelled = self.label_fire_areas()
+            if not np.array_equal(np.sort(surface_areas), np.sort(labelled)):
+                raise RuntimeError(
+                    f"Tracked fire areas {np.sort(surface_areas)} differ from labelled areas {np.sort(labelled)}"
+                )
+        return surface_areas
+
+    def get_fire_area_statistics(self):
+        """
+        Number, minimum, maximum, median and mean of the fire areas, see
+        statistics_recorder.fire_area_statistics.
+        """
+        return fire_area_statistics(self.get_fire_areas())
+
+    def label_fire_areas(self):
+        """
+        Calculates the fire areas by labelling the whole grid.
         """
         # Convert to numeric representation:
         numeric_grid = self.get_numeric_representation_of_grid()
@@ -157,7 +468,7 @@ class ForestFire(Model):
         numeric_grid = np.zeros((self.width, self.height), dtype=np.int8)
         trees = [agent for agent in self.schedule_Tree.agents if isinstance(agent, Tree)]
         for tree in trees:
-            if (tree.condition == "On fire"):
+            if tree._code == ON_FIRE:
                 numeric_grid[tree.pos] = 1
         return numeric_grid
 
@@ -168,36 +479,44 @@ class ForestFire(Model):
         - AF: Number of trees burned in each fire
         - Nf are the number of fires
         - Ns the time steps
+
+        The statistics of every step are recorded by the recorder, this
+        computes them for the current step only.
+        """
+        return dict(zip(STATISTICS, compute_metrics(self, STATISTICS)))
+
+    def _condition_count(self, tree_condition):
+        """
+        Read the counter of trees in a given condition.
         """
-        trees_on_fire = self.count_type(self, "On fire")
-        total_area = self.width * self.height
-        percentage_on_fire = trees_on_fire / total_area
-        n_s = self.current_step
-        fire_areas = self.get_fire_areas()
-        return {
-            "Nf": len(fire_areas),
-            "Ns": n_s,
-            "percentage_on_fire": percentage_on_fire,
-            "trees_on_fire": trees_on_fire,
-            "total_area": total_area,
-            "min_fire_area": np.min(fire_areas) if len(fire_areas) > 0 else 0,
-            "max_fire_area": np.max(fire_areas) if len(fire_areas) > 0 else 0,
-            "median_fire_area": np.median(fire_areas) if len(fire_areas) > 0 else 0,
-            "mean_fire_area": np.mean(fire_areas) if len(fire_areas) > 0 else 0,
-            "Density Trees": len(self.trees)/(self.width * self.height),
-            "Fine": self.count_type(self, "Fine"),
-            "On fire": trees_on_fire,
-        }
+        return self.condition_counts[CONDITION_CODES[tree_condition]]
 
     @staticmethod
     def count_type(model, tree_condition):
         """
         Helper method to count trees in a given condition in a given model.
+        Reads the condition counters, in debug mode they are checked against
+        a full scan of the trees.
+        """
+        count = model._condition_count(tree_condition)
+        if model.debug:
+            scanned = model.scan_type(model, tree_condition)
+            if np.any(count != scanned):
+                raise RuntimeError(
+                    f"Counter for '{tree_condition}' is {count}, but {scanned} trees were found"
+                )
+        return count
+
+    @staticmethod
+    def scan_type(model, tree_condition):
+        """
+        Count trees in a given condition by scanning all trees.
         """
+        code = CONDITION_CODES[tree_condition]
         count = 0
         trees = [agent for agent in model.schedule_Tree.agents if isinstance(agent, Tree)]
         for tree in trees:
-            if tree.condition == tree_condition:
+            if tree._code == code:
                 count += 1
         return count
 
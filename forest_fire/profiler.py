@@ -0,0 +1,103 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Opt-in profiler of the model step. It records the wall time of
+             every phase of a step (trees, firefighters, planting, the
+             termination check, and recording the statistics and writing the
+             report of a finished run) and counts
+             the agent steps and neighbour queries. A model without profiling
+             uses NullProfiler, whose methods do nothing.
+"""
+import time
+
+import pandas as pd
+
+PHASES = ["trees", "firefighters", "plant", "collect", "termination"]
+
+COUNTERS = ["tree_steps", "tree_neighbour_queries", "firefighter_steps",
+            "firefighter_neighbour_queries", "walker_neighbour_queries"]
+
+# Names of the values recorded for every step.
+FIELDS = [f"time_{phase}" for phase in PHASES] + COUNTERS
+
+
+class StepProfiler:
+
+    enabled = True
+
+    def __init__(self):
+        """
+        Class which records the time spent per phase and the number of agent
+        steps and neighbour queries of every model step.
+        """
+        self.records = []
+        self._current = None
+        self._last = None
+
+    def begin_step(self):
+        """
+        Start recording a new step.
+        """
+        self._current = dict.fromkeys(FIELDS, 0)
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        """
+        Add the time since the previous lap (or the start of the step) to a
+        phase.
+        """
+        now = time.perf_counter()
+        self._current[f"time_{phase}"] += now - self._last
+        self._last = now
+
+    def count(self, counter, n=1):
+        """
+        Add n to a counter of the current step.
+        """
+        if self._current is not None:
+            self._current[counter] += n
+
+    def end_step(self):
+        """
+        Finish the current step.
+
+        Returns:
+            Dict with the time per phase and the counters of the step.
+        """
+        record = self._current
+        self.records.append(record)
+        self._current = None
+        return dict(record)
+
+    def to_dataframe(self):
+        """
+        Table with one row per recorded step.
+        """
+        return pd.DataFrame(self.records, columns=FIELDS)
+
+    def summary(self):
+        """
+        Total time per phase and total counts over all recorded steps.
+        """
+        return self.to_dataframe().sum().to_dict()
+
+
+class NullProfiler:
+
+    enabled = False
+
+    def begin_step(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def count(self, counter, n=1):
+        pass
+
+    def end_step(self):
+        return None
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,151 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Offline renderer of the frame files of the FrameRecorder. Every
+             frame is drawn with the colours of config.json, the same as the
+             visualization server draws the grid, and saved as a PNG image or
+             as a frame of a video (.gif, or e.g. .mp4 with ffmpeg).
+
+             e.g. python -m forest_fire.render_frames run.frames --png frames
+                  python -m forest_fire.render_frames run.frames --video run.gif
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+from matplotlib import animation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import to_rgb
+from matplotlib.figure import Figure
+from matplotlib.image import imsave
+
+from .frame_canvas import frame_palette, frame_indices, hp_gradient
+from .frame_recorder import FrameReader
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
+
+
+def load_colours(path=CONFIG_PATH):
+    """
+    Colours of the conditions and firefighters in a config file.
+    """
+    with open(path) as json_file:
+        return json.load(json_file)["model"]["colors"]
+
+
+class FrameRenderer:
+
+    def __init__(self, colors, scale=4, replicate=0):
+        """
+        Class which draws the frames of a frame file as RGB images.
+
+        :param colors: Colours of the conditions and firefighters, as in the
+                       config file.
+        :param scale: Size of a cell in pixels.
+        :param replicate: Forest which is drawn when the frames have a
+                          replicate axis.
+        """
+        colour_hp = hp_gradient(colors)
+        self.fire_levels = len(colour_hp)
+        self.palette = (255 * np.array([to_rgb(colour) for colour in frame_palette(colors, colour_hp)])
+                        ).round().astype(np.uint8)
+        self.fighter_colour = (255 * np.array(to_rgb(colors["FireFighter"]))).round().astype(np.uint8)
+        self.scale = scale
+        self.replicate = replicate
+
+    def image(self, frame):
+        """
+        RGB image of a frame, with the top of the grid as first row like the
+        visualization server.
+
+        :param frame: Frame of a FrameReader.
+        Returns:
+            Array shaped (height * scale, width * scale, 3).
+        """
+        condition, hp = frame["condition"], frame["hp"]
+        xs, ys = frame["fighters_x"], frame["fighters_y"]
+        if condition.ndim == 3:
+            # The firefighters of all forests have global rows, see FireFighterBatch.
+            width = condition.shape[1]
+            condition, hp = condition[self.replicate], hp[self.replicate]
+            in_forest = xs // width == self.replicate
+            xs, ys = xs[in_forest] % width, ys[in_forest]
+        image = self.palette[frame_indices(condition, hp, self.fire_levels)]
+        image[condition.shape[1] - 1 - ys, xs] = self.fighter_colour
+        return image.repeat(self.scale, axis=0).repeat(self.scale, axis=1)
+
+
+def render_png(path, directory, renderer, every=1):
+    """
+    Save every k-th frame of a frame file as a PNG image, named after its step.
+
+    Returns:
+        The number of saved images.
+    """
+    os.makedirs(directory, exist_ok=True)
+    n_images = 0
+    for i, frame in enumerate(FrameReader(path)):
+        if i % every == 0:
+            imsave(os.path.join(directory, f"step-{frame['step']:06d}.png"), renderer.image(frame))
+            n_images += 1
+    return n_images
+
+
+def render_video(path, output, renderer, every=1, fps=10):
+    """
+    Save every k-th frame of a frame file as a video, a .gif with Pillow and
+    other formats with ffmpeg.
+
+    Returns:
+        The number of frames in the video.
+    """
+    frames = (frame for i, frame in enumerate(FrameReader(path)) if i % every == 0)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError(f"{path} has no frames")
+
+    image = renderer.image(first)
+    dpi = 100
+    figure = Figure(figsize=(image.shape[1] / dpi, image.shape[0] / dpi), dpi=dpi)
+    FigureCanvasAgg(figure)
+    shown = figure.figimage(image)
+    writer = animation.PillowWriter(fps=fps) if output.endswith(".gif") \
+        else animation.FFMpegWriter(fps=fps)
+    n_frames = 0
+    with writer.saving(figure, output, dpi):
+        writer.grab_frame()
+        n_frames += 1
+        for frame in frames:
+            shown.set_data(renderer.image(frame))
+            writer.grab_frame()
+            n_frames += 1
+    return n_frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a frame file of the FrameRecorder.")
+    parser.add_argument("frames", help="Frame file to render.")
+    parser.add_argument("--png", help="Directory to save a PNG image per frame in.")
+    parser.add_argument("--video", help="Video file to save, .gif or a format of ffmpeg.")
+    parser.add_argument("--config", default=CONFIG_PATH, help="Config file with the colours.")
+    parser.add_argument("--scale", type=int, default=4, help="Size of a cell in pixels.")
+    parser.add_argument("--every", type=int, default=1, help="Render every k-th frame.")
+    parser.add_argument("--fps", type=int, default=10, help="Frames per second of the video.")
+    parser.add_argument("--replicate", type=int, default=0,
+                        help="Forest to render of a run with replicates.")
+    args = parser.parse_args()
+    if args.png is None and args.video is None:
+        parser.error("give --png and/or --video")
+
+    renderer = FrameRenderer(load_colours(args.config), scale=args.scale, replicate=args.replicate)
+    if args.png is not None:
+        print(f"Saved {render_png(args.frames, args.png, renderer, args.every)} images in {args.png}")
+    if args.video is not None:
+        n_frames = render_video(args.frames, args.video, renderer, args.every, args.fps)
+        print(f"Saved {n_frames} frames to {args.video}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: ForestFire model which simulates several independent forests
+             of the same configuration together. The arrays of the forest,
+             the fire index and the firefighters carry a leading replicate
+             axis, so the fire spread, firefighters, regrowth and statistics
+             of all forests are done in the same array operations.
+"""
+import numpy as np
+from scipy import ndimage
+
+from .array_model import ArrayForestFire
+from .array_forest import ArrayForest, FINE
+from .cell_index import ReplicateCellIndex
+from .fire_index import FireIndex
+from .statistics_recorder import fire_area_statistics
+
+# Von Neumann connectivity within a forest, not along the replicate axis.
+FIRE_STRUCTURE = np.zeros((3, 3, 3), dtype=bool)
+FIRE_STRUCTURE[1] = ndimage.generate_binary_structure(2, 1)
+
+
+class ReplicateForestFire(ArrayForestFire):
+
+    def __init__(self, *args, replicates=1, **kwargs):
+        """
+        Create a model of several independent forests, takes the same
+        parameters as ForestFire. The forests have their own layout and fire,
+        but share one random number generator, so a forest does not follow
+        the same run as an ArrayForestFire with the same seed.
+
+        The statistics (e.g. count_type, get_statistics and the recorded
+        metrics) have one value per forest. A forest stops when its fire
+        died out or max_iter is reached, see stopped_at, and the model stops
+        when all forests did. The firefighters are always stepped as a
+        FireFighterBatch and snapshots are not supported.
+
+        :param replicates: Number of forests.
+        """
+        if kwargs.get("snapshot") is not None:
+            raise ValueError("ReplicateForestFire can not be restored from a snapshot")
+        kwargs.pop("batch_fighters", None)
+        self.replicates = replicates
+        # Step after which every forest stopped, 0 while it still runs.
+        self.stopped_at = np.zeros(replicates, dtype=np.int64)
+        super().__init__(*args, batch_fighters=True, **kwargs)
+
+    def _init_backend(self):
+        """
+        Create the ArrayForest, fire index and empty cells of all forests.
+        """
+        n_cells = self.width * self.height
+        self.forest = ArrayForest(self.width, self.height, self.max_hp,
+                                  replicates=self.replicates, compiled=self.compiled)
+        self.fire_index = FireIndex(self.width, self.height, replicates=self.replicates)
+        self.empty_cells = ReplicateCellIndex(self.replicates, n_cells, full=True)
+        self.forest.empty_cells = self.empty_cells
+        self.forest.fire_index = self.fire_index
+
+    def _init_trees(self):
+        """
+        Init trees on every coordinate of every forest under a certain
+        probability.
+        """
+        density_mask = self.layout_rng.random(self.forest.condition.shape) < self.density_trees
+        self.forest.plant(np.flatnonzero(density_mask))
+
+    def _init_fire(self):
+        """
+        Init a fire on a random spot of every forest.
+        """
+        n_cells = self.width * self.height
+        for r in range(self.replicates):
+            cells = np.flatnonzero(self.forest.condition[r] == FINE)
+            cell = r * n_cells + cells[self.layout_rng.integers(len(cells))]
+            self.forest.ignite(cell, self.rng, self.ignition_prob,
+                               self.max_burn_rate, start=True)
+
+    def _init_firefighters(self):
+        """
+        Init N_firefighters firefighters on random spots of every forest.
+        """
+        shape = (self.replicates, self.N_firefighters)
+        xs = self.layout_rng.integers(0, self.width, shape)
+        ys = self.layout_rng.integers(0, self.height, shape)
+        rows = xs + self.width * np.arange(self.replicates)[:, None]
+        self._place_firefighters(rows.ravel(), ys.ravel())
+
+    def _regrowth_cells(self, regrowth_rate):
+        """
+        Draw the cells for new trees in the forests which did not stop.
+        """
+        return self.empty_cells.sample(regrowth_rate, self.rng,
+                                       exclude=self._firefighter_cells(),
+                                       replicates=np.flatnonzero(self.stopped_at == 0))
+
+    def _finished(self):
+        """
+        Mark the forests whose fire died out in this step, or all of them
+        after max_iter steps, as stopped. The run stops when all forests
+        stopped.
+        """
+        if self.current_step > self.max_iter:
+            stopping = self.stopped_at == 0
+        else:
+            stopping = (self.stopped_at == 0) & (self.count_type(self, 'On fire') == 0)
+        self.stopped_at[stopping] = self.current_step
+        return bool(np.all(self.stopped_at > 0))
+
+    def get_fire_areas(self):
+        """
+        Calculates the fire areas of every forest by labelling all forests
+        at once.
+
+        Returns:
+            List with an array of fire areas per forest.
+        """
+        labels, _ = ndimage.label(self.fire_index.mask, structure=FIRE_STRUCTURE)
+        sizes = np.bincount(labels.ravel())[1:]
+        # Labels are numbered in array order, so forest after forest.
+        ends = np.maximum.accumulate(labels.reshape(self.replicates, -1).max(axis=1))
+        starts = np.r_[0, ends[:-1]]
+        return [sizes[start:end] for start, end in zip(starts, ends)]
+
+    def get_fire_area_statistics(self):
+        """
+        Number, minimum, maximum, median and mean of the fire areas, arrays
+        with one value per forest.
+        """
+        statistics = [fire_area_statistics(areas) for areas in self.get_fire_areas()]
+        return tuple(np.array(values) for values in zip(*statistics))
+
+    def label_fire_areas(self):
+        return np.concatenate(self.get_fire_areas())
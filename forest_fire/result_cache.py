@@ -0,0 +1,245 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: On-disk cache of the statistics of finished sweep runs. A run
+             is stored under the hash of everything which determines its
+             course: the model parameters, the strategy, the number of
+             firefighters, the extinguishing strength, the seed, the maximum
+             number of steps, the model class and MODEL_VERSION. When the
+             cache grows beyond its size bound, the least recently used
+             runs are removed. Run as python -m forest_fire.result_cache to
+             inspect or invalidate the cache.
+"""
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Tag of the model code. Increase it when a change of the model changes the
+# course of a run, so runs cached by the old code are no longer used.
+# 2: the batched firefighters extinguish in global activation order.
+MODEL_VERSION = 2
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "forest_fire")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def run_description(parameters, model, strategy, n_fighters, ext_strength, seed,
+                    max_steps, replicates=1, replicate_index=0):
+    """
+    Description of a run, of which the hash is its key in the cache.
+
+    :param parameters: Model parameters which are the same for every run of
+                       the sweep, see sweep.model_parameters.
+    :param model: Name of the model class.
+    :param seed: Seed of the model.
+    :param replicates: Number of replicates simulated together in the model.
+    :param replicate_index: Index of the run among those replicates.
+    """
+    return {
+        "version": MODEL_VERSION,
+        "model": model,
+        "parameters": parameters,
+        "strategy": strategy,
+        "n_fighters": int(n_fighters),
+        "ext_strength": int(ext_strength),
+        "seed": int(seed),
+        "max_steps": int(max_steps),
+        "replicates": int(replicates),
+        "replicate_index": int(replicate_index),
+    }
+
+
+def run_key(description):
+    """
+    Hash of a run description, independent of the order of its keys.
+    """
+    text = json.dumps(description, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class ResultCache:
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Cache of the recorded statistics of runs, one .npz file per run.
+        Only the process which owns the cache should write to it.
+
+        :param directory: Directory of the cache, by default the
+                          FOREST_FIRE_CACHE environment variable or
+                          ~/.cache/forest_fire.
+        :param max_bytes: Size bound of the cache in bytes.
+        """
+        self.directory = directory or os.environ.get("FOREST_FIRE_CACHE", DEFAULT_DIRECTORY)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Key of every entry to its size, filled on first use.
+        self._sizes = None
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".npz")
+
+    def _entries(self):
+        """
+        Dict from the key of every entry to its size in bytes.
+        """
+        if self._sizes is None:
+            self._sizes = {}
+            if os.path.isdir(self.directory):
+                for folder in os.scandir(self.directory):
+                    if not folder.is_dir():
+                        continue
+                    for entry in os.scandir(folder.path):
+                        if entry.name.endswith(".npz"):
+                            self._sizes[entry.name[:-4]] = entry.stat().st_size
+        return self._sizes
+
+    def __contains__(self, key):
+        return key in self._entries()
+
+    def __len__(self):
+        return len(self._entries())
+
+    @property
+    def nbytes(self):
+        return sum(self._entries().values())
+
+    def get(self, key):
+        """
+        Recorded statistics of a run, or None when it is not in the cache.
+
+        Returns:
+            Record array with one record per recorded step.
+        """
+        if key not in self._entries():
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                records = entry["records"]
+        except (OSError, ValueError, KeyError):
+            # Removed by another process or damaged, it is computed again.
+            self._sizes.pop(key, None)
+            self.misses += 1
+            return None
+        # The modification time marks when an entry was last used.
+        os.utime(path)
+        self.hits += 1
+        return records
+
+    def put(self, key, records, description):
+        """
+        Store the recorded statistics of a run, and remove the least recently
+        used runs when the cache is too big.
+
+        :param key: run_key of the description.
+        :param records: Record array with one record per recorded step.
+        :param description: run_description of the run, saved with it.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Written next to the entry and renamed, so an entry is never partial.
+        partial = path[:-4] + ".partial.npz"
+        np.savez_compressed(partial, records=records,
+                            description=np.array(json.dumps(description, sort_keys=True)))
+        os.replace(partial, path)
+        self._entries()[key] = os.path.getsize(path)
+        self.evict(self.max_bytes)
+
+    def evict(self, max_bytes):
+        """
+        Remove the least recently used runs until the cache takes at most
+        max_bytes.
+
+        Returns:
+            Number of removed runs.
+        """
+        entries = self._entries()
+        total = sum(entries.values())
+        if total <= max_bytes:
+            return 0
+        used = {key: os.path.getmtime(self._path(key)) for key in entries}
+        removed = 0
+        for key in sorted(used, key=used.get):
+            if total <= max_bytes:
+                break
+            total -= entries[key]
+            self.remove(key)
+            removed += 1
+        return removed
+
+    def remove(self, key):
+        self._entries().pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def description(self, key):
+        """
+        The run_description saved with a run.
+        """
+        with np.load(self._path(key)) as entry:
+            return json.loads(entry["description"].item())
+
+    def invalidate(self, match=None):
+        """
+        Remove runs from the cache.
+
+        :param match: Function which gets the description of a run and
+                      returns whether to remove it, None removes all runs.
+        Returns:
+            Number of removed runs.
+        """
+        removed = 0
+        for key in list(self._entries()):
+            if match is None or match(self.description(key)):
+                self.remove(key)
+                removed += 1
+        return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the sweep result cache.")
+    parser.add_argument("--directory", help="directory of the cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info", help="show the number and size of the cached runs")
+    evict = commands.add_parser("evict", help="remove the least recently used runs")
+    evict.add_argument("max_mb", type=float, help="size to shrink the cache to, in MB")
+    invalidate = commands.add_parser(
+        "invalidate", help="remove the runs of older model versions, or the runs "
+                           "matching all given filters")
+    invalidate.add_argument("--all", action="store_true", help="remove every run")
+    invalidate.add_argument("--strategy")
+    invalidate.add_argument("--n-fighters", type=int)
+    invalidate.add_argument("--ext-strength", type=int)
+    invalidate.add_argument("--model", help="name of the model class")
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.directory)
+    if args.command == "info":
+        print(f"{cache.directory}: {len(cache)} runs, {cache.nbytes / 1e6:.1f} MB")
+    elif args.command == "evict":
+        print(f"removed {cache.evict(int(args.max_mb * 1e6))} runs")
+    else:
+        filters = {"strategy": args.strategy, "n_fighters": args.n_fighters,
+                   "ext_strength": args.ext_strength, "model": args.model}
+        filters = {name: value for name, value in filters.items() if value is not None}
+        if args.all:
+            match = None
+        elif filters:
+            def match(description):
+                return all(description[name] == value for name, value in filters.items())
+        else:
+            def match(description):
+                return description["version"] != MODEL_VERSION
+        print(f"removed {cache.invalidate(match)} runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Sinks for the report of a finished run. When a model stops, it
+             hands its recorded statistics to its sink, which can drop them
+             (the default), keep them in memory, or write them to a CSV,
+             NPZ or Parquet file per run, or in batches to one store file
+             shared by many runs and processes.
+"""
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, writes to a shared store are not locked there.
+    fcntl = None
+
+# Model parameters which are saved with a report.
+REPORT_PARAMETERS = ["height", "width", "density_trees", "max_burn_rate", "ignition_prob",
+                     "max_hp", "max_iter", "regrowth_rate", "N_firefighters", "strategy",
+                     "extg_strength", "search_radius"]
+
+
+def report_parameters(model):
+    """
+    Parameters and seed of a model, as saved with its report.
+    """
+    parameters = {name: getattr(model, name) for name in REPORT_PARAMETERS}
+    parameters["seed"] = model.seed
+    return parameters
+
+
+class NullSink:
+
+    def write(self, model):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_SINK = NullSink()
+
+
+class MemorySink:
+
+    def __init__(self):
+        """
+        Sink which keeps the reports of the runs in memory, in reports, as
+        dicts with the parameters, the recorded steps and a copy of every
+        recorded column.
+        """
+        self.reports = []
+
+    def write(self, model):
+        recorder = model.recorder
+        self.reports.append({
+            "parameters": report_parameters(model),
+            "steps": recorder.steps[:len(recorder)].copy(),
+            "columns": {name: recorder.column(name).copy() for name in recorder.columns},
+        })
+
+    def close(self):
+        pass
+
+
+class FileSink:
+
+    extension = None
+
+    def __init__(self, directory=".", name="{date}-report-{strategy}-{run}"):
+        """
+        Base class of the sinks which write one file per run.
+
+        :param directory: Directory of the files, made when it is missing.
+        :param name: Name of the files without extension, formatted with the
+                     end time of the run as date, a random id of the run as
+                     run and the model parameters. Without run, runs which
+                     end in the same second can overwrite each other.
+        """
+        self.directory = directory
+        self.name = name
+
+    def path(self, model):
+        """
+        Path of the report of a model.
+        """
+        date = time.strftime("%b-%d-%H-%M-%S")
+        name = self.name.format(date=date, run=uuid.uuid4().hex[:8], **report_parameters(model))
+        return os.path.join(self.directory, name + self.extension)
+
+    def write(self, model):
+        os.makedirs(self.directory, exist_ok=True)
+        self._save(self.path(model), model)
+
+    def _save(self, path, model):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CSVSink(FileSink):
+
+    extension = ".csv"
+
+    def _save(self, path, model):
+        model.recorder.to_dataframe().to_csv(path)
+
+
+class NPZSink(FileSink):
+
+    extension = ".npz"
+
+    def _save(self, path, model):
+        recorder = model.recorder
+        parameters = {f"parameter_{name}": value for name, value in report_parameters(model).items()
+                      if value is not None}
+        np.savez_compressed(path, step=recorder.steps[:len(recorder)], **parameters,
+                            **{name: recorder.column(name) for name in recorder.columns})
+
+
+class ParquetSink(FileSink):
+
+    extension = ".parquet"
+
+    def _save(self, path, model):
+        data = model.recorder.to_dataframe()
+        # With replicates the long table has the step already.
+        if "step" not in data:
+            data.insert(0, "step", model.recorder.steps[:len(model.recorder)])
+        data.to_parquet(path)
+
+
+# Value of a parameter which is None in a store written by StoreSink.
+MISSING = -1
+
+
+class StoreSink:
+
+    def __init__(self, path, batch_size=64):
+        """
+        Sink which appends the reports of many runs to one store file. The
+        reports are buffered and appended in batches, each batch as one
+        record array with a run id, the parameters, the step and the
+        replicate per row, one row per step of every forest of a model with
+        replicates and replicate 0 otherwise.
+        Parameters which are None, such as a missing seed, are stored as
+        MISSING.
+        Every process keeps its own buffer, appends are locked so several
+        processes can share the file. The runs in a store should record the
+        same metrics. Read it back with load_store.
+
+        :param path: Path of the store file, usually ending on .npy.
+        :param batch_size: Number of runs which are buffered before they are
+                           appended.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer = []
+
+    def write(self, model):
+        recorder = model.recorder
+        data = recorder.to_dataframe()
+        if "step" not in data:
+            data.insert(0, "step", recorder.steps[:len(recorder)])
+            data.insert(1, "replicate", 0)
+        n_rows = len(data)
+        # Every run of a store has the same fields, also without a seed.
+        columns = {name: np.full(n_rows, MISSING if value is None else value)
+                   for name, value in report_parameters(model).items()}
+        # A random id, the id of a model is reused once it is collected.
+        columns["run_id"] = np.full(n_rows, uuid.uuid4().hex)
+        columns.update((name, data[name].to_numpy()) for name in data.columns)
+        self._buffer.append(columns)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Append the buffered reports to the store.
+        """
+        if not self._buffer:
+            return
+        names = list(self._buffer[0])
+        records = np.rec.fromarrays([np.concatenate([columns[name] for columns in self._buffer])
+                                     for name in names], names=names)
+        with open(self.path, "ab") as store:
+            if fcntl is not None:
+                fcntl.flock(store, fcntl.LOCK_EX)
+            try:
+                np.save(store, records, allow_pickle=False)
+                store.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(store, fcntl.LOCK_UN)
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_store(path):
+    """
+    Read all batches of a store written by StoreSink as one table.
+    """
+    batches = []
+    with open(path, "rb") as store:
+        size = os.fstat(store.fileno()).st_size
+        while store.tell() < size:
+            batches.append(pd.DataFrame(np.load(store, allow_pickle=False)))
+    if not batches:
+        return pd.DataFrame()
+    return pd.concat(batches, ignore_index=True)
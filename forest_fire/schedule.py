@@ -0,0 +1,72 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Scheduler which only steps the active agents, based on the
+             scheduler classes of the MESA framework. For the trees these
+             are the trees which are on fire or burned, since a fine tree
+             does nothing when it is stepped.
+"""
+from heapq import heapify, heappop, heappush
+
+from mesa.time import BaseScheduler
+
+
+class ActiveFrontActivation(BaseScheduler):
+    """
+    Activates the active agents once per step in random order, so the cost of
+    a step grows with the number of active agents instead of all agents.
+
+    Every active agent gets a random activation time in [0, 1) each step,
+    which gives the same order as shuffling all agents. An agent activated
+    during a step gets an activation time as well, and is stepped in the
+    same step when that time is still to come, just as it would have been
+    with RandomActivation.
+    """
+
+    def __init__(self, model):
+        super().__init__(model)
+        self.active = {}
+        self._queue = None
+        self._now = 0.
+
+    def activate(self, agent):
+        """
+        Add an agent to the active front.
+
+        :param agent: Agent which has been added to the schedule.
+        """
+        if agent.unique_id in self.active:
+            return
+        self.active[agent.unique_id] = agent
+        if self._queue is not None:
+            activation_time = self.model.random.random()
+            if activation_time > self._now:
+                heappush(self._queue, (activation_time, agent.unique_id))
+
+    def deactivate(self, agent):
+        """
+        Remove an agent from the active front, it stays in the schedule.
+        """
+        self.active.pop(agent.unique_id, None)
+
+    def remove(self, agent):
+        super().remove(agent)
+        self.deactivate(agent)
+
+    def step(self):
+        """
+        Executes the step of all active agents, one at a time, in random
+        order.
+        """
+        self._queue = [(self.model.random.random(), key) for key in self.active]
+        heapify(self._queue)
+        while self._queue:
+            self._now, key = heappop(self._queue)
+            agent = self.active.get(key)
+            if agent is not None:
+                agent.step()
+        self._queue = None
+        self._now = 0.
+        self.steps += 1
+        self.time += 1
@@ -12,14 +12,15 @@ from mesa.visualization.UserParam import UserSettableParameter
 from .model import ForestFire
 from .tree import Tree
 from .firefighter import FireFighter
+from .result_sinks import CSVSink
+from .frame_canvas import FrameCanvas, hp_gradient
 
-from colour import Color
 import json
 
 # Open the config file to easily reuse certain configurations.
 with open('forest_fire/config.json') as json_file:
     CONFIG = json.load(json_file)
-    COLOUR_HP = [_.hex for _ in list(Color(CONFIG['model']['colors']['Burned']).range_to(Color(CONFIG['model']['colors']['On fire']), 101))]
+    COLOUR_HP = hp_gradient(CONFIG['model']['colors'])
     json_file.close()
 
 def model_portrayal(agent):
@@ -49,14 +50,18 @@ def model_portrayal(agent):
         portrayal["Color"] = CONFIG['model']['colors']['FireFighter']
         return portrayal
 
-# The grid
-canvas_element = CanvasGrid(model_portrayal, 
-                            CONFIG['grid']['width'], 
-                            CONFIG['grid']['height'], 
-                            500, 500)
+# The grid, sent as frames unless the config asks for a portrayal per agent
+if CONFIG['grid'].get('render', 'frames') == 'frames':
+    canvas_element = FrameCanvas(CONFIG['model']['colors'], COLOUR_HP, 500, 500)
+else:
+    canvas_element = CanvasGrid(model_portrayal, 
+                                CONFIG['grid']['width'], 
+                                CONFIG['grid']['height'], 
+                                500, 500)
 
 tree_chart = ChartModule(
-    [{"Label": label, "Color": color} for (label, color) in CONFIG['agents']['tree']['colors'].items()]
+    [{"Label": label, "Color": color} for (label, color) in CONFIG['agents']['tree']['colors'].items()],
+    data_collector_name="recorder"
 )
 
 # Parameters for the forest_fire model
@@ -70,8 +75,11 @@ model_parameters = {
     'max_iter': 5000,
     'regrowth_rate': UserSettableParameter('slider', 'Regrowth Rate', CONFIG['model']['regrowth_rate'], 5, 50, 5),
     'N_firefighters': UserSettableParameter('slider', 'N Firefighters', CONFIG['model']['N_firefighters'], 10, 1000, 10),
-    'strategy': UserSettableParameter('choice', 'Strategy', CONFIG['agents']['fighter']['strategy'], choices=['no_fighter','random', 'closest', 'biggest','earliest']),
-    'extg_strength': UserSettableParameter('slider', 'Extinguish strength', CONFIG['agents']['fighter']['extg_strength'], 10, 100,10)
+    'strategy': UserSettableParameter('choice', 'Strategy', CONFIG['agents']['fighter']['strategy'], choices=['no_fighter','random', 'closest', 'pursue', 'biggest','earliest']),
+    'extg_strength': UserSettableParameter('slider', 'Extinguish strength', CONFIG['agents']['fighter']['extg_strength'], 10, 100,10),
+    'search_radius': UserSettableParameter('slider', 'Search radius', CONFIG['agents']['fighter']['search_radius'], 1, 50, 1),
+    # Keep a CSV report of every run in the working directory.
+    'sink': CSVSink()
 }
 
 # Start the server
@@ -0,0 +1,37 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Base class of the agents. It has the interface of the MESA
+             Agent (unique_id, model, pos, step, advance and random), but
+             keeps its attributes in __slots__ instead of an instance dict,
+             which makes every agent several times smaller. The MESA Agent
+             has a dict, so subclasses of it can not do without one.
+"""
+
+
+class SlottedAgent:
+
+    __slots__ = ("unique_id", "model", "pos")
+
+    def __init__(self, unique_id, model):
+        """
+        Base class for an agent of the model, subclasses declare their
+        attributes in __slots__.
+
+        :param unique_id: Unique id for every agent, model.next_id().
+        :param model: The forest_fire model
+        """
+        self.unique_id = unique_id
+        self.model = model
+        self.pos = None
+
+    def step(self):
+        pass
+
+    def advance(self):
+        pass
+
+    @property
+    def random(self):
+        return self.model.random
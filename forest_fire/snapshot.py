@@ -0,0 +1,156 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Snapshots of the state of a forest fire model. A snapshot holds
+             the condition, hp and burn rate of every cell, the firefighters,
+             the random number generator states and the current step. It is
+             saved as a directory with one .npy file per array, which can be
+             memory-mapped, and a JSON file with the rest. A snapshot can be
+             restored into either backend, also with another strategy, so
+             several runs can branch from one warmed-up forest.
+"""
+import json
+import os
+import random
+
+import numpy as np
+
+from .model import ForestFire
+from .array_model import ArrayForestFire
+
+MODEL_CLASSES = {"ForestFire": ForestFire, "ArrayForestFire": ArrayForestFire}
+
+# Model parameters which are stored in a snapshot.
+PARAMETERS = ["height", "width", "density_trees", "max_burn_rate", "ignition_prob",
+              "max_hp", "max_iter", "regrowth_rate", "N_firefighters", "strategy",
+              "extg_strength", "debug", "search_radius"]
+
+ARRAYS = ["condition", "hp", "burn_rate", "active", "empty_cells", "fighters_x",
+          "fighters_y", "fires_extg"]
+
+
+class Snapshot:
+
+    def __init__(self, state, arrays):
+        """
+        Class which represents the state of a model at the end of a step.
+
+        :param state: Dict with the model class, parameters, current step and
+                      random number generator states.
+        :param arrays: Dict with the condition codes, hp and burn rate of the
+                       cells, the order of the active trees and of the empty
+                       cells, and the coordinates and extinguished fires of
+                       the firefighters.
+        """
+        self.state = state
+        self.arrays = arrays
+
+    @classmethod
+    def take(cls, model):
+        """
+        Take a snapshot of a model.
+        """
+        parameters = {name: getattr(model, name) for name in PARAMETERS}
+        if isinstance(model, ArrayForestFire):
+            parameters["batch_fighters"] = model.batch_fighters
+            parameters["compiled"] = model.compiled
+        version, internal_state, gauss_next = model.random.getstate()
+        state = {
+            "model": type(model).__name__,
+            "parameters": parameters,
+            "current_step": model.current_step,
+            "random_state": [version, list(internal_state), gauss_next],
+            "rng_state": model.rng.bit_generator.state,
+        }
+        condition, hp, burn_rate = model._tree_arrays()
+        fighters_x, fighters_y, fires_extg = model._firefighter_arrays()
+        arrays = {
+            "condition": condition,
+            "hp": hp,
+            "burn_rate": burn_rate,
+            "active": model._active_cells(),
+            "empty_cells": model.empty_cells.to_array(),
+            "fighters_x": fighters_x,
+            "fighters_y": fighters_y,
+            "fires_extg": fires_extg,
+        }
+        return cls(state, arrays)
+
+    def save(self, path):
+        """
+        Save the snapshot to a directory.
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, name + ".npy"), self.arrays[name])
+        with open(os.path.join(path, "snapshot.json"), "w") as state_file:
+            json.dump(self.state, state_file)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Load a snapshot from a directory.
+
+        :param mmap: Memory-map the arrays instead of reading them, so many
+                     processes can restore from the same files.
+        """
+        with open(os.path.join(path, "snapshot.json")) as state_file:
+            state = json.load(state_file)
+        arrays = {name: np.load(os.path.join(path, name + ".npy"),
+                                mmap_mode="r" if mmap else None)
+                  for name in ARRAYS}
+        return cls(state, arrays)
+
+    def restore(self, model_class=None, **overrides):
+        """
+        Create a model which continues from the snapshot.
+
+        :param model_class: ForestFire or ArrayForestFire, by default the
+                            class of the model the snapshot was taken from.
+        :param overrides: Model parameters to change, e.g. strategy or
+                          N_firefighters to branch off with other
+                          firefighters. With another number of firefighters
+                          they are placed again at random. A seed gives the
+                          new model fresh random number generators instead of
+                          the ones in the snapshot.
+
+        The recorded statistics are not part of a snapshot and
+        the fire clusters start anew at the step of the snapshot.
+        """
+        if model_class is None:
+            model_class = MODEL_CLASSES[self.state["model"]]
+        parameters = dict(self.state["parameters"])
+        if model_class is not ArrayForestFire:
+            parameters.pop("batch_fighters", None)
+            parameters.pop("compiled", None)
+        parameters.update(overrides)
+        return model_class(snapshot=self, **parameters)
+
+    def restore_into(self, model):
+        """
+        Set the state of a model which is being created, called by
+        ForestFire.__init__ instead of planting a new forest.
+        """
+        arrays = self.arrays
+        model.current_step = self.state["current_step"]
+        model.fire_clusters.set_step(model.current_step)
+        model.schedule_Tree.steps = model.schedule_Tree.time = model.current_step
+        model.schedule_FireFighter.steps = model.schedule_FireFighter.time = model.current_step
+        model._place_trees(arrays["condition"], arrays["hp"], arrays["burn_rate"],
+                           arrays["active"])
+        model.empty_cells.reset(arrays["empty_cells"])
+
+        if model.seed is None:
+            version, internal_state, gauss_next = self.state["random_state"]
+            model.random = random.Random()
+            model.random.setstate((version, tuple(internal_state), gauss_next))
+            model.rng.bit_generator.state = self.state["rng_state"]
+
+        if model.strategy == "no_fighters":
+            return
+        if len(arrays["fighters_x"]) == model.N_firefighters:
+            model._place_firefighters(arrays["fighters_x"], arrays["fighters_y"],
+                                      arrays["fires_extg"])
+        else:
+            model._init_firefighters()
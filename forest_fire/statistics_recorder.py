@@ -0,0 +1,251 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Recorder of the model statistics. The selected metrics of a step
+             are written into preallocated typed column arrays, which grow
+             geometrically when they are full, instead of building a dict per
+             step. Steps can be sampled every k steps or only when a value
+             changed, and a DataFrame is only made when asked for. A model
+             with replicates gives one value per forest for every metric,
+             which are recorded as columns with a replicate axis.
+"""
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+
+# Metrics which can be recorded, with their dtype. The fire area metrics
+# share one computation of the fire areas.
+METRICS = {
+    "Nf": np.int64,
+    "Ns": np.int64,
+    "percentage_on_fire": np.float64,
+    "trees_on_fire": np.int64,
+    "total_area": np.int64,
+    "min_fire_area": np.int64,
+    "max_fire_area": np.int64,
+    "median_fire_area": np.float64,
+    "mean_fire_area": np.float64,
+    "Density Trees": np.float64,
+    "Fine": np.int64,
+    "On fire": np.int64,
+    "Burned": np.int64,
+}
+
+# Metrics returned by ForestFire.get_statistics.
+STATISTICS = list(METRICS)[:12]
+
+FIRE_AREA_METRICS = {"Nf", "min_fire_area", "max_fire_area", "median_fire_area", "mean_fire_area"}
+
+# Metrics which count the steps, so they change every step. They are left out
+# when looking for a change, the step is kept in StatisticsRecorder.steps.
+STEP_METRICS = {"Ns"}
+
+
+def fire_area_statistics(fire_areas):
+    """
+    Number, minimum, maximum, median and mean of the fire areas, 0 when there
+    is no fire. The areas are sorted once instead of searched per statistic.
+    """
+    n_fires = len(fire_areas)
+    if n_fires == 0:
+        return 0, 0, 0, 0, 0
+    areas = np.sort(fire_areas)
+    median = (areas[(n_fires - 1) // 2] + areas[n_fires // 2]) / 2
+    return n_fires, areas[0], areas[-1], median, areas.mean()
+
+
+def compute_metrics(model, names):
+    """
+    Values of metrics for the current step of a model.
+
+    :param model: ForestFire model.
+    :param names: Names of the metrics, keys of METRICS.
+    Returns:
+        List with the value of every metric, in the order of names.
+    """
+    total_area = model.width * model.height
+    values = {}
+    if FIRE_AREA_METRICS.intersection(names):
+        (values["Nf"], values["min_fire_area"], values["max_fire_area"],
+         values["median_fire_area"], values["mean_fire_area"]) = model.get_fire_area_statistics()
+    result = []
+    for name in names:
+        if name in values:
+            result.append(values[name])
+        elif name == "Ns":
+            result.append(model.current_step)
+        elif name in ("On fire", "trees_on_fire"):
+            result.append(model.count_type(model, "On fire"))
+        elif name == "percentage_on_fire":
+            result.append(model.count_type(model, "On fire") / total_area)
+        elif name == "total_area":
+            result.append(total_area)
+        elif name == "Density Trees":
+            result.append(model.count_trees() / total_area)
+        else:
+            result.append(model.count_type(model, name))
+    return result
+
+
+class ColumnValues(Sequence):
+
+    __slots__ = ("_column",)
+
+    def __init__(self, column):
+        """
+        Read-only list of the recorded values of a metric, which gives Python
+        numbers like the lists of the DataCollector. Only the values which
+        are read are converted.
+
+        :param column: Recorded column, see StatisticsRecorder.column.
+        """
+        self._column = column
+
+    def __len__(self):
+        return len(self._column)
+
+    def __getitem__(self, index):
+        return self._column[index].tolist()
+
+
+class StatisticsRecorder:
+
+    def __init__(self, metrics=None, every=1, on_change=False, capacity=1024):
+        """
+        Class which records statistics of a model into column arrays.
+
+        :param metrics: Names of the metrics to record, keys of METRICS. None
+                        records all of them, an empty list only the steps.
+        :param every: Record every k-th step.
+        :param on_change: Only record a step when one of the metrics,
+                          other than the STEP_METRICS, differs from the
+                          last recorded step.
+        :param capacity: Number of rows allocated at the start, doubled
+                         every time the columns are full. The columns of the
+                         metrics are allocated at the first recorded step,
+                         with the shape of its values.
+        """
+        self.metrics = list(METRICS) if metrics is None else list(metrics)
+        unknown = set(self.metrics) - set(METRICS)
+        if unknown:
+            raise ValueError(f"Unknown metrics {sorted(unknown)}, choose from {list(METRICS)}")
+        self.every = every
+        self.on_change = on_change
+        self.n_rows = 0
+        self.steps = np.empty(capacity, dtype=np.int64)
+        self.columns = {}
+        self.extra = []
+        self._last = None
+        # Positions of the metrics which are compared for on_change.
+        self._compared = [i for i, name in enumerate(self.metrics) if name not in STEP_METRICS]
+
+    def __len__(self):
+        return self.n_rows
+
+    def add_columns(self, names, dtype=np.float64):
+        """
+        Add columns for values which are set with record_extra, e.g. the
+        fields of the StepProfiler. Rows without a value are NaN.
+        """
+        for name in names:
+            if name not in self.columns:
+                self.columns[name] = np.full(len(self.steps), np.nan, dtype=dtype)
+                self.extra.append(name)
+
+    def _grow(self):
+        """
+        Double the capacity of the columns.
+        """
+        capacity = max(2 * len(self.steps), 1)
+        self.steps = self._resized(self.steps, capacity)
+        for name, column in self.columns.items():
+            self.columns[name] = self._resized(column, capacity)
+
+    def _resized(self, column, capacity):
+        resized = np.empty((capacity,) + column.shape[1:], dtype=column.dtype)
+        resized[:self.n_rows] = column[:self.n_rows]
+        return resized
+
+    def record(self, model, force=False):
+        """
+        Record the current step of a model, when the sampling selects it.
+
+        :param model: ForestFire model.
+        :param force: Record the step regardless of the sampling, e.g. the
+                      last step of a run. A step is never recorded twice.
+        Returns:
+            True when the step was recorded.
+        """
+        step = model.current_step
+        if self.n_rows > 0 and self.steps[self.n_rows - 1] == step:
+            return False
+        if not force and self.every > 1 and step % self.every != 0:
+            return False
+        values = compute_metrics(model, self.metrics)
+        if self.on_change and not force and self._last is not None \
+                and all(np.array_equal(values[i], self._last[i]) for i in self._compared):
+            return False
+        self._last = values
+        if self.n_rows == 0:
+            for name, value in zip(self.metrics, values):
+                self.columns[name] = np.empty((len(self.steps),) + np.shape(value),
+                                              dtype=METRICS[name])
+
+        row = self.n_rows
+        if row == len(self.steps):
+            self._grow()
+        self.steps[row] = step
+        for name, value in zip(self.metrics, values):
+            self.columns[name][row] = value
+        for name in self.extra:
+            self.columns[name][row] = np.nan
+        self.n_rows += 1
+        return True
+
+    def record_extra(self, extra):
+        """
+        Set the values of the columns added with add_columns in the last
+        recorded step, for values which are known only after record.
+        """
+        for name in self.extra:
+            self.columns[name][self.n_rows - 1] = extra[name]
+
+    def column(self, name):
+        """
+        Recorded values of a metric, a view on the column without copying.
+        """
+        return self.columns[name][:self.n_rows]
+
+    @property
+    def model_vars(self):
+        """
+        Recorded values per metric as ColumnValues, read by the MESA
+        ChartModule like the model_vars of a DataCollector, which sends the
+        last value to the browser as JSON. Use column for the arrays.
+        """
+        return {name: ColumnValues(self.column(name)) for name in self.columns}
+
+    def to_dataframe(self):
+        """
+        Table with one row per recorded step, with the metrics as columns.
+        With replicates, a long table with one row per recorded step of
+        every forest and the step and replicate as columns.
+        """
+        columns = {name: self.column(name) for name in self.columns}
+        replicates = [column.shape[1] for column in columns.values() if column.ndim == 2]
+        if not replicates:
+            return pd.DataFrame(columns)
+        n_replicates = replicates[0]
+        data = {"step": np.repeat(self.steps[:self.n_rows], n_replicates),
+                "replicate": np.tile(np.arange(n_replicates), self.n_rows)}
+        for name, column in columns.items():
+            data[name] = column.ravel() if column.ndim == 2 else np.repeat(column, n_replicates)
+        return pd.DataFrame(data)
+
+    def get_model_vars_dataframe(self):
+        """
+        Same as to_dataframe, the name used by the MESA DataCollector.
+        """
+        return self.to_dataframe()
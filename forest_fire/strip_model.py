@@ -0,0 +1,608 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: ForestFire model of which one large forest is split into strips
+             of rows (x), every strip stepped by its own worker process. The
+             condition, hp and burn rate of the grid are memory-mapped files
+             shared by all workers. A worker steps the trees and firefighters
+             of its strip and sees the rows next to it in halos, which its
+             neighbours publish twice per step. The fire spreads over a
+             border from the trees on fire at the start of a step, a
+             firefighter which walks over a border is handed over to the
+             next worker, and one which puts out a tree across a border asks
+             that worker to do so. Every worker has its own random number
+             generator, so a run is the same for a seed and number of strips.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+import traceback
+import weakref
+
+import numpy as np
+
+from .model import ForestFire
+from .array_forest import ArrayForest, EMPTY, FINE, ON_FIRE, BURNED, CONDITION_CODES
+from .cell_index import CellIndex
+from .fire_index import FireDistance, fire_areas, fire_targets
+from .firefighter_batch import FireFighterBatch
+from .profiler import NULL_PROFILER
+
+# Arrays of the grid which are shared, and their dtypes.
+FIELDS = {"condition": np.int8, "hp": np.int16, "burn_rate": np.uint8}
+
+# The halos are published after the trees step (read by the firefighters)
+# and after the new trees are planted (read by the trees of the next step).
+AFTER_TREES = 0
+AFTER_PLANT = 1
+
+
+def _shared_directory():
+    """
+    Directory for the shared files, in memory when the system has /dev/shm.
+    """
+    return tempfile.mkdtemp(prefix="forest-fire-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+
+def _shut_down(workers, directory):
+    """
+    Stop the worker processes and remove the shared files.
+    """
+    for connection, process in workers:
+        try:
+            connection.send(("close", None))
+        except (BrokenPipeError, OSError):
+            pass
+    for connection, process in workers:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+        connection.close()
+    workers.clear()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class StripForestFire(ForestFire):
+
+    def __init__(self, *args, n_strips=2, **kwargs):
+        """
+        Create a forest fire model which is stepped by a worker process per
+        strip of the grid, takes the same parameters as ForestFire. For a
+        seed it starts from the same forest and firefighters as an
+        ArrayForestFire, but it does not follow the same run. Snapshots are
+        not supported.
+
+        Call close (or use the model in a with statement) to stop the
+        workers, otherwise they stop when the model is garbage collected.
+
+        :param n_strips: Number of strips and worker processes. A strip must
+                         have at least search_radius rows.
+        """
+        if kwargs.get("snapshot") is not None:
+            raise ValueError("StripForestFire can not be restored from a snapshot")
+        self.n_strips = n_strips
+        self._workers = []
+        super().__init__(*args, **kwargs)
+
+    def _init_spaces(self):
+        """
+        The trees and the fire are only kept in the shared arrays.
+        """
+        self.grid = None
+        self.fire_clusters = None
+        self.empty_cells = None
+        self.fire_index = None
+
+    def _init_backend(self):
+        """
+        Divide the grid into strips and create the shared arrays of the grid
+        and the halos.
+        """
+        # Strip i holds the rows bounds[i] <= x < bounds[i + 1].
+        self.bounds = np.linspace(0, self.width, self.n_strips + 1).astype(np.int64)
+        self.halo_rows = max(self.search_radius, 1)
+        if np.diff(self.bounds).min() < self.halo_rows:
+            raise ValueError(f"{self.n_strips} strips of a grid of width {self.width} are "
+                             f"narrower than the search radius {self.halo_rows}")
+        self._directory = _shared_directory()
+        self._finalizer = weakref.finalize(self, _shut_down, self._workers, self._directory)
+        self.arrays = {}
+        for name, dtype in FIELDS.items():
+            self.arrays[name] = np.lib.format.open_memmap(
+                os.path.join(self._directory, name + ".npy"), mode="w+", dtype=dtype,
+                shape=(self.width, self.height))
+            # Rows of both sides of every strip, for both publications.
+            np.lib.format.open_memmap(
+                os.path.join(self._directory, name + "_halo.npy"), mode="w+", dtype=dtype,
+                shape=(2, self.n_strips, 2, self.halo_rows, self.height))
+
+        self._strip_counts = np.zeros((self.n_strips, 4), dtype=np.int64)
+        self._burning = np.zeros(0, dtype=np.int64)
+        self._fighters = tuple(np.zeros(0, dtype=np.int64) for _ in range(4))
+        self._handover = None
+        self._fire_targets = None
+        self._fire_targets_step = None
+
+    def _init_trees(self):
+        """
+        Init trees on every coordinate under a certain probability, a block
+        of rows at a time. The random numbers are drawn in the order of the
+        flat cells, so the trees are those of ArrayForestFire.
+        """
+        condition, hp = self.arrays["condition"], self.arrays["hp"]
+        block = max(1, 2 ** 22 // self.height)
+        for x in range(0, self.width, block):
+            fine = self.layout_rng.random((min(block, self.width - x), self.height)) < self.density_trees
+            condition[x:x + block] = fine
+            hp[x:x + block] = np.where(fine, self.max_hp, 0)
+
+    def _init_fire(self):
+        """
+        Start the workers and init a fire on a random spot on the field, the
+        same tree as in ArrayForestFire.
+        """
+        self._start_workers()
+        n = self.layout_rng.integers(self._strip_counts[:, FINE].sum())
+        # The n-th fine tree of the grid lies in the strip where the
+        # cumulative count of fine trees passes n.
+        passed = np.cumsum(self._strip_counts[:, FINE])
+        owner = int(np.searchsorted(passed, n, side="right"))
+        arguments = [None] * self.n_strips
+        arguments[owner] = int(n - (passed[owner - 1] if owner > 0 else 0))
+        self._run("ignite_nth", arguments)
+
+    def _start_workers(self):
+        """
+        Start a worker process for every strip, each with its own seed.
+        """
+        context = multiprocessing.get_context("spawn")
+        seeds = self.rng.integers(2 ** 63, size=self.n_strips)
+        parameters = {
+            "max_hp": self.max_hp,
+            "ignition_prob": self.ignition_prob,
+            "max_burn_rate": self.max_burn_rate,
+            "extg_strength": self.extg_strength,
+            "strategy": self.strategy,
+            "search_radius": self.search_radius,
+        }
+        for index in range(self.n_strips):
+            spec = {"directory": self._directory, "index": index, "bounds": self.bounds.tolist(),
+                    "shape": (self.width, self.height), "halo_rows": self.halo_rows,
+                    "parameters": parameters, "seed": int(seeds[index])}
+            connection, worker_connection = context.Pipe()
+            process = context.Process(target=_run_worker, args=(worker_connection, spec), daemon=True)
+            process.start()
+            worker_connection.close()
+            self._workers.append((connection, process))
+        self._update(self._receive())
+
+    def _run(self, command, arguments=None):
+        """
+        Let every worker run a command, all at the same time, and wait for
+        all of them.
+
+        :param arguments: List with the argument of every worker.
+        Returns:
+            List with the reply of every worker.
+        """
+        for index, (connection, _) in enumerate(self._workers):
+            connection.send((command, None if arguments is None else arguments[index]))
+        replies = self._receive()
+        self._update(replies)
+        return replies
+
+    def _receive(self):
+        """
+        Replies of all workers, raises when one of them failed.
+        """
+        answers = [connection.recv() for connection, _ in self._workers]
+        for status, reply in answers:
+            if status == "error":
+                raise RuntimeError(f"A strip worker failed:\n{reply}")
+        return [reply for _, reply in answers]
+
+    def _update(self, replies):
+        """
+        Keep the counts, burning cells and firefighters which the workers
+        reported.
+        """
+        self._strip_counts = np.array([reply["counts"] for reply in replies], dtype=np.int64)
+        self._burning = np.concatenate([reply["burning"] for reply in replies])
+        fighters = [np.concatenate(columns) for columns in zip(*(reply["fighters"] for reply in replies))]
+        order = np.argsort(fighters[0])
+        self._fighters = tuple(column[order] for column in fighters)
+
+    def _owner(self, xs):
+        """
+        Strip of x coordinates.
+        """
+        return np.searchsorted(self.bounds, xs, side="right") - 1
+
+    def _split(self, columns, xs):
+        """
+        Split equally long arrays by the strip of x coordinates.
+
+        Returns:
+            List with for every strip a tuple of the parts of the arrays.
+        """
+        owner = self._owner(xs)
+        return [tuple(column[owner == index] for column in columns) for index in range(self.n_strips)]
+
+    def _place_firefighters(self, xs, ys, fires_extg=None):
+        """
+        Hand the firefighters to the workers of their strips.
+        """
+        xs, ys = np.asarray(xs, dtype=np.int64), np.asarray(ys, dtype=np.int64)
+        ids = len(self._fighters[0]) + np.arange(len(xs))
+        fires_extg = np.zeros(len(xs), dtype=np.int64) if fires_extg is None else np.asarray(fires_extg)
+        self._run("add_fighters", self._split((ids, xs, ys, fires_extg), xs))
+
+    def _firefighter_arrays(self):
+        """
+        Arrays with the x and y coordinates of the firefighters and the
+        number of fires each of them extinguished, by firefighter id.
+        """
+        _, xs, ys, fires_extg = self._fighters
+        return xs.copy(), ys.copy(), fires_extg.copy()
+
+    def _firefighter_cells(self):
+        """
+        Flat indices of the cells with a firefighter on them.
+        """
+        return self._fighters[1] * self.height + self._fighters[2]
+
+    def _tree_arrays(self):
+        """
+        Copies of the condition, hp and burn rate arrays of the grid.
+        """
+        return tuple(self.arrays[name].copy() for name in FIELDS)
+
+    def _step_trees(self):
+        """
+        Let every worker proceed the trees of its strip one step.
+        """
+        counts = self._strip_counts.sum(axis=0)
+        self.profiler.count("tree_steps", counts[ON_FIRE] + counts[BURNED])
+        self.profiler.count("tree_neighbour_queries", counts[ON_FIRE])
+        self._run("step_trees")
+
+    def get_distance_field(self):
+        """
+        Return the flat cells next to the fire of the current step, from
+        which the workers look up the distance to the fire, see
+        FireDistance.
+        """
+        if self._fire_targets_step != self.current_step:
+            self._fire_targets = fire_targets(self._burning, self.width, self.height)
+            self._fire_targets_step = self.current_step
+        return self._fire_targets
+
+    def _step_firefighters(self):
+        """
+        Let every worker proceed the firefighters of its strip one step. The
+        ones which left their strip and the trees put out across a border
+        are handed over when the trees are planted.
+        """
+        targets = self.get_distance_field() if self.strategy == "pursue" else None
+        replies = self._run("step_fighters", [targets] * self.n_strips)
+        leaving = [np.concatenate(columns) for columns in zip(*(reply["leaving"] for reply in replies))]
+        requests = [np.concatenate(columns) for columns in zip(*(reply["requests"] for reply in replies))]
+        self._handover = (self._split(leaving, leaving[1]),
+                          self._split(requests, requests[0] // self.height))
+
+    def plant_new_trees(self, regrowth_rate):
+        """
+        Divide the new trees over the strips by their number of empty
+        cells, and let every worker plant its share after taking over the
+        firefighters and requests from the other workers.
+        """
+        empty = self._strip_counts[:, EMPTY]
+        n_trees = self.rng.multivariate_hypergeometric(empty, min(regrowth_rate, int(empty.sum())))
+        arriving, requests = self._handover if self._handover is not None else ([None] * self.n_strips,) * 2
+        self._handover = None
+        self._run("plant", list(zip(n_trees.tolist(), arriving, requests)))
+
+    def _condition_count(self, tree_condition):
+        """
+        Read the counters of trees in a given condition of all strips.
+        """
+        return int(self._strip_counts[:, CONDITION_CODES[tree_condition]].sum())
+
+    def count_trees(self):
+        """
+        Number of trees currently on the grid.
+        """
+        return self.width * self.height - int(self._strip_counts[:, EMPTY].sum())
+
+    def is_on_fire(self, pos):
+        """
+        Check whether the tree on a coordinate, if any, is on fire.
+        """
+        return self.arrays["condition"][pos] == ON_FIRE
+
+    def get_fire_areas(self):
+        """
+        Calculates the fire areas from the cells on fire of all strips. In
+        debug mode they are checked against labelling the whole grid.
+        """
+        surface_areas = fire_areas(self._burning, self.height)
+        if self.debug:
+            labelled = self.label_fire_areas()
+            if not np.array_equal(np.sort(surface_areas), np.sort(labelled)):
+                raise RuntimeError(
+                    f"Tracked fire areas {np.sort(surface_areas)} differ from labelled areas {np.sort(labelled)}"
+                )
+        return surface_areas
+
+    def get_numeric_representation_of_grid(self):
+        return (self.arrays["condition"] == ON_FIRE).astype(np.int8)
+
+    @staticmethod
+    def scan_type(model, tree_condition):
+        """
+        Count trees in a given condition by scanning the shared grid.
+        """
+        return int(np.count_nonzero(model.arrays["condition"] == CONDITION_CODES[tree_condition]))
+
+    def close(self):
+        """
+        Stop the workers and remove the shared arrays.
+        """
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class StripView:
+
+    def __init__(self, worker):
+        """
+        Class which shows the firefighters of a worker the grid around its
+        strip: the strip itself and copies of the halos of the neighbouring
+        strips. Trees in a halo are not put out, but are asked to be put out
+        by their own worker.
+
+        :param worker: The StripWorker.
+        """
+        self.width = worker.width
+        self.height = worker.height
+        self.strip = worker.strip
+        self.x0, self.x1 = worker.x0, worker.x1
+        self.halo_rows = worker.halo_rows
+        # Rows x0 - halo_rows <= x < x0 and x1 <= x < x1 + halo_rows.
+        self.halos = {name: [None, None] for name in FIELDS}
+        self.requests = []
+
+    def load_halos(self, halos, publication, index, n_strips):
+        """
+        Copy the halos which the neighbouring strips published.
+        """
+        for name, halo in halos.items():
+            if index > 0:
+                self.halos[name][0] = np.array(halo[publication, index - 1, 1])
+            if index < n_strips - 1:
+                self.halos[name][1] = np.array(halo[publication, index + 1, 0])
+        self.requests = []
+
+    def _sides(self, x):
+        """
+        Masks of the rows before and after the strip, with their row in
+        the halo.
+        """
+        return ((x < self.x0, x - (self.x0 - self.halo_rows), 0),
+                (x >= self.x1, x - self.x1, 1))
+
+    def cell_values(self, name, cells):
+        """
+        Values of the condition, hp or burn_rate on flat cells of the strip
+        or the halos.
+        """
+        cells = np.asarray(cells, dtype=np.int64)
+        x, y = np.divmod(cells, self.height)
+        array = getattr(self.strip, name).ravel()
+        values = array[np.clip(cells - self.x0 * self.height, 0, len(array) - 1)]
+        for outside, row, side in self._sides(x):
+            if outside.any():
+                values[outside] = self.halos[name][side][row[outside], y[outside]]
+        return values
+
+    def extinguish_many(self, cells, strengths):
+        """
+        Lower the burn rate of distinct burning trees, see
+        ArrayForest.extinguish_many. Trees in a halo are put out in its copy
+        and kept as a request for the worker of their strip.
+        """
+        x, y = np.divmod(cells, self.height)
+        own = (x >= self.x0) & (x < self.x1)
+        self.strip.extinguish_many(cells[own] - self.x0 * self.height, strengths[own])
+        if own.all():
+            return
+        self.requests.append((cells[~own], strengths[~own]))
+        for outside, row, side in self._sides(x):
+            if outside.any():
+                condition, burn_rate = self.halos["condition"][side], self.halos["burn_rate"][side]
+                where = row[outside], y[outside]
+                left = burn_rate[where].astype(np.int64) - strengths[outside]
+                burn_rate[where] = np.maximum(left, 0)
+                condition[where] = np.where(left <= 0, FINE, condition[where])
+
+
+class StripWorker:
+
+    def __init__(self, spec):
+        """
+        Class which steps the trees and firefighters of one strip, in a
+        worker process of a StripForestFire.
+
+        :param spec: Dict with the shared directory, the index of the strip,
+                     the bounds of all strips, the grid shape, the number of
+                     halo rows, the model parameters and the seed.
+        """
+        self.index = spec["index"]
+        bounds = spec["bounds"]
+        self.n_strips = len(bounds) - 1
+        self.x0, self.x1 = bounds[self.index], bounds[self.index + 1]
+        self.width, self.height = spec["shape"]
+        self.halo_rows = spec["halo_rows"]
+        self.parameters = spec["parameters"]
+        self.search_radius = self.parameters["search_radius"]
+        self.profiler = NULL_PROFILER
+        self.rng = np.random.default_rng(spec["seed"])
+
+        directory = spec["directory"]
+        self.halos = {name: np.asarray(np.load(os.path.join(directory, name + "_halo.npy"),
+                                               mmap_mode="r+"))
+                      for name in FIELDS}
+        self.strip = ArrayForest(self.x1 - self.x0, self.height, self.parameters["max_hp"])
+        for name in FIELDS:
+            grid = np.load(os.path.join(directory, name + ".npy"), mmap_mode="r+")
+            setattr(self.strip, name, np.asarray(grid[self.x0:self.x1]))
+        self.strip.empty_cells = CellIndex((self.x1 - self.x0) * self.height, full=True)
+        self.strip.restore(self.strip.condition, self.strip.hp, self.strip.burn_rate)
+
+        # The batch sees the whole grid through the view, with global rows.
+        self.forest = StripView(self)
+        self.batch = FireFighterBatch(self, [], [], self.parameters["extg_strength"],
+                                      self.parameters["strategy"])
+        self.ids = np.zeros(0, dtype=np.int64)
+        self._fire_distance = None
+        self._publish(AFTER_PLANT)
+
+    def summary(self):
+        """
+        Counts, cells on fire and firefighters of the strip, sent to the
+        model after every command.
+        """
+        burning = self.strip.burning
+        burning = burning[self.strip.condition.ravel()[burning] == ON_FIRE]
+        return {"counts": list(self.strip.counts),
+                "burning": burning.astype(np.int64) + self.x0 * self.height,
+                "fighters": (self.ids, self.batch.x, self.batch.y, self.batch.fires_extg)}
+
+    def _publish(self, publication):
+        """
+        Write the first and last rows of the strip into its halos.
+        """
+        for name, halo in self.halos.items():
+            array = getattr(self.strip, name)
+            halo[publication, self.index, 0] = array[:self.halo_rows]
+            halo[publication, self.index, 1] = array[-self.halo_rows:]
+
+    def ignite_nth(self, n):
+        """
+        Ignite the n-th fine tree of the strip, or nothing when n is None.
+        """
+        if n is not None:
+            cell = np.flatnonzero(self.strip.condition == FINE)[n]
+            self.strip.ignite(cell, self.rng, self.parameters["ignition_prob"],
+                              self.parameters["max_burn_rate"], start=True)
+            self._publish(AFTER_PLANT)
+        return self.summary()
+
+    def add_fighters(self, fighters):
+        """
+        Add firefighters to the batch.
+
+        :param fighters: Tuple with arrays of their ids, x, y and fires
+                         extinguished, or None.
+        """
+        if fighters is not None:
+            ids, xs, ys, fires_extg = fighters
+            self.batch.add(xs, ys, fires_extg)
+            self.ids = np.concatenate((self.ids, ids))
+        return self.summary()
+
+    def step_trees(self, _):
+        """
+        Proceed the trees of the strip one step. The trees on fire in the
+        rows next to the strip try to ignite their neighbours in it.
+        """
+        fire = self.halos["condition"][AFTER_PLANT]
+        incoming = [np.zeros(0, dtype=np.int64)]
+        if self.index > 0:
+            incoming.append(np.flatnonzero(fire[self.index - 1, 1, -1] == ON_FIRE))
+        if self.index < self.n_strips - 1:
+            incoming.append((self.x1 - self.x0 - 1) * self.height
+                            + np.flatnonzero(fire[self.index + 1, 0, 0] == ON_FIRE))
+        self.strip.step(self.rng, self.parameters["ignition_prob"],
+                        self.parameters["max_burn_rate"], incoming=np.concatenate(incoming))
+        self._publish(AFTER_TREES)
+        return self.summary()
+
+    def fire_distance(self, xs, ys):
+        """
+        Distance to the fire of coordinates, see FireDistance.
+        """
+        return self._fire_distance(xs, ys)
+
+    def step_fighters(self, targets):
+        """
+        Proceed the firefighters of the strip one step.
+
+        :param targets: Flat cells next to the fire for pursue, or None.
+        Returns:
+            The summary, with the firefighters which left the strip and the
+            requests to put out trees of other strips.
+        """
+        self.forest.load_halos(self.halos, AFTER_TREES, self.index, self.n_strips)
+        self._fire_distance = FireDistance(targets, self.height) if targets is not None else None
+        self.batch.step(self.rng)
+
+        leaving = np.flatnonzero((self.batch.x < self.x0) | (self.batch.x >= self.x1))
+        ids = self.ids[leaving]
+        self.ids = np.delete(self.ids, leaving)
+        xs, ys, fires_extg = self.batch.remove(leaving)
+        requests = self.forest.requests or [(np.zeros(0, dtype=np.int64),) * 2]
+        reply = self.summary()
+        reply["leaving"] = (ids, xs, ys, fires_extg)
+        reply["requests"] = tuple(np.concatenate(column).astype(np.int64) for column in zip(*requests))
+        return reply
+
+    def plant(self, argument):
+        """
+        Take over firefighters and requests from other strips and plant new
+        trees on random empty cells without a firefighter.
+
+        :param argument: Tuple with the number of trees, the arriving
+                         firefighters and the requests, see step_fighters.
+        """
+        n_trees, arriving, requests = argument
+        if requests is not None and len(requests[0]) > 0:
+            cells, strengths = requests
+            targets, inverse = np.unique(cells - self.x0 * self.height, return_inverse=True)
+            strengths = np.bincount(inverse, weights=strengths).astype(np.int64)
+            burning = self.strip.condition.ravel()[targets] == ON_FIRE
+            self.strip.extinguish_many(targets[burning], strengths[burning])
+        self.add_fighters(arriving)
+
+        fighter_cells = (self.batch.x - self.x0) * self.height + self.batch.y
+        self.strip.plant(self.strip.empty_cells.sample(n_trees, self.rng, exclude=fighter_cells))
+        self._publish(AFTER_PLANT)
+        return self.summary()
+
+
+def _run_worker(connection, spec):
+    """
+    Main function of a worker process: run the commands of the model until
+    it sends close.
+    """
+    try:
+        worker = StripWorker(spec)
+        connection.send(("ok", worker.summary()))
+    except Exception:
+        connection.send(("error", traceback.format_exc()))
+        return
+    while True:
+        command, argument = connection.recv()
+        if command == "close":
+            return
+        try:
+            connection.send(("ok", getattr(worker, command)(argument)))
+        except Exception:
+            connection.send(("error", traceback.format_exc()))
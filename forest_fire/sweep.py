@@ -0,0 +1,471 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Runner for parameter sweeps. Every worker writes the statistics
+             of each step into a preallocated record array in a memory-mapped
+             file shared by all workers. At the end the whole sweep is saved
+             to one columnar file (.npz, or .parquet with pandas and pyarrow),
+             indexed by strategy, number of firefighters, extinguishing
+             strength and replicate, instead of one CSV file per run. The
+             runs are scheduled longest first and an interrupted sweep
+             resumes from a journal of the finished runs. The replicates of
+             a configuration can be run together as one ReplicateForestFire.
+             Seeded runs can be taken from and saved to a ResultCache, so
+             only the runs which were never done before are computed.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from .model import ForestFire
+from .array_model import ArrayForestFire
+from .replicate_model import ReplicateForestFire
+from .profiler import FIELDS as PROFILE_FIELDS
+from .result_cache import run_description, run_key
+from .statistics_recorder import StatisticsRecorder, STATISTICS
+
+# Statistics of ForestFire.get_statistics, in the column order of the CSV files.
+# The fields are in the order of statistics_recorder.STATISTICS.
+STATISTICS_DTYPE = np.dtype([
+    ("Nf", np.int64),
+    ("Ns", np.int64),
+    ("percentage_on_fire", np.float64),
+    ("trees_on_fire", np.int64),
+    ("total_area", np.int64),
+    ("min_fire_area", np.int64),
+    ("max_fire_area", np.int64),
+    ("median_fire_area", np.float64),
+    ("mean_fire_area", np.float64),
+    ("Density Trees", np.float64),
+    ("Fine", np.int64),
+    ("On fire", np.int64),
+])
+
+INDEX_COLUMNS = ["strategy", "n_fighters", "ext_strength", "replicate"]
+
+# State of a worker process, set once by _init_worker.
+_worker = {}
+
+
+def model_parameters(CONFIG):
+    """
+    Model parameters from the config file which are the same for every run
+    of a sweep.
+
+    :param CONFIG: Loaded config.json.
+    """
+    return {
+        "height": CONFIG['grid']['height'],
+        "width": CONFIG['grid']['width'],
+        "density_trees": CONFIG['model']['density_trees'],
+        "max_burn_rate": CONFIG['model']['max_burn_rate'],
+        "ignition_prob": CONFIG['model']['ignition_prob'],
+        "max_hp": CONFIG['agents']['tree']['max_hp'],
+        "regrowth_rate": CONFIG['model']['regrowth_rate'],
+        "search_radius": CONFIG['agents']['fighter']['search_radius'],
+    }
+
+
+def statistics_dtype(profile=False):
+    """
+    Record dtype of the statistics of a step, with the fields of the
+    StepProfiler when profiling.
+    """
+    if not profile:
+        return STATISTICS_DTYPE
+    return np.dtype(STATISTICS_DTYPE.descr + [(name, np.float64) for name in PROFILE_FIELDS])
+
+
+def configuration_seeds(configurations, seed):
+    """
+    Seed of every run which only depends on the base seed and the
+    configuration of the run, not on its row, so a run keeps its seed when
+    other configurations are added to or removed from the sweep.
+    """
+    seeds = []
+    for configuration in configurations:
+        text = json.dumps([seed] + list(configuration))
+        seeds.append(int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little"))
+    return np.array(seeds, dtype=np.int64)
+
+
+def _model_name(task, array_backend):
+    """
+    Name of the model class which simulates a task.
+    """
+    if len(task[0]) > 1:
+        return ReplicateForestFire.__name__
+    return (ArrayForestFire if array_backend else ForestFire).__name__
+
+
+def _task_keys(task, parameters, max_steps, array_backend):
+    """
+    Cache key and run_description of every row of a seeded task.
+    """
+    rows, strategy, n_fighters, ext_strength, seed = task
+    model = _model_name(task, array_backend)
+    keys = []
+    for i in range(len(rows)):
+        description = run_description(parameters, model, strategy, n_fighters, ext_strength,
+                                      seed, max_steps, replicates=len(rows), replicate_index=i)
+        keys.append((run_key(description), description))
+    return keys
+
+
+def _take_cached(tasks, cache, records, parameters, max_steps, array_backend):
+    """
+    Copy the runs of the tasks of which every row is in the cache into the
+    record array.
+
+    Returns:
+        The tasks which still have to be run, the cache keys of their rows
+        and a dict from the rows taken from the cache to their number of
+        steps.
+    """
+    remaining = []
+    keys = {}
+    cached = {}
+    for task in tasks:
+        if task[4] is None:
+            remaining.append(task)
+            continue
+        task_keys = _task_keys(task, parameters, max_steps, array_backend)
+        runs = []
+        for key, _ in task_keys:
+            run = cache.get(key)
+            if run is None:
+                break
+            runs.append(run)
+        if len(runs) == len(task_keys):
+            for row, run in zip(task[0], runs):
+                records[row, :len(run)] = run
+                cached[row] = len(run)
+            continue
+        remaining.append(task)
+        keys.update(zip(task[0], task_keys))
+    return remaining, keys, cached
+
+
+def _init_worker(buffer_path, parameters, max_steps, array_backend, profile):
+    """
+    Open the shared record array once per worker process.
+    """
+    _worker["records"] = np.load(buffer_path, mmap_mode="r+")
+    _worker["parameters"] = parameters
+    _worker["max_steps"] = max_steps
+    _worker["array_backend"] = array_backend
+    _worker["profile"] = profile
+
+
+def _run_task(task):
+    """
+    Worker function executing one task of the sweep: one simulation, or
+    with several rows one ReplicateForestFire simulating all of them.
+
+    :param task: Tuple with the rows in the record array, strategy, number
+                 of firefighters, extinguishing strength and seed of the
+                 run.
+    Returns:
+        List with for every row the row, the number of steps which were
+        recorded and its share of the run time in seconds.
+    """
+    start = time.perf_counter()
+    rows, strategy, n_fighters, ext_strength, seed = task
+    max_steps = _worker["max_steps"]
+    extra = {}
+    if len(rows) > 1:
+        model_class = ReplicateForestFire
+        extra["replicates"] = len(rows)
+    else:
+        model_class = ArrayForestFire if _worker["array_backend"] else ForestFire
+    # Every step is recorded, plus the step in which the fire died out.
+    recorder = StatisticsRecorder(STATISTICS, capacity=max_steps + 1)
+    model = model_class(
+        max_iter=max_steps,
+        N_firefighters=n_fighters,
+        strategy=strategy,
+        extg_strength=ext_strength,
+        seed=seed,
+        profile=_worker["profile"],
+        recorder=recorder,
+        **_worker["parameters"],
+        **extra
+    )
+
+    # Steps recorded per run, up to the step in which its fire died out.
+    n_steps = np.full(len(rows), max_steps)
+    running = np.ones(len(rows), dtype=bool)
+    while model.current_step < max_steps and running.any():
+        model.step()
+        out = running & (model.count_type(model, 'On fire') == 0)
+        n_steps[out] = model.current_step - 1
+        running &= ~out
+
+    seconds = (time.perf_counter() - start) / len(rows)
+    records = _worker["records"]
+    for i, (row, steps) in enumerate(zip(rows, n_steps.tolist())):
+        for name in records.dtype.names:
+            column = recorder.column(name)
+            records[name][row, :steps] = column[:steps, i] if column.ndim == 2 else column[:steps]
+    records.flush()
+    return [(row, steps, seconds) for row, steps in zip(rows, n_steps.tolist())]
+
+
+def _read_journal(journal_path, header):
+    """
+    Read the completed runs from the journal of an interrupted sweep.
+
+    Returns:
+        Dict from row to (n_steps, seconds), empty when there is no journal
+        or it belongs to another sweep.
+    """
+    if not os.path.exists(journal_path):
+        return {}
+    with open(journal_path) as journal:
+        if journal.readline().rstrip("\n") != header:
+            return {}
+        completed = {}
+        for line in journal:
+            fields = line.split()
+            # A line cut off by a crash is skipped, that run is done again.
+            if len(fields) == 3:
+                completed[int(fields[0])] = (int(fields[1]), float(fields[2]))
+        return completed
+
+
+def _task_order(tasks, costs):
+    """
+    Order tasks longest first, so a long run does not start last and keep
+    the other workers waiting at the end of the sweep.
+    """
+    return sorted(tasks, key=lambda task: costs[task[0][0]], reverse=True)
+
+
+def estimate_costs(configurations, known=None):
+    """
+    Estimate the run time of every run of a sweep, as tuples which sort in
+    the expected order of the run times, shortest first.
+
+    Runs of the same strategy, number of firefighters and extinguishing
+    strength as a run in known get its mean run time. The other runs are
+    put before those, ordered on the expected number of steps: with few
+    firefighters or a weak extinguishing strength the fire burns until
+    max_steps, while many strong firefighters put it out within a few
+    hundred steps. So they sort as longer the fewer firefighters they have,
+    and then the weaker they extinguish.
+
+    :param configurations: List of (strategy, n_fighters, ext_strength,
+                           replicate) tuples.
+    :param known: Dict from row to (n_steps, seconds) of finished runs. Runs
+                  of 0 seconds were taken from the cache and are skipped.
+    """
+    seconds = {}
+    for row, (_, seconds_run) in (known or {}).items():
+        if seconds_run > 0:
+            seconds.setdefault(tuple(configurations[row][:3]), []).append(seconds_run)
+    costs = []
+    for strategy, n_fighters, ext_strength, _ in configurations:
+        values = seconds.get((strategy, n_fighters, ext_strength))
+        if values:
+            costs.append((0, float(np.mean(values)), 0))
+        else:
+            costs.append((1, -n_fighters, -ext_strength))
+    return costs
+
+
+def _tasks(configurations, seeds, completed, batch_replicates):
+    """
+    Tasks of the runs which did not finish yet, one per run, or with
+    batch_replicates one per configuration with the rows of all its
+    replicates, which is seeded with the seed of its first row.
+    """
+    groups = {}
+    for row, (strategy, n_fighters, ext_strength, _) in enumerate(configurations):
+        if row in completed:
+            continue
+        key = (strategy, n_fighters, ext_strength) if batch_replicates else row
+        groups.setdefault(key, []).append(row)
+    tasks = []
+    for rows in groups.values():
+        strategy, n_fighters, ext_strength, _ = configurations[rows[0]]
+        seed = None if seeds[rows[0]] < 0 else int(seeds[rows[0]])
+        tasks.append((tuple(rows), strategy, n_fighters, ext_strength, seed))
+    return tasks
+
+
+def run_sweep(configurations, CONFIG, max_steps, output, processes=None, seed=None,
+              array_backend=False, progress=True, profile=False, batch_replicates=False,
+              stable_seeds=False, cache=None):
+    """
+    Run a parameter sweep in parallel and save the statistics of every step
+    of every run to one file.
+
+    The runs are handed out one at a time, longest first. Every finished run
+    is written to a journal next to the output, so when the sweep is stopped
+    or crashes, running it again with the same arguments only does the runs
+    which did not finish.
+
+    :param configurations: List of (strategy, n_fighters, ext_strength,
+                           replicate) tuples, one per run.
+    :param CONFIG: Loaded config.json with the other model parameters.
+    :param max_steps: Maximum number of steps of a run.
+    :param output: Path of the result file, ending on .npz or .parquet.
+    :param processes: Number of worker processes, None uses all cores.
+    :param seed: Base seed, run i gets seed + i. None gives random seeds.
+    :param array_backend: Use ArrayForestFire instead of ForestFire.
+    :param progress: Print the progress and throughput during the sweep.
+    :param profile: Profile the runs and save the time per phase and the
+                    counters of every step with the statistics. With
+                    batch_replicates they are shared by the replicates.
+    :param batch_replicates: Simulate the replicates of a configuration
+                             together in one ReplicateForestFire, which is
+                             faster per run than one model per run. The runs
+                             are independent, but do not follow the same
+                             course as single runs with the same seeds.
+    :param stable_seeds: Derive the seed of a run from seed and its
+                         configuration instead of its row, see
+                         configuration_seeds.
+    :param cache: ResultCache to take runs from and to save finished runs
+                  to. Only seeded runs are cached, and none when profiling.
+    """
+    n_runs = len(configurations)
+    if seed is None:
+        seeds = np.full(n_runs, -1)
+    elif stable_seeds:
+        seeds = configuration_seeds(configurations, seed)
+    else:
+        seeds = np.arange(n_runs) + seed
+    parameters = model_parameters(CONFIG)
+    buffer_path = output + ".buffer.npy"
+    journal_path = output + ".journal"
+    header = json.dumps([[list(configuration) for configuration in configurations],
+                         parameters, max_steps, seed, array_backend, profile,
+                         batch_replicates, stable_seeds])
+
+    completed = _read_journal(journal_path, header) if os.path.exists(buffer_path) else {}
+    if not completed:
+        records = np.lib.format.open_memmap(buffer_path, mode="w+",
+                                            dtype=statistics_dtype(profile),
+                                            shape=(n_runs, max_steps))
+        del records
+        with open(journal_path, "w") as journal:
+            journal.write(header + "\n")
+
+    n_steps = np.zeros(n_runs, dtype=np.int64)
+    for row, (steps, _) in completed.items():
+        n_steps[row] = steps
+    tasks = _tasks(configurations, seeds, completed, batch_replicates)
+    records = np.load(buffer_path, mmap_mode="r+")
+    keys = {}
+    if cache is not None and not profile:
+        tasks, keys, cached = _take_cached(tasks, cache, records, parameters, max_steps,
+                                           array_backend)
+        records.flush()
+        if cached:
+            with open(journal_path, "a") as journal:
+                for row, steps in cached.items():
+                    n_steps[row] = steps
+                    journal.write(f"{row} {steps} 0.000\n")
+            if progress:
+                print(f"{len(cached)}/{n_runs} runs taken from the cache")
+            completed.update((row, (steps, 0.)) for row, steps in cached.items())
+    tasks = _task_order(tasks, estimate_costs(configurations, completed))
+
+    start = time.perf_counter()
+    done_steps = 0
+    last_report = start
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              initargs=(buffer_path, parameters, max_steps, array_backend,
+                                        profile)) as pool, \
+            open(journal_path, "a") as journal:
+        done = 0
+        for runs in pool.imap_unordered(_run_task, tasks, chunksize=1):
+            for row, steps, seconds in runs:
+                n_steps[row] = steps
+                if row in keys:
+                    cache.put(keys[row][0], np.array(records[row, :steps]), keys[row][1])
+                journal.write(f"{row} {steps} {seconds:.3f}\n")
+                done_steps += steps
+            journal.flush()
+            done += len(runs)
+            now = time.perf_counter()
+            if progress and (now - last_report >= 1. or done == n_runs - len(completed)):
+                last_report = now
+                elapsed = now - start
+                print(f"{len(completed) + done}/{n_runs} runs, "
+                      f"{done / elapsed:.2f} runs/s, {done_steps / elapsed:.0f} steps/s")
+
+    save_sweep(output, records, n_steps, configurations, seeds)
+    del records
+    os.remove(buffer_path)
+    os.remove(journal_path)
+
+
+def save_sweep(output, records, n_steps, configurations, seeds):
+    """
+    Save the record array of a sweep to one columnar file.
+
+    :param output: Path ending on .npz or .parquet.
+    :param records: Record array of shape (runs, max_steps).
+    :param n_steps: Number of recorded steps per run.
+    :param configurations: List of (strategy, n_fighters, ext_strength,
+                           replicate) tuples, one per run.
+    :param seeds: Seed of every run, -1 for a random seed.
+    """
+    index = {name: np.array([configuration[i] for configuration in configurations])
+             for i, name in enumerate(INDEX_COLUMNS)}
+    if output.endswith(".parquet"):
+        sweep_dataframe(records, n_steps, index, seeds).to_parquet(output)
+    else:
+        np.savez_compressed(output, statistics=records, n_steps=n_steps, seed=seeds, **index)
+
+
+def sweep_dataframe(records, n_steps, index, seeds):
+    """
+    Long table with one row per recorded step of every run.
+    """
+    rows = np.repeat(np.arange(len(n_steps)), n_steps)
+    steps = np.arange(len(rows)) - np.repeat(np.cumsum(n_steps) - n_steps, n_steps)
+    data = {name: values[rows] for name, values in index.items()}
+    data["seed"] = np.asarray(seeds)[rows]
+    data["step"] = steps
+    flat = np.asarray(records)[rows, steps]
+    for name in flat.dtype.names:
+        data[name] = flat[name]
+    return pd.DataFrame(data)
+
+
+def sweep_table(configurations, CONFIG, max_steps, seed, cache, **kwargs):
+    """
+    Long table of a sweep as load_sweep gives it, for notebooks. The runs
+    in the cache are read from it, only the others are computed.
+
+    :param seed: Base seed, which has to be given for the cache to work.
+    :param cache: ResultCache.
+    :param kwargs: Other arguments of run_sweep.
+    """
+    kwargs.setdefault("progress", False)
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "sweep.npz")
+        run_sweep(configurations, CONFIG, max_steps, output, seed=seed, cache=cache, **kwargs)
+        return load_sweep(output)
+
+
+def load_sweep(path):
+    """
+    Load a sweep saved by run_sweep as a long table, with the columns
+    strategy, n_fighters, ext_strength, replicate, seed, step and the
+    statistics of the step.
+    """
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    with np.load(path) as sweep:
+        index = {name: sweep[name] for name in INDEX_COLUMNS}
+        return sweep_dataframe(sweep["statistics"], sweep["n_steps"], index, sweep["seed"])
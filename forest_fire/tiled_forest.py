@@ -0,0 +1,571 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: Sparse tiled forest state for very large grids. The grid is
+             split into square tiles, and only tiles with trees are stored.
+             A quiescent tile, with only fine trees at full hp, is packed
+             into one bit per cell. A tile where the fire is, or has been,
+             is expanded into the condition, hp and burn rate arrays of a
+             pool of tiles. Tiles are expanded when the fire reaches them
+             and packed or freed again when they are quiet, so the memory
+             and the work of a step grow with the trees and the fire
+             instead of the size of the grid. It steps the trees like the
+             ArrayForest of a single forest.
+"""
+import numpy as np
+
+from .array_forest import EMPTY, FINE, ON_FIRE, BURNED
+
+# Number of set bits of every byte value.
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+class TiledForest:
+
+    def __init__(self, width, height, max_hp, tile_size=64, pack_every=16):
+        """
+        Class which holds the state of every tree on the grid in tiles.
+
+        :param width: Width of the grid (x).
+        :param height: Height of the grid (y).
+        :param max_hp: The hp of a newly planted tree.
+        :param tile_size: Width and height of a tile in cells.
+        :param pack_every: Look for quiet expanded tiles to pack or free
+                           every this many steps.
+
+        Cells are flat indices x * height + y, as in the ArrayForest. Inside
+        the pool, cell (x, y) of a tile lies at slot * tile_size ** 2 +
+        (x % tile_size) * tile_size + y % tile_size.
+        """
+        self.width = width
+        self.height = height
+        self.max_hp = max_hp
+        self.tile_size = tile_size
+        self.tile_cells = tile_size * tile_size
+        self.pack_every = pack_every
+        self.tiles_x = -(-width // tile_size)
+        self.tiles_y = -(-height // tile_size)
+        n_tiles = self.tiles_x * self.tiles_y
+
+        # Slot of every expanded tile in the pool. Slot 0 always stays
+        # empty and stands in for the tiles which are not expanded.
+        self.slot_of = np.zeros(n_tiles, dtype=np.int64)
+        # Row of every packed tile in the bit pool, -1 for the other tiles.
+        self.packed_of = np.full(n_tiles, -1, dtype=np.int64)
+        # Number of trees on every tile.
+        self.tile_trees = np.zeros(n_tiles, dtype=np.int64)
+        # Cells of every tile which lie on the grid, less at the far edges.
+        tile_x = np.minimum(width - np.arange(self.tiles_x) * tile_size, tile_size)
+        tile_y = np.minimum(height - np.arange(self.tiles_y) * tile_size, tile_size)
+        self.tile_area = np.outer(tile_x, tile_y).ravel()
+
+        # Pool of expanded tiles, and the tile of every slot (-1 when free).
+        self._condition = np.zeros((1, self.tile_cells), dtype=np.int8)
+        self._hp = np.zeros((1, self.tile_cells), dtype=np.int16)
+        self._burn_rate = np.zeros((1, self.tile_cells), dtype=np.uint8)
+        self._tile_of_slot = np.full(1, -1, dtype=np.int64)
+        self._free_slots = []
+        self._n_slots = 1
+        # Pool of packed tiles, one bit per cell which is set for a tree.
+        self._bits = np.zeros((0, -(-self.tile_cells // 8)), dtype=np.uint8)
+        self._tile_of_row = np.zeros(0, dtype=np.int64)
+        self._free_rows = []
+        self._n_rows = 0
+
+        # Scratch arrays used during a step, over the cells of the pool.
+        self._ignition_time = np.full(self.tile_cells, np.inf)
+        self._activation_time = np.full(self.tile_cells, np.nan)
+        self._active = np.zeros(self.tile_cells, dtype=bool)
+
+        self.counts = [width * height, 0, 0, 0]
+        self.burning = np.zeros(0, dtype=np.intp)
+        self.burned = np.zeros(0, dtype=np.intp)
+        self.n_steps = 0
+
+    @property
+    def expanded_tiles(self):
+        """
+        Tiles which are expanded into the pool.
+        """
+        return self._tile_of_slot[self._tile_of_slot >= 0]
+
+    @property
+    def packed_tiles(self):
+        """
+        Tiles which are packed into bits.
+        """
+        return self._tile_of_row[self._tile_of_row >= 0]
+
+    def nbytes(self):
+        """
+        Number of bytes of the tile directory, both pools and the scratch
+        arrays.
+        """
+        arrays = (self.slot_of, self.packed_of, self.tile_trees, self.tile_area, self._condition,
+                  self._hp, self._burn_rate, self._tile_of_slot, self._bits, self._tile_of_row,
+                  self._ignition_time, self._activation_time, self._active)
+        return sum(array.nbytes for array in arrays)
+
+    def _locate(self, cells):
+        """
+        Tile of flat cells and their place within the tile.
+        """
+        x, y = np.divmod(cells, self.height)
+        size = self.tile_size
+        return (x // size) * self.tiles_y + y // size, (x % size) * size + y % size
+
+    def _pool(self, cells):
+        """
+        Index in the flattened pool of flat cells, cells of tiles which are
+        not expanded map to the empty slot 0.
+        """
+        tile, local = self._locate(cells)
+        return self.slot_of[tile] * self.tile_cells + local
+
+    def tile_of(self, cells):
+        """
+        Tile of flat cells, numbered x // tile_size * tiles_y + y // tile_size.
+        """
+        return self._locate(cells)[0]
+
+    def _bit(self, rows, local):
+        """
+        Bits of places within packed tiles, 1 for a tree.
+        """
+        return (self._bits[rows, local >> 3] >> (7 - (local & 7))) & 1
+
+    def cell_values(self, name, cells):
+        """
+        Values of the condition, hp or burn_rate on flat cells, in any tile.
+        """
+        cells = np.asarray(cells, dtype=np.int64)
+        tile, local = self._locate(cells)
+        values = getattr(self, "_" + name).ravel()[self.slot_of[tile] * self.tile_cells + local]
+        if name != "burn_rate":
+            packed = self.packed_of[tile]
+            in_packed = packed >= 0
+            if in_packed.any():
+                fine = self._bit(packed[in_packed], local[in_packed])
+                values[in_packed] = fine if name == "condition" else fine.astype(np.int64) * self.max_hp
+        return values
+
+    @staticmethod
+    def _grown(array, length, fill=0):
+        """
+        Copy of an array with its first axis grown to a length, the new rows
+        set to a fill value.
+        """
+        grown = np.full((length,) + array.shape[1:], fill, dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+    @staticmethod
+    def _take(n, free, next_row):
+        """
+        Take n rows of a pool, free rows first.
+
+        :param free: List with the free rows, taken rows are popped.
+        :param next_row: First row which was never used.
+        Returns:
+            Array with the rows.
+        """
+        reused = [free.pop() for _ in range(min(n, len(free)))]
+        new = np.arange(next_row, next_row + n - len(reused))
+        return np.concatenate((np.array(reused, dtype=np.int64), new))
+
+    def _allocate_slots(self, n):
+        """
+        Take n slots of the pool of expanded tiles, growing the pool and the
+        scratch arrays when it is full.
+        """
+        slots = self._take(n, self._free_slots, self._n_slots)
+        self._n_slots = max(self._n_slots, int(slots.max(initial=0)) + 1)
+        if self._n_slots > len(self._tile_of_slot):
+            capacity = max(self._n_slots, 2 * len(self._tile_of_slot))
+            self._condition = self._grown(self._condition, capacity)
+            self._hp = self._grown(self._hp, capacity)
+            self._burn_rate = self._grown(self._burn_rate, capacity)
+            self._tile_of_slot = self._grown(self._tile_of_slot, capacity, -1)
+            n_cells = capacity * self.tile_cells
+            self._ignition_time = self._grown(self._ignition_time, n_cells, np.inf)
+            self._activation_time = self._grown(self._activation_time, n_cells, np.nan)
+            self._active = self._grown(self._active, n_cells, False)
+        return slots
+
+    def _allocate_rows(self, n):
+        """
+        Take n rows of the pool of packed tiles, growing it when it is full.
+        """
+        rows = self._take(n, self._free_rows, self._n_rows)
+        self._n_rows = max(self._n_rows, int(rows.max(initial=-1)) + 1)
+        if self._n_rows > len(self._tile_of_row):
+            capacity = max(self._n_rows, 2 * len(self._tile_of_row))
+            self._bits = self._grown(self._bits, capacity)
+            self._tile_of_row = self._grown(self._tile_of_row, capacity, -1)
+        return rows
+
+    def _pack_new(self, tiles):
+        """
+        Create packed tiles without trees for tiles which are not stored.
+        """
+        rows = self._allocate_rows(len(tiles))
+        self._bits[rows] = 0
+        self._tile_of_row[rows] = tiles
+        self.packed_of[tiles] = rows
+
+    def _expand(self, cells):
+        """
+        Expand the packed tiles of flat cells into the pool.
+        """
+        tiles = self._locate(cells)[0]
+        tiles = np.unique(tiles[self.packed_of[tiles] >= 0])
+        if len(tiles) == 0:
+            return
+        rows = self.packed_of[tiles]
+        slots = self._allocate_slots(len(tiles))
+        fine = np.unpackbits(self._bits[rows], axis=1, count=self.tile_cells).astype(bool)
+        self._condition[slots] = fine
+        self._hp[slots] = np.where(fine, self.max_hp, 0)
+        self._burn_rate[slots] = 0
+        self._tile_of_slot[slots] = tiles
+        self.slot_of[tiles] = slots
+        self._tile_of_row[rows] = -1
+        self._free_rows.extend(rows.tolist())
+        self.packed_of[tiles] = -1
+
+    def pack(self):
+        """
+        Pack the expanded tiles which are quiescent, with only fine trees at
+        full hp and empty cells, and free the ones without trees.
+
+        Returns:
+            The number of tiles which were packed or freed.
+        """
+        slots = np.flatnonzero(self._tile_of_slot >= 0)
+        if len(slots) == 0:
+            return 0
+        condition = self._condition[slots]
+        fine = condition == FINE
+        quiet = ~np.any((condition >= ON_FIRE)
+                        | (fine & ((self._hp[slots] != self.max_hp) | (self._burn_rate[slots] != 0))),
+                        axis=1)
+        slots, fine = slots[quiet], fine[quiet]
+        if len(slots) == 0:
+            return 0
+        tiles = self._tile_of_slot[slots]
+        has_trees = fine.any(axis=1)
+        self._pack_new(tiles[has_trees])
+        self._bits[self.packed_of[tiles[has_trees]]] = np.packbits(fine[has_trees], axis=1)
+        self.slot_of[tiles] = 0
+        self._tile_of_slot[slots] = -1
+        self._free_slots.extend(slots.tolist())
+        return len(slots)
+
+    def tally(self, cells):
+        """
+        Number of cells in an array of flat cells.
+        """
+        return len(cells)
+
+    def plant(self, cells):
+        """
+        Plant new trees with full hp, in the bits of a packed tile or in the
+        pool when the tile is expanded.
+
+        :param cells: Flat cell indices of empty cells.
+        """
+        cells = np.asarray(cells, dtype=np.int64)
+        self.counts[EMPTY] -= len(cells)
+        self.counts[FINE] += len(cells)
+        tile, local = self._locate(cells)
+        np.add.at(self.tile_trees, tile, 1)
+        stored = (self.slot_of[tile] > 0) | (self.packed_of[tile] >= 0)
+        self._pack_new(np.unique(tile[~stored]))
+
+        expanded = self.slot_of[tile] > 0
+        pool = self.slot_of[tile[expanded]] * self.tile_cells + local[expanded]
+        self._condition.ravel()[pool] = FINE
+        self._hp.ravel()[pool] = self.max_hp
+        self._burn_rate.ravel()[pool] = 0
+        tile, local = tile[~expanded], local[~expanded]
+        np.bitwise_or.at(self._bits, (self.packed_of[tile], local >> 3),
+                         (128 >> (local & 7)).astype(np.uint8))
+
+    def plant_random(self, density, rng):
+        """
+        Plant a tree on every cell with a probability, one strip of tiles at a
+        time. The random numbers are drawn in the order of the flat cells, so
+        the trees are the same as those of a (width, height) density mask.
+        """
+        size = self.tile_size
+        for tile_x in range(self.tiles_x):
+            width = min(size, self.width - tile_x * size)
+            fine = np.zeros((size, self.tiles_y * size), dtype=bool)
+            fine[:width, :self.height] = rng.random((width, self.height)) < density
+            fine = fine.reshape(size, self.tiles_y, size).transpose(1, 0, 2).reshape(self.tiles_y, -1)
+            trees = np.count_nonzero(fine, axis=1)
+            tiles = tile_x * self.tiles_y + np.flatnonzero(trees)
+            self._pack_new(tiles)
+            self._bits[self.packed_of[tiles]] = np.packbits(fine[trees > 0], axis=1)
+            self.tile_trees[tiles] += trees[trees > 0]
+            self.counts[EMPTY] -= int(trees.sum())
+            self.counts[FINE] += int(trees.sum())
+
+    def _tile_values(self, name, tiles):
+        """
+        Values of the condition, hp or burn_rate of whole tiles.
+
+        Returns:
+            Array shaped (len(tiles), tile_size, tile_size).
+        """
+        values = getattr(self, "_" + name)[self.slot_of[tiles]]
+        packed = self.packed_of[tiles]
+        in_packed = packed >= 0
+        if name != "burn_rate" and in_packed.any():
+            fine = np.unpackbits(self._bits[packed[in_packed]], axis=1, count=self.tile_cells)
+            values[in_packed] = fine if name == "condition" else fine.astype(np.int64) * self.max_hp
+        return values.reshape(-1, self.tile_size, self.tile_size)
+
+    def _strip(self, name, tile_x):
+        """
+        Values of the condition, hp or burn_rate of a strip of tiles, shaped
+        (tile width, height) like the rows of a dense array.
+        """
+        size = self.tile_size
+        values = self._tile_values(name, tile_x * self.tiles_y + np.arange(self.tiles_y))
+        values = values.transpose(1, 0, 2).reshape(size, -1)
+        return values[:min(size, self.width - tile_x * size), :self.height]
+
+    def to_dense(self):
+        """
+        Dense (width, height) arrays of the condition, hp and burn rate, as
+        those of an ArrayForest. Only meant for grids which fit in memory,
+        e.g. to draw them.
+        """
+        return tuple(np.concatenate([self._strip(name, tile_x) for tile_x in range(self.tiles_x)])
+                     for name in ("condition", "hp", "burn_rate"))
+
+    def nth_cell(self, code, n):
+        """
+        Flat cell of the n-th cell with a condition code, in the order of the
+        flat cells.
+        """
+        for tile_x in range(self.tiles_x):
+            cells = np.flatnonzero(self._strip("condition", tile_x) == code)
+            if n < len(cells):
+                return tile_x * self.tile_size * self.height + cells[n]
+            n -= len(cells)
+        raise IndexError("there are not that many cells with this condition")
+
+    def sample_empty(self, k, rng, exclude=None):
+        """
+        Draw up to k distinct random empty cells, by drawing random cells
+        until enough of them are empty. When few cells are empty, they are
+        drawn from the tiles with empty cells instead.
+
+        :param k: Number of cells to draw.
+        :param rng: NumPy random generator.
+        :param exclude: Optional array of cells which may not be drawn.
+        Returns:
+            Array of min(k, available) cells.
+        """
+        exclude = np.unique(np.zeros(0, dtype=np.int64) if exclude is None else exclude)
+        n_empty = self.counts[EMPTY]
+        k = min(k, n_empty - np.count_nonzero(self.cell_values("condition", exclude) == EMPTY))
+        drawn = np.zeros(0, dtype=np.int64)
+        if k <= 0:
+            return drawn
+        n_cells = self.width * self.height
+        if n_empty * self.tile_cells < n_cells:
+            return self._sample_few_empty(k, rng, exclude)
+        while len(drawn) < k:
+            batch = rng.integers(0, n_cells, int(1.25 * (k - len(drawn)) * n_cells / n_empty) + 16)
+            batch = batch[self.cell_values("condition", batch) == EMPTY]
+            batch = batch[~np.isin(batch, exclude) & ~np.isin(batch, drawn)]
+            _, first = np.unique(batch, return_index=True)
+            drawn = np.concatenate((drawn, batch[np.sort(first)][:k - len(drawn)]))
+        return drawn
+
+    def _sample_few_empty(self, k, rng, exclude):
+        """
+        Draw k distinct empty cells from all empty cells of the tiles which
+        are not full.
+        """
+        tiles = np.flatnonzero(self.tile_trees < self.tile_area)
+        size = self.tile_size
+        condition = self._tile_values("condition", tiles)
+        tile, local = np.nonzero(condition.reshape(len(tiles), -1) == EMPTY)
+        tile_x, tile_y = np.divmod(tiles[tile], self.tiles_y)
+        x = tile_x * size + local // size
+        y = tile_y * size + local % size
+        on_grid = (x < self.width) & (y < self.height)
+        cells = x[on_grid] * self.height + y[on_grid]
+        cells = cells[~np.isin(cells, exclude)]
+        return cells[rng.choice(len(cells), size=min(k, len(cells)), replace=False)]
+
+    def ignite(self, cell, rng, ignition_prob, max_burn_rate, start=False):
+        """
+        Ignite the tree on a flat cell index, mirrors Tree._ignite.
+
+        :param start: When starting no probability is applied.
+        """
+        self._expand(np.array([cell]))
+        pool = self._pool(cell)
+        condition = self._condition.ravel()
+        was_on_fire = condition[pool] == ON_FIRE
+        if start:
+            condition[pool] = ON_FIRE
+        if rng.random() < ignition_prob:
+            condition[pool] = ON_FIRE
+            self._burn_rate.ravel()[pool] = rng.integers(1, max_burn_rate)
+        if condition[pool] == ON_FIRE and not was_on_fire:
+            self.counts[FINE] -= 1
+            self.counts[ON_FIRE] += 1
+            self.burning = np.append(self.burning, cell)
+
+    def extinguish_many(self, cells, strengths):
+        """
+        Lower the burn rate of an array of distinct burning trees at once.
+
+        :param cells: Flat indices of the trees.
+        :param strengths: Amount subtracted from the burn rate of each tree.
+        """
+        pool = self._pool(cells)
+        burn_rate = self._burn_rate.ravel()[pool].astype(np.int64) - strengths
+        self._burn_rate.ravel()[pool] = np.maximum(burn_rate, 0)
+        self._condition.ravel()[pool[burn_rate <= 0]] = FINE
+        n_out = np.count_nonzero(burn_rate <= 0)
+        self.counts[ON_FIRE] -= n_out
+        self.counts[FINE] += n_out
+
+    def scan(self, code):
+        """
+        Number of cells with the given condition code, by scanning the tiles.
+        """
+        if code == EMPTY:
+            return self.width * self.height - sum(self.scan(other) for other in (FINE, ON_FIRE, BURNED))
+        count = int(np.count_nonzero(self._condition[self._tile_of_slot >= 0] == code))
+        if code == FINE:
+            count += int(POPCOUNT[self._bits[self._tile_of_row >= 0]].sum())
+        return count
+
+    def neighbours(self, cells):
+        """
+        Von Neumann neighbours of flat cell indices.
+
+        :param cells: Flat cell indices.
+        Returns:
+            Tuple (source, neighbour) of equally long arrays, where source
+            indexes into cells and neighbour is the flat index of a neighbour
+            which lies on the grid.
+        """
+        x, y = np.divmod(cells, self.height)
+        sources = []
+        targets = []
+        for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            valid = ((x + dx >= 0) & (x + dx < self.width)
+                     & (y + dy >= 0) & (y + dy < self.height))
+            index = np.flatnonzero(valid)
+            sources.append(index)
+            targets.append(cells[index] + dx * self.height + dy)
+        return np.concatenate(sources), np.concatenate(targets)
+
+    def step(self, rng, ignition_prob, max_burn_rate):
+        """
+        Proceed all trees one step, see ArrayForest.step. Every few steps the
+        quiet tiles are packed or freed.
+
+        Returns:
+            Flat indices of the trees ignited in this step.
+        """
+        # Burned trees are removed from the grid.
+        removed = len(self.burned)
+        self.counts[BURNED] -= removed
+        self.counts[EMPTY] += removed
+        self._condition.ravel()[self._pool(self.burned)] = EMPTY
+        np.subtract.at(self.tile_trees, self.tile_of(self.burned), 1)
+
+        burning = self.burning[self.cell_values("condition", self.burning) == ON_FIRE]
+        ignited, burnt = self._spread(burning, rng, ignition_prob, max_burn_rate)
+
+        self.counts[FINE] -= len(ignited)
+        self.counts[ON_FIRE] += len(ignited) - len(burnt)
+        self.counts[BURNED] += len(burnt)
+        on_fire = np.concatenate((burning, ignited))
+        self.burning = on_fire[self.cell_values("condition", on_fire) == ON_FIRE]
+        self.burned = burnt
+
+        self.n_steps += 1
+        if self.n_steps % self.pack_every == 0:
+            self.pack()
+        return ignited
+
+    def _spread(self, burning, rng, ignition_prob, max_burn_rate):
+        """
+        Spread the fire and burn down the trees of a step, as
+        ArrayForest._spread does with the same random numbers. The packed
+        tiles next to the fire are expanded on the way.
+
+        :param burning: Flat cells of the trees on fire.
+        Returns:
+            Flat indices of the trees ignited and of the trees burned down.
+        """
+        active = burning
+        active_time = rng.random(len(burning))
+        self._active[self._pool(burning)] = True
+        touched = []
+        newly_active = [burning]
+
+        while len(active) > 0:
+            source, target = self.neighbours(active)
+            self._expand(target)
+            fine = self._condition.ravel()[self._pool(target)] == FINE
+            source, target = source[fine], target[fine]
+            success = rng.random(len(target)) < ignition_prob
+            source, target = source[success], target[success]
+            if len(target) == 0:
+                break
+
+            times = active_time[source]
+            target_pool = self._pool(target)
+            before = self._ignition_time[target_pool]
+            np.minimum.at(self._ignition_time, target_pool, times)
+            changed = np.unique(target[self._ignition_time[target_pool] < before])
+            changed_pool = self._pool(changed)
+            touched.append(changed)
+
+            # Draw the activation time of a tree the first time it ignites.
+            undrawn = changed_pool[np.isnan(self._activation_time[changed_pool])]
+            self._activation_time[undrawn] = rng.random(len(undrawn))
+
+            inactive = ~self._active[changed_pool]
+            candidates, candidates_pool = changed[inactive], changed_pool[inactive]
+            acts = (self._activation_time[candidates_pool]
+                    > self._ignition_time[candidates_pool])
+            active = candidates[acts]
+            active_time = self._activation_time[candidates_pool[acts]]
+            self._active[candidates_pool[acts]] = True
+            newly_active.append(active)
+
+        condition = self._condition.ravel()
+        hp = self._hp.ravel()
+        burn_rate = self._burn_rate.ravel()
+        ignited = np.unique(np.concatenate(touched)) if touched else burning[:0]
+        ignited_pool = self._pool(ignited)
+        condition[ignited_pool] = ON_FIRE
+        burn_rate[ignited_pool] = rng.integers(1, max_burn_rate, len(ignited))
+
+        # Every tree that was on fire at its activation time burns down.
+        acted = np.concatenate(newly_active)
+        acted_pool = self._pool(acted)
+        hp[acted_pool] -= burn_rate[acted_pool].astype(np.int16)
+        down = hp[acted_pool] <= 0
+        burnt = acted[down]
+        hp[acted_pool[down]] = 0
+        condition[acted_pool[down]] = BURNED
+
+        self._ignition_time[ignited_pool] = np.inf
+        self._activation_time[ignited_pool] = np.nan
+        self._active[acted_pool] = False
+        return ignited, burnt
@@ -0,0 +1,131 @@
+"""
+GROUP:       CSS_18
+DATE:        18-10-2026
+AUTHOR(S):   Sam Kuilboer, David Puroja, Jorrim Prins
+DESCRIPTION: ForestFire model on a TiledForest, for very large grids of
+             which only part holds trees or burns. Nothing is kept per cell
+             of the whole grid: there is no MESA grid, the firefighters are
+             a FireFighterBatch, the fire areas are labelled from the cells
+             on fire and the pursue strategy looks up the distance to the
+             fire in a k-d tree of the cells next to the fire.
+"""
+import numpy as np
+
+from .array_model import ArrayForestFire
+from .array_forest import FINE, ON_FIRE
+from .fire_index import FireDistance, fire_areas, fire_targets
+from .tiled_forest import TiledForest
+
+
+class TiledForestFire(ArrayForestFire):
+
+    def __init__(self, *args, tile_size=64, **kwargs):
+        """
+        Create a forest fire model on a sparse tiled forest, takes the same
+        parameters as ForestFire. For a seed it starts from the same forest,
+        fire and firefighters as an ArrayForestFire and spreads the fire in
+        the same way, but the new trees are drawn differently. The
+        firefighters are always stepped as a FireFighterBatch and snapshots
+        are not supported.
+
+        :param tile_size: Width and height of a tile in cells, see
+                          TiledForest.
+        """
+        if kwargs.get("snapshot") is not None:
+            raise ValueError("TiledForestFire can not be restored from a snapshot")
+        kwargs.pop("batch_fighters", None)
+        self.tile_size = tile_size
+        self._fire_distance = None
+        self._fire_distance_step = None
+        super().__init__(*args, batch_fighters=True, **kwargs)
+
+    def _init_spaces(self):
+        """
+        The trees and the fire are only kept in the TiledForest.
+        """
+        self.grid = None
+        self.fire_clusters = None
+        self.empty_cells = None
+        self.fire_index = None
+
+    def _init_backend(self):
+        """
+        Create the TiledForest which holds the trees.
+        """
+        self.forest = TiledForest(self.width, self.height, self.max_hp, tile_size=self.tile_size)
+
+    def _init_trees(self):
+        """
+        Init trees on every coordinate under a certain probability, tile
+        strip by tile strip.
+        """
+        self.forest.plant_random(self.density_trees, self.layout_rng)
+
+    def _init_fire(self):
+        """
+        Init a fire on a random spot on the field.
+        """
+        cell = self.forest.nth_cell(FINE, self.layout_rng.integers(self.forest.counts[FINE]))
+        self.forest.ignite(cell, self.rng, self.ignition_prob,
+                           self.max_burn_rate, start=True)
+
+    def _regrowth_cells(self, regrowth_rate):
+        """
+        Draw the cells for new trees: random cells without a tree or a
+        firefighter on them.
+        """
+        return self.forest.sample_empty(regrowth_rate, self.rng,
+                                        exclude=self._firefighter_cells())
+
+    def _burning_cells(self):
+        """
+        Flat cells of the trees on fire, sorted.
+        """
+        burning = self.forest.burning
+        return np.sort(burning[self.forest.cell_values("condition", burning) == ON_FIRE])
+
+    def _tree_arrays(self):
+        """
+        Dense copies of the condition, hp and burn rate arrays, only for
+        grids which fit in memory.
+        """
+        return self.forest.to_dense()
+
+    def get_distance_field(self):
+        """
+        Return the FireDistance of the current step, which stands in for the
+        distance field, see fire_distance.
+        """
+        if self._fire_distance_step != self.current_step:
+            targets = fire_targets(self._burning_cells(), self.width, self.height)
+            self._fire_distance = FireDistance(targets, self.height)
+            self._fire_distance_step = self.current_step
+        return self._fire_distance
+
+    def fire_distance(self, xs, ys):
+        """
+        Distance to the fire of coordinates, as in FireIndex.distance_field.
+        """
+        return self.get_distance_field()(xs, ys)
+
+    def is_on_fire(self, pos):
+        """
+        Check whether the tree on a coordinate, if any, is on fire.
+        """
+        x, y = pos
+        return bool(self.forest.cell_values("condition", x * self.height + y) == ON_FIRE)
+
+    def get_fire_areas(self):
+        """
+        Calculates the fire areas as the connected components of the cells
+        on fire.
+        """
+        return fire_areas(self._burning_cells(), self.height)
+
+    def label_fire_areas(self):
+        return self.get_fire_areas()
+
+    def get_numeric_representation_of_grid(self):
+        numeric_grid = np.zeros((self.width, self.height), dtype=np.int8)
+        numeric_grid.ravel()[self._burning_cells()] = 1
+        return numeric_grid
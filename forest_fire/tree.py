@@ -7,9 +7,12 @@ DESCRIPTION: Tree class, based on the agent class of the MESA Framework.
              igniting trees or extinghuishing them. 
              The step method proceeds the agent one step in the model.
 """
-from mesa import Agent
+from .slotted_agent import SlottedAgent
+from .array_forest import FINE, ON_FIRE, BURNED, CONDITION_CODES, CONDITION_LABELS
 
-class Tree(Agent):
+class Tree(SlottedAgent):
+
+    __slots__ = ("_code", "hp", "burn_rate", "being_extinghuished", "trees_index")
 
     def __init__(self, unique_id, pos, model):
         """
@@ -22,10 +25,33 @@ class Tree(Agent):
 
         super().__init__(unique_id, model)
         self.pos = pos
-        self.condition = "Fine"
+        # Condition code of array_forest, the label is only made when asked for.
+        self._code = FINE
         self.hp = model.max_hp
         self.burn_rate = 0
         self.being_extinghuished = False
+        # Position in model.trees, kept up to date by the model.
+        self.trees_index = None
+
+    @property
+    def condition(self):
+        """
+        Condition of the tree, either "Fine", "On fire" or "Burned".
+        """
+        return CONDITION_LABELS[self._code]
+
+    @condition.setter
+    def condition(self, condition):
+        self._set_code(CONDITION_CODES[condition])
+
+    def _set_code(self, code):
+        """
+        Set the condition code and let the model keep its condition counters
+        and fire clusters up to date.
+        """
+        old_code = self._code
+        self._code = code
+        self.model._condition_changed(self, old_code, code)
 
     def _ignite(self, start=False):
         """
@@ -35,10 +61,13 @@ class Tree(Agent):
         """
 
         if start == True:
-            self.condition = "On fire"
+            self._set_code(ON_FIRE)
         if self.model.random.random() < self.model.ignition_prob:
-            self.condition = "On fire"
+            self._set_code(ON_FIRE)
             self.burn_rate = self.random.choice(range(1, self.model.max_burn_rate))
+            self.model.tree_burn_rate[self.pos] = self.burn_rate
+        if self._code == ON_FIRE:
+            self.model.schedule_Tree.activate(self)
     
     def _extinguish(self, firefighter):
         """
@@ -53,15 +82,15 @@ class Tree(Agent):
             self.burn_rate -= firefighter.extg_strength*5
         if self.burn_rate <= 0:
             self.burn_rate = 0
-            self.condition = 'Fine'
+            self._set_code(FINE)
+            self.model.schedule_Tree.deactivate(self)
+        self.model.tree_burn_rate[self.pos] = self.burn_rate
     
     def _killed(self):
         """
         Remove burned trees from the grid.
         """
-        self.model.grid._remove_agent(self.pos, self)
-        self.model.schedule_Tree.remove(self)
-        self.model.trees.remove(self)
+        self.model._remove_tree(self)
 
     def _get_pos(self):
         """
@@ -73,20 +102,23 @@ class Tree(Agent):
         """
         Method for proceeding one step in the model. 
         """
+        profiler = self.model.profiler
+        profiler.count("tree_steps")
 
         # If burned, remove from the grid
-        if self.condition == "Burned":
+        if self._code == BURNED:
             self._killed()
 
         # if on fire
-        if self.condition == "On fire":
+        if self._code == ON_FIRE:
 
             # 1. ignite neighbors
+            profiler.count("tree_neighbour_queries")
             trees = [agent for agent in self.model.grid.get_neighbors(self.pos, 
                                                                       moore=False, 
                                                                       radius=1) if isinstance(agent, Tree)]
             for tree in trees:
-                if tree.condition == 'Fine':
+                if tree._code == FINE:
                     tree._ignite()
 
             # 2. drop hp
@@ -94,9 +126,10 @@ class Tree(Agent):
                 self.hp = self.hp - self.burn_rate
                 if self.hp <= 0:
                     self.hp = 0
-                    self.condition = "Burned"
+                    self._set_code(BURNED)
+                self.model.tree_hp[self.pos] = self.hp
             else:
-                self.condition = "Burned"
+                self._set_code(BURNED)
 
 
 
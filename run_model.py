@@ -6,13 +6,15 @@ DESCRIPTION: File containing functions to parallelize simulations.
 """
 
 import json
-import pandas as pd
 from forest_fire.model import ForestFire
-import multiprocessing
+from forest_fire.statistics_recorder import StatisticsRecorder, STATISTICS
+from forest_fire.sweep import run_sweep
+from forest_fire.result_cache import ResultCache
 
 def calculate_model(config_tuple):
     """
-    Worker function executing the simulation.
+    Worker function executing the simulation and writing its statistics to
+    a CSV file. The sweep in __main__ uses run_sweep instead.
 
     :param config_tuple: tuple containing the parameters for the strategy to
                          use, maximum amount of steps, number of fire fighters,
@@ -31,18 +33,19 @@ def calculate_model(config_tuple):
         regrowth_rate = CONFIG['model']['regrowth_rate'],
         N_firefighters = n_fighters,
         strategy = strategy,
-        extg_strength = ext_strength
+        extg_strength = ext_strength,
+        search_radius = CONFIG['agents']['fighter']['search_radius'],
+        recorder = StatisticsRecorder(STATISTICS, capacity=max_steps + 1)
     )
 
-    model_reporting_dicts = []
-
-    while max_steps > 0:
-        statistics = model.step()
-        if statistics['On fire'] == 0:
+    n_steps = 0
+    while n_steps < max_steps:
+        model.step()
+        if model.count_type(model, 'On fire') == 0:
             break
-        model_reporting_dicts.append(statistics)
-        max_steps -=1
-    statistics_df = pd.DataFrame(model_reporting_dicts)
+        n_steps += 1
+    # The step in which the fire died out is not part of the output.
+    statistics_df = model.recorder.to_dataframe().iloc[:n_steps]
     statistics_df.to_csv(f'statistics_strat{strategy}_nfighters-{n_fighters}_ext_strength-{ext_strength}_{i}.csv')
     
     return 0
@@ -62,39 +65,42 @@ if __name__ == "__main__":
     """
     for i in range(5):
         # Random model without fire fighters
-        configuration_list.append(('random', max_steps, 0, 0, CONFIG, i))
+        configuration_list.append(('random', 0, 0, i))
 
         # Setup models with fire fighters and different number of 
         # fighters/extinguishing strength
         for n_fighters in [100, 300, 500, 700, 900]:
             for ext_strength in [4,10]:
                 configuration_list.append(
-                    ('random', max_steps, n_fighters, ext_strength, CONFIG, i)
+                    ('random', n_fighters, ext_strength, i)
                 )
                 configuration_list.append(
-                    ('closest', max_steps, n_fighters, ext_strength, CONFIG, i)
+                    ('closest', n_fighters, ext_strength, i)
                 )
                 configuration_list.append(
-                    ('biggest', max_steps, n_fighters, ext_strength, CONFIG, i)
+                    ('biggest', n_fighters, ext_strength, i)
                 )
                 configuration_list.append(
-                    ('earliest', max_steps, n_fighters, ext_strength, CONFIG, i)
+                    ('earliest', n_fighters, ext_strength, i)
                 )
 
         for ext_strength in [2, 4, 6, 8]:
             configuration_list.append(
-                ('random', max_steps, 100, ext_strength, CONFIG, i)
+                ('random', 100, ext_strength, i)
             )
             configuration_list.append(
-                ('closest', max_steps, 100, ext_strength, CONFIG, i)
+                ('closest', 100, ext_strength, i)
             )
             configuration_list.append(
-                ('biggest', max_steps, 100, ext_strength, CONFIG, i)
+                ('biggest', 100, ext_strength, i)
             )
             configuration_list.append(
-                ('earliest', max_steps, 100, ext_strength, CONFIG, i)
+                ('earliest', 100, ext_strength, i)
             )
 
-    # Start the computations in parallel.
-    with multiprocessing.Pool() as pool:
-        outputs = pool.map(calculate_model, configuration_list)
+    # Start the computations in parallel, all statistics end up in one file.
+    # The replicates of a configuration are simulated together. Every
+    # configuration has a fixed seed, so the runs which were done before are
+    # taken from the result cache.
+    run_sweep(configuration_list, CONFIG, max_steps, 'statistics.npz', seed=0,
+              batch_replicates=True, stable_seeds=True, cache=ResultCache())